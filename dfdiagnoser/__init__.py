@@ -1,32 +1,62 @@
-import structlog
+"""DFDiagnoser package.
+
+Importing the package is kept cheap: pandas, pyarrow, hydra and the
+diagnoser itself are only imported when an exported name is first used.
+"""
 from dataclasses import dataclass
-from hydra import compose, initialize
-from hydra.core.hydra_config import DictConfig, HydraConfig
-from hydra.utils import instantiate
-from omegaconf import OmegaConf
-from typing import List, Union
+from typing import TYPE_CHECKING, Any, List, Union
+
+if TYPE_CHECKING:
+    from hydra.core.hydra_config import DictConfig
+
+    from .diagnoser import Diagnoser
+    from .input import CheckpointInput, MofkaInput
+    from .output import ConsoleOutput, FileOutput
+
+    InputType = Union[CheckpointInput, MofkaInput]
+    OutputType = Union[ConsoleOutput, FileOutput]
+
+_LAZY_EXPORTS = {
+    "Diagnoser": ".diagnoser",
+    "CheckpointInput": ".input",
+    "MofkaInput": ".input",
+    "ConsoleOutput": ".output",
+    "FileOutput": ".output",
+}
+
+
+def __getattr__(name: str) -> Any:
+    import importlib
+
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+    elif name == "InputType":
+        from .input import CheckpointInput, MofkaInput
 
-from .config import init_hydra_config_store
-from .diagnoser import Diagnoser
-from .input import CheckpointInput, MofkaInput
-from .output import ConsoleOutput, FileOutput
-from .utils.log_utils import configure_logging, log_block
+        value = Union[CheckpointInput, MofkaInput]
+    elif name == "OutputType":
+        from .output import ConsoleOutput, FileOutput
 
-InputType = Union[CheckpointInput, MofkaInput]
-OutputType = Union[ConsoleOutput, FileOutput]
+        value = Union[ConsoleOutput, FileOutput]
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
 
 
 @dataclass
 class DFDiagnoserInstance:
-    diagnoser: Diagnoser
-    hydra_config: DictConfig
-    input: InputType
-    output: OutputType
+    diagnoser: "Diagnoser"
+    hydra_config: "DictConfig"
+    input: "InputType"
+    output: "OutputType"
 
     def diagnose_checkpoint(self, checkpoint_dir: str = None):
         """Diagnose the checkpoint using the configured diagnoser."""
         if checkpoint_dir is None:
             checkpoint_dir = self.input.checkpoint_dir
+        from omegaconf import OmegaConf
+
         # Use OmegaConf.to_object if metric_boundaries exists, otherwise use empty dict
         if 'metric_boundaries' in self.hydra_config:
             metric_boundaries = OmegaConf.to_object(self.hydra_config.metric_boundaries)
@@ -45,8 +75,16 @@ class DFDiagnoserInstance:
         idle_timeout_sec: int = None,
         pull_timeout_ms: int = None,
         output_topic: str = None,
+        state_dir: str = None,
+        snapshot_interval_events: int = None,
+        snapshot_interval_sec: float = None,
+        journal: bool = None,
     ):
         """Diagnose streamed Mofka output using the configured diagnoser."""
+        from omegaconf import OmegaConf
+
+        from .input import MofkaInput
+
         if not isinstance(self.input, MofkaInput):
             raise ValueError("Input is not MofkaInput")
         if group_file is None:
@@ -61,28 +99,63 @@ class DFDiagnoserInstance:
             pull_timeout_ms = self.input.pull_timeout_ms
         if output_topic is None:
             output_topic = getattr(self.input, "output_topic", "")
+        if state_dir is None:
+            state_dir = self.input.state_dir
+        if snapshot_interval_events is None:
+            snapshot_interval_events = self.input.snapshot_interval_events
+        if snapshot_interval_sec is None:
+            snapshot_interval_sec = self.input.snapshot_interval_sec
+        if journal is None:
+            journal = self.input.journal
         if "metric_boundaries" in self.hydra_config:
             metric_boundaries = OmegaConf.to_object(self.hydra_config.metric_boundaries)
         else:
             metric_boundaries = {}
-        return self.diagnoser.diagnose_mofka(
-            group_file=group_file,
-            topic_name=topic_name,
-            metric_boundaries=metric_boundaries,
-            output_handler=self.output.handle_result,
-            consumer_name=consumer_name,
-            idle_timeout_sec=idle_timeout_sec,
-            pull_timeout_ms=pull_timeout_ms,
-            output_topic=output_topic,
-        )
+        if hasattr(self.output, "queue_depth"):
+            self.diagnoser.metrics.gauge(
+                "output_queue_depth",
+                "Scored views waiting for an output writer thread",
+                fn=lambda: self.output.queue_depth,
+            )
+        try:
+            return self.diagnoser.diagnose_mofka(
+                group_file=group_file,
+                topic_name=topic_name,
+                metric_boundaries=metric_boundaries,
+                output_handler=self.output.handle_result,
+                consumer_name=consumer_name,
+                idle_timeout_sec=idle_timeout_sec,
+                pull_timeout_ms=pull_timeout_ms,
+                output_topic=output_topic,
+                state_dir=state_dir,
+                snapshot_interval_events=snapshot_interval_events,
+                snapshot_interval_sec=snapshot_interval_sec,
+                journal=journal,
+                journal_fsync_records=self.input.journal_fsync_records,
+                journal_fsync_interval_sec=self.input.journal_fsync_interval_sec,
+            )
+        finally:
+            self.output.close()
 
     def handle_result(self, result):
         """Handle the diagnosis result using the configured output."""
         self.output.handle_result(result)
 
+    def close(self):
+        """Flush and close the configured output."""
+        self.output.close()
+
 
 def init_with_hydra(hydra_overrides: List[str]):
     """Initialize dfdiagnoser with Hydra configuration."""
+    import structlog
+    from hydra import compose, initialize
+    from hydra.core.hydra_config import HydraConfig
+    from hydra.utils import instantiate
+
+    from .config import init_hydra_config_store
+    from .utils.log_utils import configure_logging, log_block
+
     # Init Hydra config
     with initialize(version_base=None, config_path="configs"):
         init_hydra_config_store()
@@ -96,7 +169,9 @@ def init_with_hydra(hydra_overrides: List[str]):
     # Configure structlog + stdlib logging
     log_file = f"{hydra_config.hydra.run.dir}/{hydra_config.hydra.job.name}.log"
     log_level = "debug" if hydra_config.debug else "info"
-    configure_logging(log_file=log_file, level=log_level)
+    configure_logging(
+        log_file=log_file, level=log_level, async_logging=hydra_config.async_logging
+    )
     log = structlog.get_logger()
     log.info("Starting dfdiagnoser")
 
@@ -7,10 +7,7 @@ from hydra.utils import instantiate
 from omegaconf import DictConfig
 from pathlib import Path
 
-from . import InputType, OutputType
 from .config import init_hydra_config_store
-from .diagnoser import Diagnoser
-from .input import CheckpointInput, MofkaInput
 from .utils.log_utils import configure_logging, console_block, log_block
 
 
@@ -19,11 +16,19 @@ init_hydra_config_store()
 
 @hydra.main(config_path="configs", config_name="config", version_base="1.1")
 def main(cfg: DictConfig):
+    # Diagnoser, inputs and outputs (and with them pandas/pyarrow) are
+    # imported here so that `dfdiagnoser --help` stays fast.
+    from . import InputType, OutputType
+    from .diagnoser import Diagnoser
+    from .input import CheckpointInput, MofkaInput
+
     # Configure structlog + stdlib logging
     hydra_config = HydraConfig.get()
     log_file = f"{hydra_config.runtime.output_dir}/{hydra_config.job.name}.log"
     log_level = "debug" if cfg.debug else "info"
-    configure_logging(log_file=log_file, level=log_level)
+    configure_logging(
+        log_file=log_file, level=log_level, async_logging=cfg.async_logging
+    )
     log = structlog.get_logger()
     log.info("Starting DFDiagnoser")
 
@@ -40,12 +45,28 @@ def main(cfg: DictConfig):
         diagnosis_result = diagnoser.diagnose_checkpoint(str(checkpoint_dir))
         with console_block("Output"):
             output.handle_result(diagnosis_result)
+            output.close()
     elif isinstance(input, MofkaInput):
-        diagnoser.diagnose_mofka(
-            group_file=input.group_file,
-            topic_name=input.topic_name,
-            output_handler=output.handle_result,
-        )
+        if hasattr(output, "queue_depth"):
+            diagnoser.metrics.gauge(
+                "output_queue_depth",
+                "Scored views waiting for an output writer thread",
+                fn=lambda: output.queue_depth,
+            )
+        try:
+            diagnoser.diagnose_mofka(
+                group_file=input.group_file,
+                topic_name=input.topic_name,
+                output_handler=output.handle_result,
+                state_dir=input.state_dir,
+                snapshot_interval_events=input.snapshot_interval_events,
+                snapshot_interval_sec=input.snapshot_interval_sec,
+                journal=input.journal,
+                journal_fsync_records=input.journal_fsync_records,
+                journal_fsync_interval_sec=input.journal_fsync_interval_sec,
+            )
+        finally:
+            output.close()
     # elif isinstance(input, ZMQInput):
     #     diagnosis_stream = diagnoser.diagnose_zmq(input.address)
     #     diagnosis_stream.start()
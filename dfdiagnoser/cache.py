@@ -0,0 +1,178 @@
+"""On-disk cache of scored checkpoint flat views.
+
+Entries are keyed by the flat view's identity (size and mtime, or a content
+hash) together with a fingerprint of everything that affects its result
+(metric boundaries, read mode, rule definitions). Each entry stores the
+scored view, and the rule matches when rules are active, as parquet files.
+Hits refresh the entry's mtime, and the least recently used entries are
+evicted once the cache exceeds ``max_bytes``.
+
+Entry sizes and recency are kept in memory: the cache directory is listed
+once, on first use, and afterwards updated by ``put``/``get``, so eviction
+does not re-stat the cache on every write. Entries written by other
+processes are picked up on the next start.
+"""
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+import pandas as pd
+import structlog
+
+
+logger = structlog.get_logger()
+
+CACHE_VERSION = 1
+SCORED_SUFFIX = ".scored.parquet"
+RULES_SUFFIX = ".rules.parquet"
+
+
+def fingerprint(config: Any) -> str:
+    """Stable hash of a JSON-serializable configuration."""
+    payload = json.dumps(
+        {"version": CACHE_VERSION, "config": config}, sort_keys=True, default=str
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def file_signature(path: str, hash_content: bool = False) -> str:
+    if hash_content:
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return f"sha1:{digest.hexdigest()}"
+    stat = os.stat(path)
+    return f"stat:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class ResultCache:
+    def __init__(
+        self,
+        cache_dir: str,
+        max_bytes: int = 1024 ** 3,
+        hash_content: bool = False,
+    ):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hash_content = hash_content
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> entry bytes, least recently used first; loaded on first use
+        self._entries: Optional["OrderedDict[str, int]"] = None
+        self._total_bytes = 0
+
+    def key(self, path: str, config_fingerprint: str, signature: Optional[str] = None) -> str:
+        """Entry key; ``signature`` skips the stat when it is already known."""
+        if signature is None:
+            signature = file_signature(path, self.hash_content)
+        identity = f"{os.path.abspath(path)}|{signature}"
+        return fingerprint([identity, config_fingerprint])
+
+    def get(self, key: str) -> Optional[Tuple[pd.DataFrame, Optional[pd.DataFrame]]]:
+        scored_path = self._path(key, SCORED_SUFFIX)
+        rules_path = self._path(key, RULES_SUFFIX)
+        try:
+            scored = pd.read_parquet(scored_path)
+            rule_matches = pd.read_parquet(rules_path) if os.path.exists(rules_path) else None
+        except FileNotFoundError:
+            # Missing, or evicted by another thread while being read
+            self._count(hit=False)
+            return None
+        except Exception:
+            # A corrupt entry is treated as a miss and rewritten
+            logger.warning("diagnoser.cache.corrupt", key=key, exc_info=True)
+            self._count(hit=False)
+            return None
+        for path in (scored_path, rules_path):
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            entries = self._index()
+            if key in entries:
+                entries.move_to_end(key)
+            self.hits += 1
+        return scored, rule_matches
+
+    def put(self, key: str, scored: pd.DataFrame, rule_matches: Optional[pd.DataFrame] = None):
+        # Files are encoded outside the lock and moved into place under it,
+        # so a concurrent eviction never removes half of a fresh entry
+        staged = []
+        if rule_matches is not None:
+            staged.append(self._stage(rule_matches, self._path(key, RULES_SUFFIX)))
+        # The scored view is moved last; its presence marks a complete entry
+        staged.append(self._stage(scored, self._path(key, SCORED_SUFFIX)))
+        size = sum(os.path.getsize(tmp_path) for tmp_path, _ in staged)
+        with self._lock:
+            for tmp_path, path in staged:
+                os.replace(tmp_path, path)
+            entries = self._index()
+            self._total_bytes += size - entries.pop(key, 0)
+            entries[key] = size
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits ``max_bytes``."""
+        evicted: List[str] = []
+        with self._lock:
+            entries = self._index()
+            while entries and self._total_bytes > self.max_bytes:
+                key, size = entries.popitem(last=False)
+                self._remove(key)
+                self._total_bytes -= size
+                evicted.append(key)
+            total = self._total_bytes
+        if evicted:
+            logger.info("diagnoser.cache.evicted", entries=len(evicted), cache_bytes=total)
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _index(self) -> "OrderedDict[str, int]":
+        """In-memory entry index; the first call lists the cache directory."""
+        if self._entries is None:
+            entries = {}
+            with os.scandir(self.cache_dir) as listing:
+                for item in listing:
+                    for suffix in (SCORED_SUFFIX, RULES_SUFFIX):
+                        if item.name.endswith(suffix):
+                            try:
+                                stat = item.stat()
+                            except FileNotFoundError:
+                                continue
+                            key = item.name[: -len(suffix)]
+                            size, used = entries.get(key, (0, 0))
+                            entries[key] = (size + stat.st_size, max(used, stat.st_mtime_ns))
+            self._entries = OrderedDict(
+                (key, size)
+                for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1])
+            )
+            self._total_bytes = sum(self._entries.values())
+        return self._entries
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}{suffix}")
+
+    def _remove(self, key: str):
+        for suffix in (SCORED_SUFFIX, RULES_SUFFIX):
+            try:
+                os.remove(self._path(key, suffix))
+            except FileNotFoundError:
+                pass
+
+    def _stage(self, df: pd.DataFrame, path: str) -> Tuple[str, str]:
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        df.to_parquet(tmp_path, index=True)
+        return tmp_path, path
@@ -0,0 +1,345 @@
+"""Reading of DFAnalyzer checkpoint flat views."""
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .types import CheckpointReadMode
+
+
+class FlatViewReader:
+    """Reads ``_flat_view_*.parquet`` files of a checkpoint.
+
+    In ``"default"`` mode views are read with ``pd.read_parquet`` as before.
+    In ``"mmap"`` mode files are memory-mapped, only the requested columns
+    (plus the index) are decoded, and frames use Arrow-backed dtypes so the
+    conversion from Arrow is zero-copy. Decoded tables are kept per file
+    (invalidated on size/mtime change), so re-diagnosing the same checkpoint
+    only decodes columns that were not read before; least recently used
+    tables are dropped once they add up to more than ``max_cache_bytes``.
+
+    In ``"dataset"`` mode all views of a checkpoint are opened as one
+    ``pyarrow.dataset`` and scanned together with multithreaded I/O and
+    column projection (see :meth:`scan`); each batch keeps the file it came
+    from, and frames are reassembled per file with that file's own schema.
+
+    With ``categorical_dimensions``, string ``d_`` columns are read as
+    dictionary arrays and never materialized as Python strings: they become
+    ``category`` columns (Arrow dictionary columns in ``"mmap"`` mode).
+    """
+
+    def __init__(
+        self,
+        mode: CheckpointReadMode = "default",
+        categorical_dimensions: bool = False,
+        max_cache_bytes: int = 256 * 1024 ** 2,
+    ):
+        if mode not in ("default", "mmap", "dataset"):
+            raise ValueError(f"Unsupported checkpoint read mode: {mode}")
+        self.mode = mode
+        self.categorical_dimensions = categorical_dimensions
+        self.max_cache_bytes = max_cache_bytes
+        self._lock = threading.Lock()
+        # path -> ((size, mtime_ns), table, nbytes), least recently used first
+        self._tables: "OrderedDict[str, Tuple[Tuple[int, int], object, int]]" = OrderedDict()
+        self._cached_bytes = 0
+
+    @property
+    def projects_columns(self) -> bool:
+        return self.mode in ("mmap", "dataset")
+
+    def columns(self, path: str) -> List[str]:
+        """Non-index column names of a flat view, read from the footer."""
+        import pyarrow.parquet as pq
+
+        schema = pq.read_schema(path, memory_map=self.mode == "mmap")
+        index_columns = schema_index_columns(schema)
+        return [name for name in schema.names if name not in index_columns]
+
+    def read(self, path: str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        if self.mode == "dataset":
+            ((_, df),) = self.scan([path], lambda available: columns)
+            return df
+        if self.mode == "default":
+            kwargs = {}
+            if self.categorical_dimensions:
+                kwargs["read_dictionary"] = self._dictionary_columns(path)
+            return pd.read_parquet(
+                path, columns=list(columns) if columns is not None else None, **kwargs
+            )
+        table = self._read_table(path, columns)
+        if columns is not None:
+            index_columns = schema_index_columns(table.schema)
+            wanted = set(columns) | set(index_columns)
+            table = table.select([name for name in table.schema.names if name in wanted])
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+    def _read_table(self, path: str, columns: Optional[Sequence[str]]):
+        import pyarrow.parquet as pq
+
+        stat = os.stat(path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        read_dictionary = self._dictionary_columns(path) if self.categorical_dimensions else None
+        with self._lock:
+            cached = self._tables.pop(path, None)
+            if cached is not None:
+                self._cached_bytes -= cached[2]
+            table = cached[1] if cached is not None and cached[0] == signature else None
+            if table is None:
+                table = pq.read_table(
+                    path,
+                    columns=columns,
+                    memory_map=True,
+                    use_pandas_metadata=True,
+                    read_dictionary=read_dictionary,
+                )
+            elif columns is None or not set(columns) <= set(table.column_names):
+                missing = None
+                if columns is not None:
+                    missing = [c for c in columns if c not in table.column_names]
+                extra = pq.read_table(
+                    path,
+                    columns=missing,
+                    memory_map=True,
+                    use_pandas_metadata=False,
+                    read_dictionary=read_dictionary,
+                )
+                for name in extra.column_names:
+                    if name not in table.column_names:
+                        table = table.append_column(extra.schema.field(name), extra.column(name))
+            nbytes = table.nbytes
+            self._tables[path] = (signature, table, nbytes)
+            self._cached_bytes += nbytes
+            # Keep the table just read even when it alone exceeds the budget
+            while self._cached_bytes > self.max_cache_bytes and len(self._tables) > 1:
+                _, (_, _, evicted) = self._tables.popitem(last=False)
+                self._cached_bytes -= evicted
+        return table
+
+    def scan(
+        self,
+        paths: Sequence[str],
+        columns_for: Optional[Callable[[List[str]], Optional[Sequence[str]]]] = None,
+    ) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """Scan ``paths`` as one dataset, yielding ``(path, frame)`` in order.
+
+        ``columns_for`` maps a file's non-index columns to the ones to read
+        (all when it returns ``None``). The scan reads the union of those
+        columns across files under a unified schema.
+        """
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+
+        if not paths:
+            return
+        schemas = {path: pq.read_schema(path) for path in paths}
+        wanted: Dict[str, List[str]] = {}
+        for path, schema in schemas.items():
+            index_columns = schema_index_columns(schema)
+            available = [name for name in schema.names if name not in index_columns]
+            selected = columns_for(available) if columns_for is not None else None
+            selected = set(available if selected is None else selected)
+            wanted[path] = [
+                name for name in schema.names if name in selected or name in index_columns
+            ]
+        union = list(dict.fromkeys(name for names in wanted.values() for name in names))
+        unified = pa.unify_schemas(
+            [schema.remove_metadata() for schema in schemas.values()],
+            promote_options="permissive",
+        )
+        parquet_format = ds.ParquetFileFormat()
+        if self.categorical_dimensions:
+            dictionary_columns = dimension_dictionary_columns(unified)
+            parquet_format = ds.ParquetFileFormat(dictionary_columns=dictionary_columns)
+            unified = _as_dictionary(unified, dictionary_columns)
+            schemas = {
+                path: _as_dictionary(schema, dictionary_columns) for path, schema in schemas.items()
+            }
+        dataset = ds.dataset(list(paths), format=parquet_format, schema=unified)
+        scanner = dataset.scanner(columns=union, use_threads=True)
+        projected = scanner.projected_schema
+
+        batches: Dict[str, List] = {path: [] for path in paths}
+        by_fragment = {os.path.normpath(path): path for path in paths}
+        pending = list(paths)
+        for tagged in scanner.scan_batches():
+            path = by_fragment[os.path.normpath(tagged.fragment.path)]
+            batches[path].append(tagged.record_batch)
+            # Fragments are scanned in order: hand out files the scan has passed
+            while pending[0] != path:
+                done = pending.pop(0)
+                yield done, _assemble(batches.pop(done), schemas[done], wanted[done], projected)
+        for done in pending:
+            yield done, _assemble(batches.pop(done), schemas[done], wanted[done], projected)
+
+    def read_row_groups(
+        self, source, row_groups: Sequence[int], columns: Optional[Sequence[str]] = None
+    ) -> pd.DataFrame:
+        """Read only ``row_groups`` of a flat view (a path or file object)."""
+        parquet_file = self.parquet_file(source)
+        return read_row_groups(
+            parquet_file,
+            row_groups,
+            columns,
+            types_mapper=pd.ArrowDtype if self.mode == "mmap" else None,
+        )
+
+    def parquet_file(self, source):
+        """Open a flat view (a path or file object) with this reader's options."""
+        import pyarrow.parquet as pq
+
+        read_dictionary = None
+        if self.categorical_dimensions:
+            read_dictionary = dimension_dictionary_columns(pq.ParquetFile(source).schema_arrow)
+            if hasattr(source, "seek"):
+                source.seek(0)
+        return pq.ParquetFile(
+            source, memory_map=self.mode == "mmap", read_dictionary=read_dictionary
+        )
+
+    def _dictionary_columns(self, path: str) -> List[str]:
+        import pyarrow.parquet as pq
+
+        return dimension_dictionary_columns(pq.read_schema(path, memory_map=self.mode == "mmap"))
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+            self._cached_bytes = 0
+
+
+def schema_index_columns(schema) -> List[str]:
+    """Names of the index columns stored in an Arrow schema's pandas metadata."""
+    metadata = schema.pandas_metadata or {}
+    return [c for c in metadata.get("index_columns", []) if isinstance(c, str)]
+
+
+def dimension_dictionary_columns(schema) -> List[str]:
+    """String ``d_`` dimension columns of an Arrow schema."""
+    import pyarrow as pa
+
+    return [
+        field.name
+        for field in schema
+        if field.name.startswith("d_")
+        and (pa.types.is_string(field.type) or pa.types.is_large_string(field.type))
+    ]
+
+
+def _as_dictionary(schema, columns: Sequence[str]):
+    import pyarrow as pa
+
+    for name in columns:
+        index = schema.get_field_index(name)
+        if index >= 0:
+            field = schema.field(index)
+            schema = schema.set(index, field.with_type(pa.dictionary(pa.int32(), field.type)))
+    return schema
+
+
+def read_row_groups(
+    parquet_file,
+    row_groups: Sequence[int],
+    columns: Optional[Sequence[str]] = None,
+    types_mapper=None,
+) -> pd.DataFrame:
+    """Frame of some row groups of an open ``pyarrow.parquet.ParquetFile``."""
+    import numpy as np
+
+    row_groups = list(row_groups)
+    table = parquet_file.read_row_groups(
+        row_groups,
+        columns=list(columns) if columns is not None else None,
+        use_pandas_metadata=True,
+    )
+    df = table.to_pandas(types_mapper=types_mapper)
+    index_columns = (parquet_file.schema_arrow.pandas_metadata or {}).get("index_columns", [])
+    if len(index_columns) == 1 and isinstance(index_columns[0], dict):
+        # A RangeIndex is only stored as metadata: rebuild the labels of the rows read
+        index = index_columns[0]
+        metadata = parquet_file.metadata
+        sizes = [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)]
+        offsets = np.cumsum([0] + sizes)
+        positions = np.concatenate(
+            [np.arange(offsets[i], offsets[i + 1]) for i in row_groups] or [np.arange(0)]
+        )
+        labels = pd.RangeIndex(index["start"], index["stop"], index["step"])[positions]
+        df.index = labels.rename(index.get("name"))
+    return df
+
+
+def iter_flat_view_batches(
+    source,
+    columns: Optional[Sequence[str]] = None,
+    batch_size: int = 65536,
+    categorical_dimensions: bool = False,
+) -> Iterator[pd.DataFrame]:
+    """Frames of at most ``batch_size`` rows from a flat view, index included.
+
+    Only one batch is decoded at a time, so views larger than memory can be
+    streamed.
+    """
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(source)
+    if categorical_dimensions:
+        parquet_file = pq.ParquetFile(
+            source, read_dictionary=dimension_dictionary_columns(parquet_file.schema_arrow)
+        )
+    index_columns = (parquet_file.schema_arrow.pandas_metadata or {}).get("index_columns", [])
+    range_index = None
+    if len(index_columns) == 1 and isinstance(index_columns[0], dict):
+        range_index = index_columns[0]
+    offset = 0
+    for batch in parquet_file.iter_batches(
+        batch_size=batch_size,
+        columns=list(columns) if columns is not None else None,
+        use_pandas_metadata=True,
+    ):
+        df = batch.to_pandas()
+        if range_index is not None:
+            # A RangeIndex is only stored as metadata: continue it across batches
+            labels = pd.RangeIndex(range_index["start"], range_index["stop"], range_index["step"])
+            df.index = labels[offset : offset + len(df)].rename(range_index.get("name"))
+        offset += len(df)
+        yield df
+
+
+def _assemble(batches, schema, columns: List[str], projected) -> pd.DataFrame:
+    """One file's frame from its scanned batches, with its own schema and index."""
+    import pyarrow as pa
+
+    table = pa.Table.from_batches(batches, schema=projected)
+    table = table.select(columns).cast(pa.schema([schema.field(name) for name in columns]))
+    return table.replace_schema_metadata(schema.metadata).to_pandas()
+
+
+def merge_raw_stats(raw_stats: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge the ``_raw_stats_*.json`` documents of a checkpoint.
+
+    ``total_*`` counts are summed; ``unique_*`` counts and ``job_time`` take
+    the maximum (uniqueness across files cannot be recovered); other keys
+    keep the first value seen.
+    """
+    merged: Dict[str, Any] = {}
+    for stats in raw_stats:
+        for key, value in stats.items():
+            if key not in merged:
+                merged[key] = value
+            elif key.startswith("total_") and isinstance(value, (int, float)):
+                merged[key] += value
+            elif (key.startswith("unique_") or key == "job_time") and isinstance(value, (int, float)):
+                merged[key] = max(merged[key], value)
+    return merged
+
+
+def load_raw_stats(paths: Sequence[str]) -> Dict[str, Any]:
+    raw_stats = []
+    for path in sorted(paths):
+        with open(path, "r") as f:
+            raw_stats.append(json.load(f))
+    return merge_raw_stats(raw_stats)
@@ -0,0 +1,121 @@
+"""Thin client for ``dfdiagnoser.server``.
+
+Only the standard library is imported here, so a client invocation starts
+in milliseconds and the diagnosis latency is that of the warm server.
+"""
+import json
+import os
+import socket
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional
+
+
+def default_socket_path() -> str:
+    """``$XDG_RUNTIME_DIR/dfdiagnoser.sock``, or a per-user socket in the temp dir."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "dfdiagnoser.sock")
+    return os.path.join(tempfile.gettempdir(), f"dfdiagnoser-{os.getuid()}.sock")
+
+
+DEFAULT_SOCKET_PATH = default_socket_path()
+
+
+class DiagnoserClient:
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, timeout: Optional[float] = None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if self._sock is None:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.settimeout(self.timeout)
+            self._sock.connect(self.socket_path)
+            self._file = self._sock.makefile("rb")
+        self._sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError(f"Server at {self.socket_path} closed the connection")
+        return json.loads(line)
+
+    def ping(self) -> Dict[str, Any]:
+        return self.request({"op": "ping"})
+
+    def diagnose_checkpoint(
+        self,
+        checkpoint_dir: str,
+        metric_boundaries: Optional[Dict[str, float]] = None,
+        write_output: bool = True,
+        min_severity: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        payload = {
+            "op": "diagnose_checkpoint",
+            "checkpoint_dir": checkpoint_dir,
+            "write_output": write_output,
+        }
+        if metric_boundaries is not None:
+            payload["metric_boundaries"] = metric_boundaries
+        if min_severity is not None:
+            payload["min_severity"] = min_severity
+        return self.request(payload)
+
+    def shutdown(self) -> Dict[str, Any]:
+        return self.request({"op": "shutdown"})
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run ``dfdiagnoser-client [--socket PATH] {ping,diagnose,shutdown} [DIR...]``."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="dfdiagnoser-client", description="Send requests to a dfdiagnoser server."
+    )
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Unix socket path")
+    parser.add_argument("--no-output", action="store_true", help="Do not write scored views")
+    parser.add_argument("--min-severity", help="Only return rows scoring at this severity or above")
+    parser.add_argument("op", choices=["ping", "diagnose", "shutdown"])
+    parser.add_argument("checkpoint_dirs", nargs="*")
+    args = parser.parse_args(argv)
+
+    ok = True
+    with DiagnoserClient(args.socket) as client:
+        if args.op == "diagnose":
+            if not args.checkpoint_dirs:
+                parser.error("diagnose requires at least one checkpoint directory")
+            responses = [
+                client.diagnose_checkpoint(
+                    os.path.abspath(checkpoint_dir),
+                    write_output=not args.no_output,
+                    min_severity=args.min_severity,
+                )
+                for checkpoint_dir in args.checkpoint_dirs
+            ]
+        elif args.op == "ping":
+            responses = [client.ping()]
+        else:
+            responses = [client.shutdown()]
+    for response in responses:
+        ok = ok and response.get("ok", False)
+        print(json.dumps(response))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,7 @@
 import dataclasses as dc
 from hydra.core.config_store import ConfigStore
 from omegaconf import MISSING
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 
 @dc.dataclass
@@ -24,6 +24,12 @@ class MofkaInputConfig(InputConfig):
     idle_timeout_sec: int = 0
     pull_timeout_ms: int = 1000
     output_topic: str = ""
+    state_dir: str = ""
+    snapshot_interval_events: int = 0
+    snapshot_interval_sec: float = 0
+    journal: bool = False
+    journal_fsync_records: int = 256
+    journal_fsync_interval_sec: float = 1.0
 
 
 @dc.dataclass
@@ -36,6 +42,15 @@ class FileOutputConfig(OutputConfig):
     _target_: str = "dfdiagnoser.output.FileOutput"
     output_dir: Optional[str] = None
     output_format: str = "json"
+    output_mode: str = "files"
+    json_layout: str = "index"
+    json_backend: str = "auto"
+    dataset_buffer_rows: int = 65536
+    dataset_max_file_bytes: int = 256 * 1024 ** 2
+    dataset_max_file_sec: float = 300
+    dataset_max_buffer_sec: float = 30
+    writer_threads: int = 0
+    queue_size: int = 8
 
 
 @dc.dataclass
@@ -61,6 +76,33 @@ class RuleDefinitionConfig:
 @dc.dataclass
 class DiagnoserConfig:
     _target_: str = "dfdiagnoser.diagnoser.Diagnoser"
+    _convert_: str = "all"
+    rule_defs: Dict[str, Any] = dc.field(default_factory=dict)
+    motif_defs: Dict[str, Any] = dc.field(default_factory=dict)
+    time_metric: str = "time_sum"
+    rule_jobs: int = 1
+    checkpoint_read_mode: str = "default"
+    categorical_dimensions: bool = False
+    cache_dir: str = ""
+    cache_max_bytes: int = 1024 ** 3
+    checkpoint_cache_max_bytes: int = 256 * 1024 ** 2
+    cache_hash_content: bool = False
+    checkpoint_manifest: bool = False
+    min_severity: str = ""
+    rollup: bool = False
+    rollup_dimensions: List[List[str]] = dc.field(default_factory=list)
+    json_backend: str = "auto"
+    hot_log_level: str = "info"
+    hot_log_sample_every: int = 1
+    metrics_port: int = 0
+    metrics_json_path: str = ""
+    metrics_json_interval_sec: float = 10
+    profile_dir: str = ""
+    profile_mode: str = "cprofile"
+    profile_events: int = 100
+    profile_duration_sec: float = 0
+    profile_sample_interval_ms: float = 5
+    tracemalloc_top: int = 20
 
 
 def init_hydra_config_store() -> ConfigStore:
@@ -1,17 +1,43 @@
+import dataclasses as dc
 import glob
 import io
 import json
 import os
 import signal
 import time
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import pandas as pd
 import structlog
 
-from .scoring import score_metrics
+from .ingest import (
+    ENCODING_ARROW,
+    ENCODING_JSON,
+    FactIngestor,
+    arrow_view_type,
+    decode_arrow_envelope,
+    json_loads,
+    summarize_facts,
+)
+from .checkpoint import (
+    FlatViewReader,
+    iter_flat_view_batches,
+    load_raw_stats,
+    read_row_groups,
+    schema_index_columns,
+)
+from .scoring import (
+    may_reach_severity,
+    rows_at_least,
+    score_metrics,
+    scored_columns,
+    severity_code,
+    severity_thresholds,
+    top_k,
+)
+from .serialization import get_backend
 from .types import DiagnosisResult
-from .utils.log_utils import console_block
+from .utils.log_utils import SampledLogger, console_block
 
 logger = structlog.get_logger()
 
@@ -31,53 +57,369 @@ def install_shutdown_handler():
 
 
 class Diagnoser:
-    def __init__(self):
+    def __init__(
+        self,
+        rule_defs: Optional[Dict[str, Any]] = None,
+        motif_defs: Optional[Dict[str, Any]] = None,
+        time_metric: str = "time_sum",
+        rule_jobs: int = 1,
+        checkpoint_read_mode: str = "default",
+        categorical_dimensions: bool = False,
+        cache_dir: str = "",
+        cache_max_bytes: int = 1024 ** 3,
+        checkpoint_cache_max_bytes: int = 256 * 1024 ** 2,
+        cache_hash_content: bool = False,
+        checkpoint_manifest: bool = False,
+        min_severity: str = "",
+        rollup: bool = False,
+        rollup_dimensions: Optional[List[List[str]]] = None,
+        json_backend: str = "auto",
+        hot_log_level: str = "info",
+        hot_log_sample_every: int = 1,
+        metrics_port: int = 0,
+        metrics_json_path: str = "",
+        metrics_json_interval_sec: float = 10,
+        profile_dir: str = "",
+        profile_mode: str = "cprofile",
+        profile_events: int = 100,
+        profile_duration_sec: float = 0,
+        profile_sample_interval_ms: float = 5,
+        tracemalloc_top: int = 20,
+    ):
+        from .cache import ResultCache
+        from .manifest import ManifestIndex
+        from .metrics import MetricsRegistry
+        from .profiling import RuntimeProfiler
+        from .motifs import MotifClassifier
+        from .rules import RuleEngine
         from .state import DiagnosisStateStore
 
         self.state = DiagnosisStateStore()
-
-    def diagnose_checkpoint(self, checkpoint_dir: str, metric_boundaries: dict = {}):
-        if not os.path.exists(checkpoint_dir):
-            raise FileNotFoundError(
-                f"Checkpoint directory {checkpoint_dir} does not exist"
+        self.fact_ingestor = FactIngestor()
+        self.rule_engine = RuleEngine(rule_defs, time_metric=time_metric, n_jobs=rule_jobs)
+        self.motif_classifier = MotifClassifier(
+            motif_defs, side_resolver=self._dominant_imbalance_side
+        )
+        self.flat_view_reader = FlatViewReader(
+            checkpoint_read_mode,
+            categorical_dimensions=categorical_dimensions,
+            max_cache_bytes=checkpoint_cache_max_bytes,
+        )
+        # Encoder of findings published to Mofka
+        _, self.dumps = get_backend(json_backend)
+        self.metrics = MetricsRegistry()
+        self.metrics_port = metrics_port
+        self.metrics_json_path = metrics_json_path
+        self.metrics_json_interval_sec = metrics_json_interval_sec
+        # Toggled at runtime with SIGUSR1 (profile) / SIGUSR2 (tracemalloc)
+        self.profiler = RuntimeProfiler(
+            output_dir=profile_dir,
+            mode=profile_mode,
+            events=profile_events,
+            duration_sec=profile_duration_sec,
+            sample_interval_ms=profile_sample_interval_ms,
+            tracemalloc_top=tracemalloc_top,
+        )
+        # Per-event/per-finding logs of the streaming loop
+        self.hot_log = SampledLogger(
+            logger, level=hot_log_level, sample_every=hot_log_sample_every
+        )
+        self.result_cache = (
+            ResultCache(cache_dir, max_bytes=cache_max_bytes, hash_content=cache_hash_content)
+            if cache_dir
+            else None
+        )
+        # Plans checkpoint diagnoses from a manifest instead of directory scans
+        self.checkpoint_manifests = ManifestIndex() if checkpoint_manifest else None
+        if min_severity:
+            severity_code(min_severity)
+        # Default for diagnose_checkpoint/diagnose_mofka: only keep rows
+        # scoring at this severity or above, skipping row groups that cannot
+        # hold such a row without decoding them
+        self.min_severity = min_severity
+        # Dimension sets to roll scored views up by (every d_ column when empty)
+        self.rollup = rollup
+        self.rollup_dimensions = rollup_dimensions or []
+
+    def diagnose_checkpoint(
+        self,
+        checkpoint_dir: str,
+        metric_boundaries: dict = {},
+        min_severity: Optional[str] = None,
+    ):
+        if min_severity is None:
+            min_severity = self.min_severity
+        manifest = None
+        if self.checkpoint_manifests is not None:
+            manifest = self.checkpoint_manifests.plan(checkpoint_dir)
+            raw_stats_paths = manifest.raw_stats_paths
+            flat_view_paths = manifest.flat_view_paths
+            if not raw_stats_paths and not flat_view_paths:
+                raise ValueError(f"Checkpoint directory {checkpoint_dir} is empty")
+        else:
+            if not os.path.exists(checkpoint_dir):
+                raise FileNotFoundError(
+                    f"Checkpoint directory {checkpoint_dir} does not exist"
+                )
+            if not os.path.isdir(checkpoint_dir):
+                raise NotADirectoryError(
+                    f"Checkpoint directory {checkpoint_dir} is not a directory"
+                )
+            if not os.listdir(checkpoint_dir):
+                raise ValueError(f"Checkpoint directory {checkpoint_dir} is empty")
+            raw_stats_paths = glob.glob(
+                os.path.join(checkpoint_dir, "_raw_stats_*.json")
             )
-        if not os.path.isdir(checkpoint_dir):
-            raise NotADirectoryError(
-                f"Checkpoint directory {checkpoint_dir} is not a directory"
+            flat_view_paths = glob.glob(
+                os.path.join(checkpoint_dir, "_flat_view_*.parquet")
             )
-        if not os.listdir(checkpoint_dir):
-            raise ValueError(f"Checkpoint directory {checkpoint_dir} is empty")
 
         with console_block("Load raw stats"):
-            raw_stats_paths = glob.glob(
-                os.path.join(checkpoint_dir, "_raw_stats_*.json")
-            )
             if not raw_stats_paths:
                 raise ValueError(
                     f"Checkpoint directory {checkpoint_dir} does not contain any raw stats files"
                 )
-            with open(raw_stats_paths[0], "r") as f:
-                raw_stats = json.load(f)
-        flat_view_paths = glob.glob(
-            os.path.join(checkpoint_dir, "_flat_view_*.parquet")
-        )
+            raw_stats = load_raw_stats(raw_stats_paths)
         if not flat_view_paths:
             raise ValueError(
                 f"Checkpoint directory {checkpoint_dir} does not contain any flat view files"
             )
 
         with console_block("Score flat views"):
-            scored_flat_views = []
-            for flat_view_path in flat_view_paths:
-                flat_view = pd.read_parquet(flat_view_path)
+            scored: Dict[str, Tuple[pd.DataFrame, Optional[pd.DataFrame]]] = {}
+            cache_keys: Dict[str, str] = {}
+            if self.result_cache is not None:
+                config_fingerprint = self._checkpoint_fingerprint(
+                    metric_boundaries, min_severity
+                )
+                for flat_view_path in flat_view_paths:
+                    signature = None
+                    if manifest is not None and not self.result_cache.hash_content:
+                        signature = manifest.flat_view(flat_view_path).signature
+                    cache_key = self.result_cache.key(
+                        flat_view_path, config_fingerprint, signature=signature
+                    )
+                    cached = self.result_cache.get(cache_key)
+                    if cached is not None:
+                        scored[flat_view_path] = cached
+                    else:
+                        cache_keys[flat_view_path] = cache_key
+            to_read = [path for path in flat_view_paths if path not in scored]
+            for flat_view_path, flat_view in self._read_flat_views(
+                to_read, metric_boundaries, manifest, min_severity
+            ):
                 scored_flat_view = score_metrics(flat_view, metric_boundaries)
-                scored_flat_views.append(scored_flat_view)
+                matches = None
+                if self.rule_engine:
+                    matches = self.rule_engine.evaluate(flat_view)
+                if min_severity:
+                    scored_flat_view, matches = self._filter_severity(
+                        scored_flat_view, matches, min_severity
+                    )
+                scored[flat_view_path] = (scored_flat_view, matches)
+                if flat_view_path in cache_keys:
+                    self.result_cache.put(cache_keys[flat_view_path], scored_flat_view, matches)
+            if self.result_cache is not None:
+                logger.info(
+                    "diagnoser.cache.summary",
+                    hits=self.result_cache.hits,
+                    misses=self.result_cache.misses,
+                )
 
+        scored_flat_views = [scored[path][0] for path in flat_view_paths]
+        rule_matches = [
+            scored[path][1] for path in flat_view_paths if scored[path][1] is not None
+        ]
         return DiagnosisResult(
             flat_view_paths=flat_view_paths,
             scored_flat_views=scored_flat_views,
+            rule_matches=rule_matches,
+            raw_stats=raw_stats,
+            rollups=self._rollups(scored_flat_views),
+        )
+
+    def top_k_flat_view(
+        self,
+        flat_view_path: str,
+        k: int = 10,
+        metric_boundaries: dict = {},
+        metric: Optional[str] = None,
+        batch_size: int = 65536,
+    ) -> pd.DataFrame:
+        """The ``k`` worst rows of a flat view, streamed in record batches.
+
+        Only the scored and ``d_`` columns are read, one batch at a time, so
+        the view never has to fit in memory.
+        """
+        columns = scored_columns(self.flat_view_reader.columns(flat_view_path), metric_boundaries)
+        if metric is not None:
+            columns = [col for col in columns if col.startswith("d_") or col == metric]
+        return top_k(
+            iter_flat_view_batches(
+                flat_view_path,
+                columns=columns,
+                batch_size=batch_size,
+                categorical_dimensions=self.flat_view_reader.categorical_dimensions,
+            ),
+            k,
+            metric_boundaries,
+            metric=metric,
+        )
+
+    def _rollups(self, scored_flat_views: List[pd.DataFrame]) -> List[Dict[str, pd.DataFrame]]:
+        if not self.rollup:
+            return []
+        from .rollup import build_rollups
+
+        with self._stage("rollup"):
+            return [
+                build_rollups(scored_flat_view, self.rollup_dimensions)
+                for scored_flat_view in scored_flat_views
+            ]
+
+    def _stage(self, stage: str):
+        """Time a block into the ``stage_seconds`` histogram."""
+        return self.metrics.time(
+            "stage_seconds", "Latency of diagnoser stages", {"stage": stage}
+        )
+
+    def _start_metrics_export(self) -> List[Any]:
+        from .metrics import MetricsDumper, MetricsServer
+
+        exporters = []
+        try:
+            if self.metrics_port:
+                exporters.append(MetricsServer(self.metrics, self.metrics_port))
+            if self.metrics_json_path:
+                exporters.append(
+                    MetricsDumper(
+                        self.metrics,
+                        self.metrics_json_path,
+                        interval_sec=self.metrics_json_interval_sec,
+                    )
+                )
+        except Exception:
+            for exporter in exporters:
+                exporter.close()
+            raise
+        return exporters
+
+    def _checkpoint_fingerprint(self, metric_boundaries: dict, min_severity: str = "") -> str:
+        """Hash of the configuration that determines a scored view."""
+        from .cache import fingerprint
+
+        return fingerprint(
+            {
+                "metric_boundaries": metric_boundaries,
+                "min_severity": min_severity,
+                "read_mode": self.flat_view_reader.mode,
+                "categorical_dimensions": self.flat_view_reader.categorical_dimensions,
+                "rules": [dc.asdict(rule) for rule in self.rule_engine.rules],
+                "time_metric": self.rule_engine.time_metric,
+            }
         )
 
+    def _read_flat_view(
+        self, flat_view_path: str, metric_boundaries: dict, manifest=None
+    ) -> pd.DataFrame:
+        reader = self.flat_view_reader
+        if not reader.projects_columns:
+            return reader.read(flat_view_path)
+        entry = manifest.flat_view(flat_view_path) if manifest is not None else None
+        # The manifest already holds the footer's column names
+        available = entry.columns if entry is not None else reader.columns(flat_view_path)
+        return reader.read(
+            flat_view_path, columns=self._projection(available, metric_boundaries)
+        )
+
+    def _read_flat_views(
+        self,
+        flat_view_paths: List[str],
+        metric_boundaries: dict,
+        manifest=None,
+        min_severity: str = "",
+    ) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """``(path, frame)`` for each view; one multi-file scan in dataset mode.
+
+        With ``min_severity``, views with row groups that cannot reach it
+        are read without those row groups.
+        """
+        reader = self.flat_view_reader
+        if min_severity:
+            full_reads = []
+            for flat_view_path in flat_view_paths:
+                row_group_stats, available = self._flat_view_footer(flat_view_path, manifest)
+                row_groups = self._severity_row_groups(
+                    row_group_stats, available, metric_boundaries, min_severity
+                )
+                if row_groups is None:
+                    full_reads.append(flat_view_path)
+                    continue
+                columns = None
+                if reader.projects_columns:
+                    columns = self._projection(available, metric_boundaries)
+                yield flat_view_path, reader.read_row_groups(flat_view_path, row_groups, columns)
+            flat_view_paths = full_reads
+        if reader.mode == "dataset":
+            yield from self.flat_view_reader.scan(
+                flat_view_paths,
+                lambda available: self._projection(available, metric_boundaries),
+            )
+            return
+        for flat_view_path in flat_view_paths:
+            yield flat_view_path, self._read_flat_view(
+                flat_view_path, metric_boundaries, manifest
+            )
+
+    def _flat_view_footer(self, flat_view_path: str, manifest=None):
+        """Row-group statistics and non-index columns of a flat view."""
+        entry = manifest.flat_view(flat_view_path) if manifest is not None else None
+        if entry is not None:
+            return entry.row_groups, entry.columns
+        import pyarrow.parquet as pq
+
+        from .manifest import row_group_stats
+
+        metadata = pq.read_metadata(flat_view_path)
+        return row_group_stats(metadata), self.flat_view_reader.columns(flat_view_path)
+
+    def _severity_row_groups(
+        self,
+        row_group_stats: List[Dict[str, Any]],
+        columns: List[str],
+        metric_boundaries: dict,
+        min_severity: str,
+    ) -> Optional[List[int]]:
+        """Row groups that may hold a row at ``min_severity``; ``None`` to read all."""
+        thresholds = severity_thresholds(columns, metric_boundaries, min_severity)
+        if thresholds is None:
+            return None
+        row_groups = [
+            i
+            for i, row_group in enumerate(row_group_stats)
+            if may_reach_severity(row_group["stats"], thresholds)
+        ]
+        skipped = len(row_group_stats) - len(row_groups)
+        self.metrics.counter(
+            "row_groups_skipped_total", "Row groups skipped by min_severity pushdown"
+        ).inc(skipped)
+        return row_groups if skipped else None
+
+    @staticmethod
+    def _filter_severity(
+        scored_flat_view: pd.DataFrame, matches: Optional[pd.DataFrame], min_severity: str
+    ) -> Tuple[pd.DataFrame, Optional[pd.DataFrame]]:
+        mask = rows_at_least(scored_flat_view, min_severity)
+        if matches is not None:
+            matches = matches[mask]
+        return scored_flat_view[mask], matches
+
+    def _projection(self, available: List[str], metric_boundaries: dict) -> List[str]:
+        # Only decode the columns that scoring and the rules actually read
+        columns = set(scored_columns(available, metric_boundaries))
+        columns.update(self.rule_engine.required_columns(available))
+        return [c for c in available if c in columns]
+
     def diagnose_mofka(
         self,
         group_file: str,
@@ -89,39 +431,105 @@ class Diagnoser:
         idle_timeout_sec: int = 0,
         pull_timeout_ms: int = 1000,
         output_topic: str = "",
+        state_dir: str = "",
+        snapshot_interval_events: int = 0,
+        snapshot_interval_sec: float = 0,
+        journal: bool = False,
+        journal_fsync_records: int = 256,
+        journal_fsync_interval_sec: float = 1.0,
+        min_severity: Optional[str] = None,
     ):
+        from .journal import FactJournal, JournalCompactor, recover_state
+        from .state import SNAPSHOT_FILENAME, DiagnosisStateStore
         from .streaming.mofka_io import open_consumer, open_producer
 
+        if journal and not state_dir:
+            raise ValueError("Journaling requires a state directory (state_dir)")
         output_handler = output_handler or (lambda result: None)
-
-        driver, consumer = open_consumer(
-            group_file, topic_name, consumer_name=consumer_name or None
+        if min_severity is None:
+            min_severity = self.min_severity
+        metrics = self.metrics
+        events_total = metrics.counter("events_total", "Events consumed")
+        bytes_total = metrics.counter("payload_bytes_total", "Event payload bytes consumed")
+        errors_total = metrics.counter("event_errors_total", "Events that failed to process")
+        metrics.gauge(
+            "state_trackers", "Fact trackers in the state store",
+            fn=lambda: len(self.state.all_trackers()),
+        )
+        metrics.gauge(
+            "state_window", "Current analysis window", fn=lambda: self.state.current_window
         )
 
-        # Open producer for publishing findings to optimizer
+        # With a state directory, restore the latest snapshot and defer
+        # acknowledgements until state is durable (snapshot time, or journal
+        # fsync when journaling). Mofka acknowledgements are cumulative per
+        # partition, so a restarted consumer with the same name resumes right
+        # after the last durable event.
+        snapshot_path = os.path.join(state_dir, SNAPSHOT_FILENAME) if state_dir else ""
+        resume_event_id = None
+        fact_journal = None
+        compactor = None
+        restored = False
+        driver = consumer = None
         findings_producer = None
-        if output_topic:
-            try:
-                _, findings_producer = open_producer(group_file, output_topic)
-                logger.info("diagnoser.findings_producer.open", topic=output_topic)
-            except Exception:
-                logger.warning("diagnoser.findings_producer.failed", exc_info=True)
-
         event_count = 0
         flat_view_count = 0
         facts_count = 0
         error_count = 0
         last_event_time = None  # None until first event received
+        pending_ack = None
+        events_since_snapshot = 0
+        last_snapshot_time = time.monotonic()
 
-        logger.info(
-            "diagnoser.stream.start",
-            topic=topic_name,
-            idle_timeout_sec=idle_timeout_sec,
-            pull_timeout_ms=pull_timeout_ms,
-        )
+        exporters: List[Any] = []
 
         try:
+            exporters = self._start_metrics_export()
+            if snapshot_path and journal:
+                self.state, position = recover_state(state_dir)
+                restored = bool(position)
+                fact_journal = FactJournal(
+                    state_dir,
+                    fsync_every_records=journal_fsync_records,
+                    fsync_interval_sec=journal_fsync_interval_sec,
+                    min_seq=position.get("journal_seq", -1) + 1,
+                )
+                self.state.attach_journal(fact_journal)
+                compactor = JournalCompactor(state_dir)
+            elif snapshot_path and os.path.exists(snapshot_path):
+                self.state, position = DiagnosisStateStore.load_snapshot(snapshot_path)
+                restored = True
+            if restored:
+                resume_event_id = position.get("event_id")
+                logger.info(
+                    "diagnoser.state.restored",
+                    path=snapshot_path,
+                    current_window=self.state.current_window,
+                    trackers=len(self.state.all_trackers()),
+                    resume_event_id=resume_event_id,
+                )
+
+            driver, consumer = open_consumer(
+                group_file, topic_name, consumer_name=consumer_name or None
+            )
+
+            # Open producer for publishing findings to optimizer
+            if output_topic:
+                try:
+                    _, findings_producer = open_producer(group_file, output_topic)
+                    logger.info("diagnoser.findings_producer.open", topic=output_topic)
+                except Exception:
+                    logger.warning("diagnoser.findings_producer.failed", exc_info=True)
+
+            logger.info(
+                "diagnoser.stream.start",
+                topic=topic_name,
+                idle_timeout_sec=idle_timeout_sec,
+                pull_timeout_ms=pull_timeout_ms,
+            )
+
             install_shutdown_handler()
+            self.profiler.install()
             timeout_count = 0
             wait_ms = pull_timeout_ms if pull_timeout_ms > 0 else 1000
 
@@ -143,20 +551,36 @@ class Diagnoser:
                     break
 
                 # Wait on current future; timeout is raised as exception
+                pull_start = time.perf_counter()
                 try:
                     event = future.wait(timeout_ms=wait_ms)
                 except Exception as ex:
                     ex_msg = str(ex).lower()
                     if "timeout" in ex_msg:
                         timeout_count += 1
+                        self.profiler.on_idle()
                         continue
                     raise
 
                 if event is None:
                     timeout_count += 1
+                    self.profiler.on_idle()
                     continue
 
+                metrics.histogram(
+                    "stage_seconds", labels={"stage": "pull_wait"}
+                ).record(time.perf_counter() - pull_start)
                 last_event_time = time.monotonic()
+                event_id = getattr(event, "event_id", None)
+                if (
+                    resume_event_id is not None
+                    and event_id is not None
+                    and event_id <= resume_event_id
+                ):
+                    # Already folded into the restored snapshot
+                    event.acknowledge()
+                    future = consumer.pull()
+                    continue
                 event_count += 1
                 raw_metadata = event.metadata if hasattr(event, "metadata") else None
                 if isinstance(raw_metadata, dict):
@@ -177,21 +601,31 @@ class Diagnoser:
                         payload_size = sum(len(p) for p in payload)
                     elif isinstance(payload, (bytes, bytearray)):
                         payload_size = len(payload)
-
-                logger.info(
-                    "diagnoser.event.received",
-                    event_index=event_count,
-                    artifact_type=artifact_type,
-                    metadata_keys=list(metadata.keys()),
-                    payload_size=payload_size,
-                    timeouts_before=timeout_count,
-                )
+                events_total.inc()
+                bytes_total.inc(payload_size)
+                metrics.counter(
+                    "artifact_events_total", "Events by artifact type",
+                    {"artifact_type": artifact_type},
+                ).inc()
+
+                if self.hot_log.should_log("diagnoser.event.received"):
+                    self.hot_log.log(
+                        "diagnoser.event.received",
+                        event_index=event_count,
+                        artifact_type=artifact_type,
+                        metadata_keys=list(metadata.keys()),
+                        payload_size=payload_size,
+                        timeouts_before=timeout_count,
+                    )
                 timeout_count = 0
 
                 # Check for stop sentinel
                 if metadata.get("name") == stop_name:
                     logger.info("diagnoser.stream.stop_sentinel", event_count=event_count)
-                    event.acknowledge()
+                    if snapshot_path:
+                        pending_ack = event
+                    else:
+                        event.acknowledge()
                     break
 
                 try:
@@ -202,28 +636,31 @@ class Diagnoser:
                         # optimizer acts on fresh state rather than replayed
                         # longitudinal snapshots.
                         if findings_producer is not None:
-                            control_findings = self._build_control_findings(
-                                window_index=self.state.current_window,
-                                touched_keys=touched_keys,
-                            )
-                            if control_findings:
-                                self._publish_findings(
-                                    findings_producer,
-                                    control_findings,
-                                    publish_mode="control",
+                            with self._stage("findings_build"):
+                                control_findings = self._build_control_findings(
+                                    window_index=self.state.current_window,
+                                    touched_keys=touched_keys,
                                 )
-                                logger.info(
+                            if control_findings:
+                                with self._stage("publish"):
+                                    self._publish_findings(
+                                        findings_producer,
+                                        control_findings,
+                                        publish_mode="control",
+                                    )
+                                self.hot_log.maybe_log(
                                     "diagnoser.findings.control",
                                     count=len(control_findings),
                                     window=self.state.current_window,
                                 )
                     else:
                         self._handle_flat_view(
-                            event, metadata, metric_boundaries, output_handler
+                            event, metadata, metric_boundaries, output_handler, min_severity
                         )
                         flat_view_count += 1
                 except Exception:
                     error_count += 1
+                    errors_total.inc()
                     logger.exception(
                         "diagnoser.event.error",
                         artifact_type=artifact_type,
@@ -236,55 +673,141 @@ class Diagnoser:
                 # window indices so persistence tracking works correctly.
                 if artifact_type == "analysis_facts":
                     self.state.advance_window()
-                event.acknowledge()
+                    self.profiler.on_window(self.state.current_window)
+                self.profiler.on_event()
+                if snapshot_path:
+                    pending_ack = event
+                    events_since_snapshot += 1
+                    snapshot_due = (
+                        snapshot_interval_events > 0
+                        and events_since_snapshot >= snapshot_interval_events
+                    ) or (
+                        snapshot_interval_sec > 0
+                        and time.monotonic() - last_snapshot_time >= snapshot_interval_sec
+                    )
+                    if fact_journal is not None:
+                        fact_journal.append_position(
+                            self._stream_position(event, event_count)
+                        )
+                        if fact_journal.maybe_sync():
+                            pending_ack.acknowledge()
+                            pending_ack = None
+                        if snapshot_due:
+                            # Seal the segment and fold it into the snapshot
+                            # off the event loop.
+                            compactor.submit(
+                                fact_journal.rotate(), self.state.scored_summaries.to_dict()
+                            )
+                            if pending_ack is not None:
+                                pending_ack.acknowledge()
+                                pending_ack = None
+                    elif snapshot_due:
+                        self._snapshot_state(snapshot_path, pending_ack, event_count)
+                        pending_ack = None
+                    if snapshot_due:
+                        events_since_snapshot = 0
+                        last_snapshot_time = time.monotonic()
+                else:
+                    event.acknowledge()
                 future = consumer.pull()
 
             if _shutdown_requested:
                 logger.info("diagnoser.stream.stop_signal", signal="SIGTERM")
 
         finally:
-            logger.info(
-                "diagnoser.stream.done",
-                event_count=event_count,
-                flat_view_count=flat_view_count,
-                facts_count=facts_count,
-                error_count=error_count,
-            )
+            try:
+                self.profiler.close()
+                if fact_journal is not None:
+                    try:
+                        if pending_ack is not None:
+                            fact_journal.append_position(
+                                self._stream_position(pending_ack, event_count)
+                            )
+                        sealed_seq = fact_journal.close()
+                        if pending_ack is not None:
+                            pending_ack.acknowledge()
+                        self.state.attach_journal(None)
+                        compactor.submit(sealed_seq, self.state.scored_summaries.to_dict())
+                        compactor.close()
+                    except Exception:
+                        logger.exception("diagnoser.state.journal_close_failed", path=state_dir)
+                elif snapshot_path and (pending_ack is not None or events_since_snapshot):
+                    try:
+                        self._snapshot_state(snapshot_path, pending_ack, event_count)
+                    except Exception:
+                        logger.exception("diagnoser.state.snapshot_failed", path=snapshot_path)
+                logger.info(
+                    "diagnoser.stream.done",
+                    event_count=event_count,
+                    flat_view_count=flat_view_count,
+                    facts_count=facts_count,
+                    error_count=error_count,
+                )
 
-            # Build longitudinal summary
-            findings = self._build_longitudinal_summary()
-            if findings:
-                for finding in findings:
-                    logger.info(
-                        "diagnoser.finding",
-                        finding_type=finding.finding_type,
-                        scope=finding.scope,
-                        layer=finding.layer,
-                        motif=finding.motif,
-                        severity=finding.severity,
-                        confidence=round(finding.confidence, 4),
-                        prevalence=round(finding.trend.prevalence, 4),
-                        persistence=finding.trend.persistence,
-                        support_windows=finding.trend.support_windows,
-                        last_seen_window=finding.trend.last_seen_window,
-                        trend_direction=finding.trend.trend_direction,
-                        opportunity_tags=finding.opportunity_tags,
-                        contributing_facts=finding.contributing_facts,
-                        summary=finding.summary,
-                    )
+                # Build longitudinal summary
+                with self._stage("findings_build"):
+                    findings = self._build_longitudinal_summary()
+                if findings:
+                    for finding in findings:
+                        logger.info(
+                            "diagnoser.finding",
+                            finding_type=finding.finding_type,
+                            scope=finding.scope,
+                            layer=finding.layer,
+                            motif=finding.motif,
+                            severity=finding.severity,
+                            confidence=round(finding.confidence, 4),
+                            prevalence=round(finding.trend.prevalence, 4),
+                            persistence=finding.trend.persistence,
+                            support_windows=finding.trend.support_windows,
+                            last_seen_window=finding.trend.last_seen_window,
+                            trend_direction=finding.trend.trend_direction,
+                            opportunity_tags=finding.opportunity_tags,
+                            contributing_facts=finding.contributing_facts,
+                            summary=finding.summary,
+                        )
 
-                # Publish findings to Mofka for optimizer consumption
-                if findings_producer is not None:
-                    self._publish_findings(
-                        findings_producer,
-                        findings,
-                        publish_mode="summary",
-                    )
+                    # Publish findings to Mofka for optimizer consumption
+                    if findings_producer is not None:
+                        with self._stage("publish"):
+                            self._publish_findings(
+                                findings_producer,
+                                findings,
+                                publish_mode="summary",
+                            )
+            finally:
+                # Exporter threads and the metrics port must not outlive the
+                # stream, whatever failed above
+                for exporter in exporters:
+                    exporter.close()
+                del consumer
+                del driver
 
-            del consumer
-            del driver
+    @staticmethod
+    def _stream_position(event, event_count: int) -> Dict[str, Any]:
+        position = {"event_count": event_count}
+        if event is not None:
+            position["event_id"] = getattr(event, "event_id", None)
+        return position
+
+    def _snapshot_state(self, snapshot_path: str, event, event_count: int):
+        """Persist the state store, then acknowledge ``event`` (if any)."""
+        position = self._stream_position(event, event_count)
+        start = time.perf_counter()
+        self.state.save_snapshot(snapshot_path, position=position)
+        if event is not None:
+            event.acknowledge()
+        logger.info(
+            "diagnoser.state.snapshot",
+            path=snapshot_path,
+            current_window=self.state.current_window,
+            elapsed=round(time.perf_counter() - start, 4),
+            **position,
+        )
 
-    def _handle_flat_view(self, event, metadata, metric_boundaries, output_handler):
+    def _handle_flat_view(
+        self, event, metadata, metric_boundaries, output_handler, min_severity: str = ""
+    ):
         payload = event.data
         if payload is None:
             logger.warning("diagnoser.flat_view.no_data")
@@ -295,27 +818,71 @@ class Diagnoser:
                 return
             payload = b"".join(payload)
 
-        flat_view = pd.read_parquet(io.BytesIO(payload))
-        scored_flat_view = score_metrics(flat_view, metric_boundaries)
-
-        # Record score summaries into state
-        self.state.record_scored_summary(scored_flat_view)
+        with self._stage("decode"):
+            flat_view, complete = self._decode_flat_view(
+                payload, metric_boundaries, min_severity
+            )
+        with self._stage("score"):
+            scored_flat_view = score_metrics(flat_view, metric_boundaries)
+            rule_matches = [self.rule_engine.evaluate(flat_view)] if self.rule_engine else []
+
+            # Record score summaries into state. A view pruned by row-group
+            # pushdown holds an arbitrary subset of rows, so its means and
+            # histograms would skew the window distributions; leave it out.
+            if complete:
+                self.state.record_scored_summary(scored_flat_view)
+            else:
+                self.metrics.counter(
+                    "summaries_skipped_total",
+                    "Window score summaries not recorded because row groups were pruned",
+                ).inc()
+            if min_severity:
+                scored_flat_view, matches = self._filter_severity(
+                    scored_flat_view, rule_matches[0] if rule_matches else None, min_severity
+                )
+                rule_matches = [matches] if matches is not None else []
 
         result = DiagnosisResult(
             flat_view_paths=[],
             scored_flat_views=[scored_flat_view],
+            rule_matches=rule_matches,
+            window_index=self.state.current_window,
+            rollups=self._rollups([scored_flat_view]),
         )
-        output_handler(result)
+        with self._stage("output_write"):
+            output_handler(result)
 
-        logger.info(
+        self.hot_log.maybe_log(
             "diagnoser.flat_view.scored",
             rows=len(flat_view),
             view_type=metadata.get("view_type", "unknown"),
         )
 
-    def _handle_analysis_facts(self, event, metadata):
-        from .state import FactObservation
+    def _decode_flat_view(
+        self, payload: bytes, metric_boundaries: dict, min_severity: str = ""
+    ) -> Tuple[pd.DataFrame, bool]:
+        """Decode a streamed view; also returns whether every row group was read."""
+        categorical = self.flat_view_reader.categorical_dimensions
+        if not min_severity and not categorical:
+            return pd.read_parquet(io.BytesIO(payload)), True
+        from .manifest import row_group_stats
+
+        # Streamed views are decoded like checkpoint views in default mode
+        parquet_file = FlatViewReader(categorical_dimensions=categorical).parquet_file(
+            io.BytesIO(payload)
+        )
+        if not min_severity:
+            return read_row_groups(parquet_file, range(parquet_file.num_row_groups)), True
+        index_columns = schema_index_columns(parquet_file.schema_arrow)
+        columns = [c for c in parquet_file.schema_arrow.names if c not in index_columns]
+        row_groups = self._severity_row_groups(
+            row_group_stats(parquet_file.metadata), columns, metric_boundaries, min_severity
+        )
+        if row_groups is None:
+            return read_row_groups(parquet_file, range(parquet_file.num_row_groups)), True
+        return read_row_groups(parquet_file, row_groups), False
 
+    def _handle_analysis_facts(self, event, metadata):
         payload = event.data
         if payload is None:
             logger.warning("diagnoser.analysis_facts.no_data")
@@ -326,72 +893,39 @@ class Diagnoser:
                 return set()
             payload = b"".join(payload)
 
-        envelope = json.loads(payload.decode("utf-8"))
-        facts = envelope.get("facts", [])
-
-        logger.info(
-            "analysis_facts.received",
-            fact_count=len(facts),
-            view_type=envelope.get("view_type", "unknown"),
-        )
-
-        touched_keys = set()
-        for fact in facts:
-            # severity is a nested dict: {"score": float, "label": str, ...}
-            severity = fact.get("severity", {})
-            if isinstance(severity, dict):
-                severity_score = severity.get("score", 0)
-                severity_label = severity.get("label", "unknown")
-            else:
-                severity_score = float(severity) if severity else 0
-                severity_label = "unknown"
-
-            # scope is a nested dict: {"entity": str, "layer": str|null, ...}
-            # For per_row facts, entity is the row index (e.g., "0", "1") which
-            # changes every epoch — use view_type instead so the same fact_type
-            # accumulates into one tracker for longitudinal persistence tracking.
-            scope = fact.get("scope", "global")
-            if isinstance(scope, dict):
-                layer = scope.get("layer")
-                entity = str(scope.get("entity", "global"))
-                # Numeric entities are per-row indices; use view_type for tracking
-                if entity.isdigit():
-                    scope_key = envelope.get("view_type", "global")
-                else:
-                    scope_key = entity
-                if layer:
-                    scope_key = f"{layer}:{scope_key}"
-            else:
-                scope_key = str(scope)
-
-            # window may have epoch info
-            window = fact.get("window", {})
-            epoch = window.get("epoch") if isinstance(window, dict) else None
-
-            obs = FactObservation(
-                window_index=self.state.current_window,
-                epoch=epoch,
-                severity_score=severity_score,
-                severity_label=severity_label,
-                evidence=fact.get("evidence", {}),
-                opportunity_tags=fact.get("opportunity_tags", []),
-            )
-            key = (fact.get("fact_type", "unknown"), scope_key)
-            self.state.record_fact(key, obs)
-            touched_keys.add(key)
-
-            logger.info(
-                "diagnoser.fact.recorded",
+        encoding = metadata.get("encoding", ENCODING_JSON)
+        if encoding == ENCODING_ARROW:
+            with self._stage("decode"):
+                table = decode_arrow_envelope(payload)
+            with self._stage("fact_ingest"):
+                keys, observations = self.fact_ingestor.ingest_arrow(
+                    table, window_index=self.state.current_window
+                )
+            view_type = arrow_view_type(table, "unknown")
+        elif encoding == ENCODING_JSON:
+            with self._stage("decode"):
+                envelope = json_loads(bytes(payload))
+            with self._stage("fact_ingest"):
+                keys, observations = self.fact_ingestor.ingest(
+                    envelope, window_index=self.state.current_window
+                )
+            view_type = envelope.get("view_type", "unknown")
+        else:
+            raise ValueError(f"Unsupported analysis_facts encoding: {encoding}")
+        with self._stage("fact_record"):
+            self.state.record_facts(keys, observations)
+        self.metrics.counter("facts_total", "Facts ingested").inc(len(keys))
+
+        if self.hot_log.should_log("analysis_facts.recorded"):
+            self.hot_log.log(
+                "analysis_facts.recorded",
                 window_index=self.state.current_window,
-                fact_type=fact.get("fact_type"),
-                scope=scope_key,
-                severity_score=round(severity_score, 3),
-                severity_label=severity_label,
-                opportunity_tags=fact.get("opportunity_tags", []),
-                epoch=epoch,
+                view_type=view_type,
+                encoding=encoding,
+                **summarize_facts(keys, observations),
             )
 
-        return touched_keys
+        return set(keys)
 
     def _build_control_findings(self, window_index: int, touched_keys):
         return self._build_findings(
@@ -613,73 +1147,25 @@ class Diagnoser:
         tracker_map: Dict[Tuple[str, str], Any],
         total_windows: int,
     ):
-        contributing_facts = [(fact_type, scope)]
-        layer, _ = self._split_scope(scope)
+        from .motifs import MotifContext
 
-        # warmup_transient: high severity in first 1-2 windows, declining after
-        if onset_window <= 1 and trend_direction == "improving" and prevalence < 0.4:
-            return "warmup_transient", "none", 0.7, contributing_facts
-
-        if fact_type == "excessive_metadata_access":
-            if layer == "reader_posix" and prevalence > 0.5 and persistence > 2:
-                return "metadata_bound", "metadata_reduction", 0.8, contributing_facts
-            if layer == "checkpoint_posix" and prevalence > 0.3 and persistence > 1:
-                return "checkpoint_metadata_overhead", "checkpoint_metadata_reduction", 0.75, contributing_facts
-
-        if fact_type in {"small_read_dominance", "small_write_dominance"}:
-            if layer == "reader_posix" and prevalence > 0.5 and persistence > 3:
-                return "small_io_input_pressure", "investigate_small_io_reader", 0.8, contributing_facts
-            if layer == "checkpoint_posix" and fact_type == "small_write_dominance" and prevalence > 0.3 and persistence > 2:
-                return "checkpoint_fragmentation", "checkpoint_io_batching", 0.8, contributing_facts
-
-        if fact_type in {"operation_imbalance", "size_imbalance"}:
-            paired_fact_type = "size_imbalance" if fact_type == "operation_imbalance" else "operation_imbalance"
-            paired_tracker = tracker_map.get((paired_fact_type, scope))
-            if paired_tracker and paired_tracker.observations:
-                current_side = self._dominant_imbalance_side(fact_type, tracker.observations[-1])
-                paired_side = self._dominant_imbalance_side(paired_fact_type, paired_tracker.observations[-1])
-                joint_prevalence = min(
-                    prevalence,
-                    paired_tracker.prevalence(total_windows=total_windows),
-                )
-                joint_persistence = min(persistence, paired_tracker.persistence())
-                if (
-                    current_side
-                    and paired_side
-                    and current_side == paired_side
-                    and joint_prevalence > 0.4
-                    and joint_persistence > 2
-                ):
-                    recommendation = (
-                        "checkpoint_io_batching"
-                        if layer == "checkpoint_posix" and current_side == "write"
-                        else f"investigate_{current_side}_heavy_phase"
-                    )
-                    motif = (
-                        "read_dominant_steady_state"
-                        if current_side == "read"
-                        else "write_dominant_steady_state"
-                    )
-                    confidence = 0.85 if joint_persistence > 3 else 0.75
-                    return motif, recommendation, confidence, [(fact_type, scope), (paired_fact_type, scope)]
-
-        # rank_skew_induced: co-occurrence of fetch_imbalance + straggler
-        all_fact_types = {k[0] for k, _ in self.state.all_trackers()}
-        if (
-            {"fetch_rank_imbalance", "epoch_straggler"}.issubset(all_fact_types)
-            and fact_type in ("fetch_rank_imbalance", "epoch_straggler")
-        ):
-            return "rank_skew_induced", "rank_balance_repartition", 0.75, contributing_facts
-
-        # checkpoint_tail_risk
-        if fact_type == "checkpoint_tail_skew" and prevalence > 0.3:
-            return "checkpoint_tail_risk", "checkpoint_io_batching", 0.65, contributing_facts
-
-        # persistent_pressure: prevalence > 0.5, persistence > 3 for pipeline pressure facts
-        if fact_type in {"fetch_pressure", "fetch_interval_pressure"} and prevalence > 0.5 and persistence > 3:
-            return "persistent_pressure", "input_pipeline_tuning", 0.8, contributing_facts
-
-        return "unclassified", "investigate", 0.5, contributing_facts
+        layer, _ = self._split_scope(scope)
+        return self.motif_classifier.classify(
+            MotifContext(
+                fact_type=fact_type,
+                scope=scope,
+                layer=layer,
+                tracker=tracker,
+                prevalence=prevalence,
+                persistence=persistence,
+                onset_window=onset_window,
+                trend_direction=trend_direction,
+                tracker_map=tracker_map,
+                total_windows=total_windows,
+                fact_types=self.state.fact_types(),
+                fact_type_windows=self.state.fact_type_windows(),
+            )
+        )
 
     def _publish_findings(self, producer, findings, publish_mode: str):
         """Publish DiagnosisFindings to Mofka for optimizer consumption."""
@@ -703,7 +1189,7 @@ class Diagnoser:
                 "window_index": finding.trend.last_seen_window,
                 "publish_mode": publish_mode,
             }
-            payload = json.dumps(payload_dict).encode("utf-8")
+            payload = self.dumps(payload_dict)
             metadata = {
                 "type": "diagnosis_finding",
                 "finding_type": finding.finding_type,
@@ -714,7 +1200,7 @@ class Diagnoser:
             }
             try:
                 producer.push(metadata=metadata, data=payload)
-                logger.info(
+                self.hot_log.maybe_log(
                     "diagnoser.finding.published",
                     finding_type=finding.finding_type,
                     scope=finding.scope,
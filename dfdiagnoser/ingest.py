@@ -0,0 +1,244 @@
+"""Fast ingestion of ``analysis_facts`` envelopes into the state store.
+
+Envelopes arrive either as UTF-8 JSON (``{"view_type": ..., "facts": [...]}``)
+or, when ``metadata["encoding"] == "arrow"``, as an Arrow IPC stream with one
+row per fact. Arrow envelopes carry the same fields as columns (``scope``,
+``severity``, ``window`` and ``evidence`` as struct columns) and the view type
+in the schema metadata. Columns are looked up by name, so producers may add
+or drop fields without breaking older diagnosers.
+"""
+import json
+import sys
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .state import FactObservation
+
+
+FactKey = Tuple[str, str]
+
+ENCODING_JSON = "json"
+ENCODING_ARROW = "arrow"
+ARROW_VIEW_TYPE_KEY = b"view_type"
+# Interned keys kept before the caches are reset, bounding memory when
+# entities keep changing over a long-running stream
+MAX_INTERNED_KEYS = 1 << 16
+
+
+def _load_json_loads() -> Tuple[str, Callable[[bytes], Any]]:
+    try:
+        import orjson
+    except ModuleNotFoundError:
+        return "json", lambda payload: json.loads(payload.decode("utf-8"))
+
+    def loads(payload: bytes) -> Any:
+        try:
+            return orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            # orjson rejects the NaN/Infinity tokens stdlib json.dumps emits
+            return json.loads(payload.decode("utf-8"))
+
+    return "orjson", loads
+
+
+JSON_BACKEND, json_loads = _load_json_loads()
+
+
+class FactIngestor:
+    """Normalizes the facts of an envelope into tracker keys and observations.
+
+    Scope keys and ``(fact_type, scope)`` keys are interned across envelopes,
+    so repeated facts reuse the same string and tuple objects and hash
+    lookups in the state store hit identical keys. Each cache is cleared
+    once it holds ``max_keys`` entries.
+    """
+
+    def __init__(self, max_keys: int = MAX_INTERNED_KEYS):
+        self.max_keys = max_keys
+        self._scope_keys: Dict[Tuple[Optional[str], str, str], str] = {}
+        self._keys: Dict[Tuple[str, str], FactKey] = {}
+
+    def scope_key(self, scope: Any, view_type: str) -> str:
+        # scope is a nested dict: {"entity": str, "layer": str|null, ...}
+        # For per_row facts, entity is the row index (e.g., "0", "1") which
+        # changes every epoch — use view_type instead so the same fact_type
+        # accumulates into one tracker for longitudinal persistence tracking.
+        if not isinstance(scope, dict):
+            return sys.intern(str(scope))
+        layer = scope.get("layer")
+        entity = scope.get("entity", "global")
+        if not isinstance(entity, str):
+            entity = str(entity)
+        cache_key = (layer, entity, view_type)
+        scope_key = self._scope_keys.get(cache_key)
+        if scope_key is None:
+            # Numeric entities are per-row indices; use view_type for tracking
+            scope_key = view_type if entity.isdigit() else entity
+            if layer:
+                scope_key = f"{layer}:{scope_key}"
+            scope_key = sys.intern(scope_key)
+            if len(self._scope_keys) >= self.max_keys:
+                self._scope_keys.clear()
+            self._scope_keys[cache_key] = scope_key
+        return scope_key
+
+    def key(self, fact_type: str, scope_key: str) -> FactKey:
+        raw = (fact_type, scope_key)
+        key = self._keys.get(raw)
+        if key is None:
+            key = (sys.intern(fact_type), scope_key)
+            if len(self._keys) >= self.max_keys:
+                self._keys.clear()
+            self._keys[raw] = key
+        return key
+
+    def ingest(
+        self, envelope: Dict[str, Any], window_index: int
+    ) -> Tuple[List[FactKey], List[FactObservation]]:
+        view_type = envelope.get("view_type", "global")
+        keys = []
+        observations = []
+        for fact in envelope.get("facts", []):
+            # severity is a nested dict: {"score": float, "label": str, ...}
+            severity = fact.get("severity", {})
+            if isinstance(severity, dict):
+                severity_score = severity.get("score", 0)
+                severity_label = severity.get("label", "unknown")
+            else:
+                severity_score = float(severity) if severity else 0
+                severity_label = "unknown"
+
+            # window may have epoch info
+            window = fact.get("window", {})
+            epoch = window.get("epoch") if isinstance(window, dict) else None
+
+            keys.append(
+                self.key(
+                    fact.get("fact_type", "unknown"),
+                    self.scope_key(fact.get("scope", "global"), view_type),
+                )
+            )
+            observations.append(
+                FactObservation(
+                    window_index=window_index,
+                    epoch=epoch,
+                    severity_score=severity_score,
+                    severity_label=severity_label,
+                    evidence=fact.get("evidence", {}),
+                    opportunity_tags=fact.get("opportunity_tags", []),
+                )
+            )
+        return keys, observations
+
+    def ingest_arrow(
+        self, table, window_index: int
+    ) -> Tuple[List[FactKey], List[FactObservation]]:
+        """Ingest an Arrow envelope table column by column."""
+        n_rows = table.num_rows
+        if n_rows == 0:
+            return [], []
+        view_type = arrow_view_type(table, "global")
+
+        fact_types = _column(table, "fact_type", n_rows, "unknown")
+        layers = _struct_field(table, "scope", "layer", n_rows)
+        entities = _struct_field(table, "scope", "entity", n_rows)
+        scopes = None
+        if "scope" in table.column_names and not _is_struct(table, "scope"):
+            scopes = table.column("scope").to_pylist()
+        scores = _struct_field(table, "severity", "score", n_rows)
+        labels = _struct_field(table, "severity", "label", n_rows)
+        epochs = _struct_field(table, "window", "epoch", n_rows)
+        evidence = _column(table, "evidence", n_rows, None)
+        tags = _column(table, "opportunity_tags", n_rows, None)
+
+        keys = []
+        observations = []
+        for i in range(n_rows):
+            if scopes is not None:
+                scope = scopes[i] if scopes[i] is not None else "global"
+            else:
+                entity = entities[i]
+                scope = {
+                    "layer": layers[i],
+                    "entity": "global" if entity is None else entity,
+                }
+            keys.append(
+                self.key(fact_types[i] or "unknown", self.scope_key(scope, view_type))
+            )
+            observations.append(
+                FactObservation(
+                    window_index=window_index,
+                    epoch=epochs[i],
+                    severity_score=scores[i] if scores[i] is not None else 0,
+                    severity_label=labels[i] if labels[i] is not None else "unknown",
+                    evidence=evidence[i] if evidence[i] is not None else {},
+                    opportunity_tags=tags[i] if tags[i] is not None else [],
+                )
+            )
+        return keys, observations
+
+
+def arrow_view_type(table, default: str) -> str:
+    view_type = (table.schema.metadata or {}).get(ARROW_VIEW_TYPE_KEY)
+    return view_type.decode("utf-8") if view_type is not None else default
+
+
+def _is_struct(table, name: str) -> bool:
+    import pyarrow as pa
+
+    return pa.types.is_struct(table.schema.field(name).type)
+
+
+def _column(table, name: str, n_rows: int, default: Any) -> List[Any]:
+    if name not in table.column_names:
+        return [default] * n_rows
+    return table.column(name).to_pylist()
+
+
+def _struct_field(table, name: str, field: str, n_rows: int) -> List[Any]:
+    import pyarrow.compute as pc
+
+    if name not in table.column_names or not _is_struct(table, name):
+        return [None] * n_rows
+    if table.schema.field(name).type.get_field_index(field) < 0:
+        return [None] * n_rows
+    return pc.struct_field(table.column(name), field).to_pylist()
+
+
+def decode_arrow_envelope(payload: bytes):
+    import pyarrow as pa
+
+    with pa.ipc.open_stream(pa.py_buffer(payload)) as reader:
+        return reader.read_all()
+
+
+def encode_arrow_envelope(facts: List[Dict[str, Any]], view_type: str) -> bytes:
+    """Encode facts as an Arrow IPC stream envelope (one row per fact)."""
+    import pyarrow as pa
+
+    table = pa.Table.from_pylist(facts)
+    table = table.replace_schema_metadata(
+        {ARROW_VIEW_TYPE_KEY: view_type.encode("utf-8")}
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def summarize_facts(
+    keys: List[FactKey], observations: List[FactObservation]
+) -> Dict[str, Any]:
+    """Aggregate per-envelope fact statistics for a single log line."""
+    if not keys:
+        return {"fact_count": 0}
+    peak = max(range(len(observations)), key=lambda i: observations[i].severity_score)
+    peak_fact_type, peak_scope = keys[peak]
+    return {
+        "fact_count": len(keys),
+        "tracker_count": len(set(keys)),
+        "fact_types": dict(Counter(fact_type for fact_type, _ in keys)),
+        "severity_labels": dict(Counter(obs.severity_label for obs in observations)),
+        "max_severity_score": round(float(observations[peak].severity_score), 3),
+        "max_severity_fact": f"{peak_fact_type}({peak_scope})",
+    }
@@ -14,3 +14,9 @@ class MofkaInput:
     idle_timeout_sec: int = 0
     pull_timeout_ms: int = 1000
     output_topic: str = ""
+    state_dir: str = ""
+    snapshot_interval_events: int = 0
+    snapshot_interval_sec: float = 0
+    journal: bool = False
+    journal_fsync_records: int = 256
+    journal_fsync_interval_sec: float = 1.0
@@ -0,0 +1,306 @@
+"""Write-ahead journal of diagnosis state changes.
+
+The journal complements state snapshots: every ``FactObservation`` recorded
+and every window boundary is appended to a segment file as a binary frame::
+
+    <record_type: u8> <payload_len: u32> <crc32(payload): u32> <payload>
+
+Writes are buffered and fsynced in batches. Segments are sealed on rotation
+and folded into the snapshot by a background compactor, so recovery is the
+latest snapshot plus a short journal tail.
+
+Scored-view summaries are not journaled: the live store's summary table as
+of each seal is handed to the compactor and written into the snapshot, so a
+crash loses only the summaries recorded since the last seal.
+"""
+import glob
+import json
+import os
+import queue
+import re
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import structlog
+
+from .state import SNAPSHOT_FILENAME, DiagnosisStateStore, FactObservation
+from .summaries import ScoredSummaryTable
+
+
+logger = structlog.get_logger()
+
+RECORD_FACT = 1
+RECORD_WINDOW = 2
+RECORD_POSITION = 3
+
+_FRAME_HEADER = struct.Struct("<BII")
+_WINDOW_PAYLOAD = struct.Struct("<q")
+_SEGMENT_RE = re.compile(r"journal_(\d{8})\.wal$")
+
+
+def _segment_path(state_dir: str, seq: int) -> str:
+    return os.path.join(state_dir, f"journal_{seq:08d}.wal")
+
+
+def list_segments(state_dir: str) -> List[Tuple[int, str]]:
+    """Journal segments in ``state_dir`` as sorted ``(seq, path)`` pairs."""
+    segments = []
+    for path in glob.glob(os.path.join(state_dir, "journal_*.wal")):
+        match = _SEGMENT_RE.search(path)
+        if match:
+            segments.append((int(match.group(1)), path))
+    return sorted(segments)
+
+
+def encode_fact(key: Tuple[str, str], obs: FactObservation) -> bytes:
+    return json.dumps(
+        [
+            key[0],
+            key[1],
+            obs.window_index,
+            obs.epoch,
+            obs.severity_score,
+            obs.severity_label,
+            obs.evidence,
+            obs.opportunity_tags,
+        ],
+        default=str,
+    ).encode("utf-8")
+
+
+def decode_fact(payload: bytes) -> Tuple[Tuple[str, str], FactObservation]:
+    fact_type, scope, window_index, epoch, score, label, evidence, tags = json.loads(payload)
+    obs = FactObservation(
+        window_index=window_index,
+        epoch=epoch,
+        severity_score=score,
+        severity_label=label,
+        evidence=evidence,
+        opportunity_tags=tags,
+    )
+    return (fact_type, scope), obs
+
+
+def read_segment(path: str) -> Iterator[Tuple[int, bytes]]:
+    """Yield ``(record_type, payload)`` frames, stopping at a torn tail."""
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    while offset + _FRAME_HEADER.size <= len(data):
+        record_type, length, crc = _FRAME_HEADER.unpack_from(data, offset)
+        start = offset + _FRAME_HEADER.size
+        payload = data[start:start + length]
+        if len(payload) != length or zlib.crc32(payload) != crc:
+            logger.warning("journal.segment.torn", path=path, offset=offset)
+            return
+        yield record_type, payload
+        offset = start + length
+
+
+def replay_segment(store: DiagnosisStateStore, path: str) -> Optional[Dict[str, Any]]:
+    """Apply a segment to ``store``; return the last position it recorded.
+
+    An event's facts and window boundary are journaled before its position,
+    so records are only applied once the position that commits them is read.
+    A tail without a position belongs to an event that will be redelivered
+    and is dropped.
+    """
+    position = None
+    pending: List[Tuple[int, Any]] = []
+    for record_type, payload in read_segment(path):
+        if record_type == RECORD_FACT:
+            pending.append((record_type, decode_fact(payload)))
+        elif record_type == RECORD_WINDOW:
+            pending.append((record_type, _WINDOW_PAYLOAD.unpack(payload)[0]))
+        elif record_type == RECORD_POSITION:
+            for pending_type, record in pending:
+                if pending_type == RECORD_FACT:
+                    store.record_fact(*record)
+                else:
+                    store.current_window = record - 1
+                    store.advance_window()
+            pending.clear()
+            position = json.loads(payload)
+    if pending:
+        logger.warning("journal.segment.uncommitted", path=path, records=len(pending))
+    return position
+
+
+def recover_state(state_dir: str) -> Tuple[DiagnosisStateStore, Dict[str, Any]]:
+    """Rebuild state from the latest snapshot plus the journal tail.
+
+    The returned position is the last one journaled, with ``journal_seq``
+    set to the last segment already compacted into the snapshot.
+    """
+    snapshot_path = os.path.join(state_dir, SNAPSHOT_FILENAME)
+    if os.path.exists(snapshot_path):
+        store, position = DiagnosisStateStore.load_snapshot(snapshot_path)
+    else:
+        store, position = DiagnosisStateStore(), {}
+    compacted_seq = position.get("journal_seq", -1)
+    for seq, path in list_segments(state_dir):
+        if seq <= compacted_seq:
+            continue
+        segment_position = replay_segment(store, path)
+        if segment_position is not None:
+            position = {**segment_position, "journal_seq": compacted_seq}
+    return store, position
+
+
+def compact(
+    state_dir: str, upto_seq: int, scored_summaries: Optional[Dict[str, Any]] = None
+) -> Optional[str]:
+    """Fold sealed segments up to ``upto_seq`` into the snapshot.
+
+    Works purely from files on disk, so it never touches the live store.
+    ``scored_summaries`` (``ScoredSummaryTable.to_dict()`` of the live store
+    when ``upto_seq`` was sealed) replaces the snapshot's summary table.
+    """
+    snapshot_path = os.path.join(state_dir, SNAPSHOT_FILENAME)
+    if os.path.exists(snapshot_path):
+        store, position = DiagnosisStateStore.load_snapshot(snapshot_path)
+    else:
+        store, position = DiagnosisStateStore(), {}
+    compacted_seq = position.get("journal_seq", -1)
+    segments = [
+        (seq, path)
+        for seq, path in list_segments(state_dir)
+        if compacted_seq < seq <= upto_seq
+    ]
+    if not segments:
+        return None
+    for _, path in segments:
+        segment_position = replay_segment(store, path)
+        if segment_position is not None:
+            position = segment_position
+    if scored_summaries is not None:
+        store.scored_summaries = ScoredSummaryTable.from_dict(scored_summaries)
+    position = {**position, "journal_seq": upto_seq}
+    store.save_snapshot(snapshot_path, position=position)
+    for _, path in segments:
+        os.remove(path)
+    return snapshot_path
+
+
+class FactJournal:
+    """Append-only journal writer with batched fsync."""
+
+    def __init__(
+        self,
+        state_dir: str,
+        fsync_every_records: int = 256,
+        fsync_interval_sec: float = 1.0,
+        min_seq: int = 0,
+    ):
+        os.makedirs(state_dir, exist_ok=True)
+        self.state_dir = state_dir
+        self.fsync_every_records = fsync_every_records
+        self.fsync_interval_sec = fsync_interval_sec
+        segments = list_segments(state_dir)
+        # Never append to an existing segment: it may end in a torn frame.
+        # ``min_seq`` keeps numbering past segments already compacted away.
+        self.seq = max(min_seq, segments[-1][0] + 1 if segments else 0)
+        self._file = open(_segment_path(state_dir, self.seq), "ab")
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _append(self, record_type: int, payload: bytes):
+        self._file.write(_FRAME_HEADER.pack(record_type, len(payload), zlib.crc32(payload)))
+        self._file.write(payload)
+        self._unsynced += 1
+
+    def append_fact(self, key: Tuple[str, str], obs: FactObservation):
+        self._append(RECORD_FACT, encode_fact(key, obs))
+
+    def append_window(self, current_window: int):
+        self._append(RECORD_WINDOW, _WINDOW_PAYLOAD.pack(current_window))
+
+    def append_position(self, position: Dict[str, Any]):
+        self._append(RECORD_POSITION, json.dumps(position, default=str).encode("utf-8"))
+
+    def sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def maybe_sync(self) -> bool:
+        """Fsync if the record or time batch is full; return whether it did."""
+        if not self._unsynced:
+            return False
+        if (
+            self._unsynced >= self.fsync_every_records
+            or time.monotonic() - self._last_sync >= self.fsync_interval_sec
+        ):
+            self.sync()
+            return True
+        return False
+
+    def rotate(self) -> int:
+        """Seal the active segment and start a new one; return the sealed seq."""
+        self.sync()
+        self._file.close()
+        sealed = self.seq
+        self.seq += 1
+        self._file = open(_segment_path(self.state_dir, self.seq), "ab")
+        return sealed
+
+    def close(self) -> int:
+        """Sync and close the active segment; return its (now sealed) seq."""
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+        return self.seq
+
+
+class JournalCompactor:
+    """Runs :func:`compact` on a background thread.
+
+    Requests are coalesced: only the newest sealed sequence (and the
+    summaries submitted with it) matters, since compacting up to it also
+    covers every earlier segment.
+    """
+
+    def __init__(self, state_dir: str):
+        self.state_dir = state_dir
+        self._requests: "queue.Queue[Optional[Tuple[int, Optional[Dict[str, Any]]]]]" = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name="dfdiagnoser-journal-compactor", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, upto_seq: int, scored_summaries: Optional[Dict[str, Any]] = None):
+        self._requests.put((upto_seq, scored_summaries))
+
+    def close(self, timeout: Optional[float] = None):
+        self._requests.put(None)
+        self._thread.join(timeout=timeout)
+
+    def _run(self):
+        while True:
+            request = self._requests.get()
+            stop = request is None
+            # Drain queued requests and compact once up to the newest one
+            while not self._requests.empty():
+                queued = self._requests.get()
+                if queued is None:
+                    stop = True
+                elif request is None or queued[0] >= request[0]:
+                    request = queued
+            if request is not None:
+                upto_seq, scored_summaries = request
+                start = time.perf_counter()
+                try:
+                    compact(self.state_dir, upto_seq, scored_summaries)
+                    logger.info(
+                        "journal.compacted",
+                        upto_seq=upto_seq,
+                        elapsed=round(time.perf_counter() - start, 4),
+                    )
+                except Exception:
+                    logger.exception("journal.compact_failed", upto_seq=upto_seq)
+            if stop:
+                return
@@ -0,0 +1,266 @@
+"""Manifest of a checkpoint directory's files and flat view footers.
+
+The manifest records, for every ``_raw_stats_*.json`` and
+``_flat_view_*.parquet`` file, its size and mtime and, for flat views, the
+schema fingerprint, column names, row count and per-row-group min/max
+statistics. It is written next to the checkpoint as ``MANIFEST_FILENAME``
+(or only kept in memory when the directory is read-only).
+
+Planning a diagnosis from a manifest is a single stat pass: the directory
+itself (whose mtime changes when files are added or removed) and every
+listed file are stat'ed and compared with the recorded signatures. Any
+mismatch rebuilds the manifest from one directory scan and footer reads.
+"""
+import dataclasses as dc
+import hashlib
+import json
+import os
+import stat
+import threading
+import uuid
+from typing import Any, Dict, List, Optional
+
+import structlog
+
+
+logger = structlog.get_logger()
+
+MANIFEST_VERSION = 1
+MANIFEST_FILENAME = "_dfdiagnoser_manifest.json"
+RAW_STATS_PREFIX, RAW_STATS_SUFFIX = "_raw_stats_", ".json"
+FLAT_VIEW_PREFIX, FLAT_VIEW_SUFFIX = "_flat_view_", ".parquet"
+
+
+@dc.dataclass
+class FileEntry:
+    name: str
+    size: int
+    mtime_ns: int
+
+    @property
+    def signature(self) -> str:
+        return f"stat:{self.size}:{self.mtime_ns}"
+
+
+@dc.dataclass
+class FlatViewEntry(FileEntry):
+    schema_fingerprint: str = ""
+    num_rows: int = 0
+    index_columns: List[str] = dc.field(default_factory=list)
+    columns: List[str] = dc.field(default_factory=list)
+    # One {"num_rows": n, "stats": {column: [min, max]}} per row group
+    row_groups: List[Dict[str, Any]] = dc.field(default_factory=list)
+
+
+@dc.dataclass
+class CheckpointManifest:
+    checkpoint_dir: str
+    dir_mtime_ns: int
+    raw_stats: List[FileEntry] = dc.field(default_factory=list)
+    flat_views: List[FlatViewEntry] = dc.field(default_factory=list)
+    version: int = MANIFEST_VERSION
+
+    @property
+    def raw_stats_paths(self) -> List[str]:
+        return [os.path.join(self.checkpoint_dir, entry.name) for entry in self.raw_stats]
+
+    @property
+    def flat_view_paths(self) -> List[str]:
+        return [os.path.join(self.checkpoint_dir, entry.name) for entry in self.flat_views]
+
+    def flat_view(self, path: str) -> Optional[FlatViewEntry]:
+        name = os.path.basename(path)
+        return next((entry for entry in self.flat_views if entry.name == name), None)
+
+    def is_valid(self, dir_stat: Optional[os.stat_result] = None) -> bool:
+        """Whether every recorded signature still matches the file system."""
+        if self.version != MANIFEST_VERSION:
+            return False
+        if dir_stat is None:
+            dir_stat = os.stat(self.checkpoint_dir)
+        if dir_stat.st_mtime_ns != self.dir_mtime_ns:
+            return False
+        for entry in [*self.raw_stats, *self.flat_views]:
+            try:
+                file_stat = os.stat(os.path.join(self.checkpoint_dir, entry.name))
+            except FileNotFoundError:
+                return False
+            if (file_stat.st_size, file_stat.st_mtime_ns) != (entry.size, entry.mtime_ns):
+                return False
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = dc.asdict(self)
+        # The manifest stays valid if the checkpoint directory is moved
+        data.pop("checkpoint_dir")
+        return data
+
+    @classmethod
+    def from_dict(cls, checkpoint_dir: str, data: Dict[str, Any]) -> "CheckpointManifest":
+        return cls(
+            checkpoint_dir=checkpoint_dir,
+            dir_mtime_ns=data["dir_mtime_ns"],
+            raw_stats=[FileEntry(**entry) for entry in data["raw_stats"]],
+            flat_views=[FlatViewEntry(**entry) for entry in data["flat_views"]],
+            version=data.get("version", 0),
+        )
+
+
+def schema_fingerprint(schema) -> str:
+    """Hash of an Arrow schema's field names and types."""
+    return hashlib.sha1(schema.remove_metadata().to_string().encode("utf-8")).hexdigest()
+
+
+def row_group_stats(metadata) -> List[Dict[str, Any]]:
+    """Numeric min/max per column of every row group in a parquet footer.
+
+    All-null columns are recorded as ``[None, None]``; columns without
+    statistics are left out.
+    """
+    row_groups = []
+    for i in range(metadata.num_row_groups):
+        row_group = metadata.row_group(i)
+        stats = {}
+        for j in range(row_group.num_columns):
+            column = row_group.column(j)
+            statistics = column.statistics
+            if statistics is None:
+                continue
+            if not statistics.has_min_max:
+                if statistics.has_null_count and statistics.null_count == row_group.num_rows:
+                    stats[column.path_in_schema] = [None, None]
+                continue
+            low, high = statistics.min, statistics.max
+            if isinstance(low, (int, float)) and not isinstance(low, bool):
+                stats[column.path_in_schema] = [low, high]
+        row_groups.append({"num_rows": row_group.num_rows, "stats": stats})
+    return row_groups
+
+
+def _flat_view_entry(path: str, name: str, file_stat: os.stat_result) -> FlatViewEntry:
+    import pyarrow.parquet as pq
+
+    metadata = pq.read_metadata(path)
+    schema = metadata.schema.to_arrow_schema()
+    pandas_metadata = schema.pandas_metadata or {}
+    index_columns = [
+        c for c in pandas_metadata.get("index_columns", []) if isinstance(c, str)
+    ]
+    return FlatViewEntry(
+        name=name,
+        size=file_stat.st_size,
+        mtime_ns=file_stat.st_mtime_ns,
+        schema_fingerprint=schema_fingerprint(schema),
+        num_rows=metadata.num_rows,
+        index_columns=index_columns,
+        columns=[c for c in schema.names if c not in index_columns],
+        row_groups=row_group_stats(metadata),
+    )
+
+
+def build_manifest(checkpoint_dir: str) -> CheckpointManifest:
+    """Scan ``checkpoint_dir`` once and read the footer of every flat view."""
+    raw_stats: List[FileEntry] = []
+    flat_views: List[FlatViewEntry] = []
+    with os.scandir(checkpoint_dir) as entries:
+        for entry in sorted(entries, key=lambda e: e.name):
+            name = entry.name
+            if name.startswith(RAW_STATS_PREFIX) and name.endswith(RAW_STATS_SUFFIX):
+                file_stat = entry.stat()
+                raw_stats.append(FileEntry(name, file_stat.st_size, file_stat.st_mtime_ns))
+            elif name.startswith(FLAT_VIEW_PREFIX) and name.endswith(FLAT_VIEW_SUFFIX):
+                flat_views.append(_flat_view_entry(entry.path, name, entry.stat()))
+    return CheckpointManifest(
+        checkpoint_dir=checkpoint_dir,
+        dir_mtime_ns=os.stat(checkpoint_dir).st_mtime_ns,
+        raw_stats=raw_stats,
+        flat_views=flat_views,
+    )
+
+
+def load_manifest(checkpoint_dir: str) -> Optional[CheckpointManifest]:
+    try:
+        with open(os.path.join(checkpoint_dir, MANIFEST_FILENAME), "r") as f:
+            return CheckpointManifest.from_dict(checkpoint_dir, json.load(f))
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logger.warning("checkpoint.manifest.corrupt", checkpoint_dir=checkpoint_dir, exc_info=True)
+        return None
+
+
+def write_manifest(manifest: CheckpointManifest) -> bool:
+    """Write ``manifest`` next to its checkpoint; ``False`` if the directory is read-only."""
+    path = os.path.join(manifest.checkpoint_dir, MANIFEST_FILENAME)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    replaced = False
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(manifest.to_dict(), f)
+        os.replace(tmp_path, path)
+        replaced = True
+        # Creating the file touched the directory: record the new mtime and
+        # rewrite the file in place, which leaves the directory mtime alone
+        manifest.dir_mtime_ns = os.stat(manifest.checkpoint_dir).st_mtime_ns
+        with open(path, "w") as f:
+            json.dump(manifest.to_dict(), f)
+    except OSError:
+        logger.warning("checkpoint.manifest.write_failed", path=path, exc_info=True)
+        # Never leave a partially rewritten manifest (or the staging file) behind
+        try:
+            os.remove(path if replaced else tmp_path)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+class ManifestIndex:
+    """Validated checkpoint manifests, memoized per directory.
+
+    ``plan`` returns a manifest that matches the directory: the in-memory
+    copy or the one on disk if it is still valid, otherwise a rebuilt one
+    (written back when ``write`` is set).
+    """
+
+    def __init__(self, write: bool = True):
+        self.write = write
+        self.rebuilds = 0
+        self._manifests: Dict[str, CheckpointManifest] = {}
+        self._lock = threading.Lock()
+
+    def plan(self, checkpoint_dir: str) -> CheckpointManifest:
+        checkpoint_dir = os.path.abspath(checkpoint_dir)
+        try:
+            dir_stat = os.stat(checkpoint_dir)
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"Checkpoint directory {checkpoint_dir} does not exist"
+            ) from None
+        if not stat.S_ISDIR(dir_stat.st_mode):
+            raise NotADirectoryError(
+                f"Checkpoint directory {checkpoint_dir} is not a directory"
+            )
+        with self._lock:
+            manifest, source = self._manifests.get(checkpoint_dir), "memory"
+            if manifest is None or not manifest.is_valid(dir_stat):
+                manifest, source = load_manifest(checkpoint_dir), "file"
+                if manifest is not None and not manifest.is_valid(dir_stat):
+                    manifest = None
+            if manifest is None:
+                manifest, source = build_manifest(checkpoint_dir), "scan"
+                self.rebuilds += 1
+                if self.write and (manifest.raw_stats or manifest.flat_views):
+                    write_manifest(manifest)
+            self._manifests[checkpoint_dir] = manifest
+        logger.debug(
+            "checkpoint.manifest.planned",
+            checkpoint_dir=checkpoint_dir,
+            source=source,
+            flat_views=len(manifest.flat_views),
+        )
+        return manifest
+
+    def clear(self):
+        with self._lock:
+            self._manifests.clear()
@@ -0,0 +1,299 @@
+"""In-process metrics: counters, gauges and latency histograms.
+
+Histograms use HDR-style log-linear buckets: every power of two between
+``MIN_VALUE`` and ``MAX_VALUE`` seconds is split into ``SUB_BUCKETS``
+geometric sub-buckets, so recording is an O(1) index computation and
+quantiles are accurate to a few percent at any scale. The registry can be
+rendered as Prometheus text (served by ``MetricsServer``) or as JSON
+(written periodically by ``MetricsDumper``).
+"""
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import structlog
+
+
+logger = structlog.get_logger()
+
+MIN_VALUE = 2.0 ** -20  # ~1 microsecond
+MAX_VALUE = 2.0 ** 10  # ~17 minutes
+SUB_BUCKETS = 4
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Optional[Dict[str, str]]) -> Labels:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    """A value that is either set explicitly or read from ``fn`` on export."""
+
+    def __init__(self, fn: Optional[Callable[[], float]] = None):
+        self._value = 0.0
+        self.fn = fn
+
+    def set(self, value: float):
+        self._value = value
+
+    @property
+    def value(self) -> float:
+        if self.fn is not None:
+            try:
+                return float(self.fn())
+            except Exception:
+                return math.nan
+        return self._value
+
+
+class Histogram:
+    def __init__(self):
+        self._n_octaves = int(math.log2(MAX_VALUE / MIN_VALUE))
+        # bucket 0 collects values below MIN_VALUE, the last one overflow
+        self.counts = [0] * (self._n_octaves * SUB_BUCKETS + 2)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def _index(self, value: float) -> int:
+        if value < MIN_VALUE:
+            return 0
+        index = 1 + int(math.log2(value / MIN_VALUE) * SUB_BUCKETS)
+        return min(index, len(self.counts) - 1)
+
+    @staticmethod
+    def upper_bound(index: int) -> float:
+        """Upper edge of bucket ``index`` in seconds."""
+        return MIN_VALUE * 2.0 ** (index / SUB_BUCKETS)
+
+    def record(self, value: float):
+        index = self._index(value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if value < self.min:
+                self.min = value
+            if value > self.max:
+                self.max = value
+
+    def quantile(self, q: float) -> float:
+        with self._lock:
+            if not self.count:
+                return math.nan
+            rank = q * self.count
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank and count:
+                    return min(self.upper_bound(index), self.max)
+            return self.max
+
+    def cumulative(self) -> Iterator[Tuple[float, int]]:
+        """``(le, count)`` pairs at every power-of-two boundary."""
+        with self._lock:
+            counts = list(self.counts)
+        seen = 0
+        for index, count in enumerate(counts[:-1]):
+            seen += count
+            if index % SUB_BUCKETS == 0:
+                yield self.upper_bound(index), seen
+
+    def summary(self) -> Dict[str, float]:
+        summary = {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "min": round(self.min, 6) if self.count else None,
+            "max": round(self.max, 6) if self.count else None,
+        }
+        for q in QUANTILES:
+            value = self.quantile(q)
+            summary[f"p{q * 100:g}"] = round(value, 6) if self.count else None
+        return summary
+
+
+class MetricsRegistry:
+    def __init__(self, namespace: str = "dfdiagnoser"):
+        self.namespace = namespace
+        self._metrics: Dict[Tuple[str, Labels], object] = {}
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind: str, factory, name: str, help: str, labels):
+        key = (name, _labels(labels))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = factory()
+                    self._metrics[key] = metric
+                    self._help.setdefault(name, (kind, help))
+        return metric
+
+    def counter(self, name: str, help: str = "", labels: Optional[Dict[str, str]] = None) -> Counter:
+        return self._get("counter", Counter, name, help, labels)
+
+    def gauge(
+        self,
+        name: str,
+        help: str = "",
+        labels: Optional[Dict[str, str]] = None,
+        fn: Optional[Callable[[], float]] = None,
+    ) -> Gauge:
+        gauge = self._get("gauge", Gauge, name, help, labels)
+        if fn is not None:
+            gauge.fn = fn
+        return gauge
+
+    def histogram(
+        self, name: str, help: str = "", labels: Optional[Dict[str, str]] = None
+    ) -> Histogram:
+        return self._get("histogram", Histogram, name, help, labels)
+
+    @contextmanager
+    def time(self, name: str, help: str = "", labels: Optional[Dict[str, str]] = None):
+        histogram = self.histogram(name, help, labels)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            histogram.record(time.perf_counter() - start)
+
+    def _sorted(self) -> List[Tuple[Tuple[str, Labels], object]]:
+        with self._lock:
+            return sorted(self._metrics.items(), key=lambda item: item[0])
+
+    def to_prometheus(self) -> str:
+        lines = []
+        described = set()
+        for (name, labels), metric in self._sorted():
+            full_name = f"{self.namespace}_{name}"
+            kind, help = self._help[name]
+            if name not in described:
+                described.add(name)
+                if help:
+                    lines.append(f"# HELP {full_name} {help}")
+                lines.append(f"# TYPE {full_name} {kind}")
+            if isinstance(metric, Histogram):
+                for le, count in metric.cumulative():
+                    lines.append(
+                        f"{full_name}_bucket{_format_labels(labels, ('le', f'{le:.9g}'))} {count}"
+                    )
+                lines.append(f"{full_name}_bucket{_format_labels(labels, ('le', '+Inf'))} {metric.count}")
+                lines.append(f"{full_name}_sum{_format_labels(labels)} {metric.sum:.9g}")
+                lines.append(f"{full_name}_count{_format_labels(labels)} {metric.count}")
+            else:
+                lines.append(f"{full_name}{_format_labels(labels)} {metric.value:.9g}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, object]:
+        """JSON-serializable view of every metric, keyed by name and labels."""
+        metrics: Dict[str, object] = {}
+        for (name, labels), metric in self._sorted():
+            key = name + _format_labels(labels)
+            if isinstance(metric, Histogram):
+                metrics[key] = metric.summary()
+            else:
+                value = metric.value
+                metrics[key] = None if math.isnan(value) else value
+        return {"timestamp": time.time(), "metrics": metrics}
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), sort_keys=True)
+
+    def write_json(self, path: str):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.to_json())
+        os.replace(tmp_path, path)
+
+
+class MetricsServer:
+    """Serves ``/metrics`` in Prometheus text format on a local port."""
+
+    def __init__(self, registry: MetricsRegistry, port: int, host: str = "127.0.0.1"):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="dfdiagnoser-metrics", daemon=True
+        )
+        self._thread.start()
+        logger.info("metrics.server.started", host=host, port=self.port)
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+
+class MetricsDumper:
+    """Writes the registry as JSON to ``path`` every ``interval_sec`` seconds."""
+
+    def __init__(self, registry: MetricsRegistry, path: str, interval_sec: float = 10):
+        self.registry = registry
+        self.path = path
+        self.interval_sec = max(interval_sec, 0.01)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="dfdiagnoser-metrics-dump", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_sec):
+            self._dump()
+
+    def _dump(self):
+        try:
+            self.registry.write_json(self.path)
+        except Exception:
+            logger.warning("metrics.dump.failed", path=self.path, exc_info=True)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self._dump()
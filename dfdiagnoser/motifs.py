@@ -0,0 +1,205 @@
+import dataclasses as dc
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from omegaconf import OmegaConf
+
+
+DEFAULT_MOTIF_DEFS_PATH = os.path.join(
+    os.path.dirname(__file__), "configs", "motif_defs", "default.yaml"
+)
+
+MotifResult = Tuple[str, str, float, List[Tuple[str, str]]]
+
+
+@dc.dataclass
+class MotifRule:
+    motif: str
+    recommendation: str
+    confidence: float
+    fact_types: Optional[List[str]] = None
+    layers: Optional[List[str]] = None
+    onset_window_max: Optional[int] = None
+    trend_direction: Optional[str] = None
+    prevalence_gt: Optional[float] = None
+    prevalence_lt: Optional[float] = None
+    persistence_gt: Optional[int] = None
+    pair: Optional[List[str]] = None
+    side: Optional[str] = None
+    boosted_confidence: Optional[float] = None
+    boost_persistence_gt: Optional[int] = None
+    co_occurs_with: Optional[List[str]] = None
+    co_occurrence_gt: Optional[float] = None
+    order: int = 0
+
+    def __post_init__(self):
+        if self.pair is not None:
+            if len(self.pair) != 2:
+                raise ValueError(f"Motif pair must have exactly two fact types: {self.pair}")
+            if self.fact_types is None:
+                self.fact_types = list(self.pair)
+        if self.co_occurrence_gt is not None and not self.co_occurs_with:
+            raise ValueError(f"Motif {self.motif}: co_occurrence_gt requires co_occurs_with")
+
+    def passes_thresholds(self, prevalence: float, persistence: int) -> bool:
+        if self.prevalence_gt is not None and not prevalence > self.prevalence_gt:
+            return False
+        if self.prevalence_lt is not None and not prevalence < self.prevalence_lt:
+            return False
+        if self.persistence_gt is not None and not persistence > self.persistence_gt:
+            return False
+        return True
+
+    def paired_fact_type(self, fact_type: str) -> str:
+        return self.pair[1] if fact_type == self.pair[0] else self.pair[0]
+
+
+@dc.dataclass
+class MotifContext:
+    """Per-finding inputs the classifier evaluates rules against."""
+
+    fact_type: str
+    scope: str
+    layer: Optional[str]
+    tracker: Any
+    prevalence: float
+    persistence: int
+    onset_window: int
+    trend_direction: str
+    tracker_map: Dict[Tuple[str, str], Any]
+    total_windows: int
+    fact_types: Any
+    fact_type_windows: Dict[str, Any] = dc.field(default_factory=dict)
+
+
+def load_default_motif_defs() -> Dict[str, Any]:
+    return OmegaConf.to_container(OmegaConf.load(DEFAULT_MOTIF_DEFS_PATH), resolve=True)
+
+
+class MotifClassifier:
+    """Classifies findings into motifs from a declarative rule table.
+
+    Rules are compiled into a dispatch index keyed by ``(fact_type, layer)``,
+    where ``None`` stands for "any". Candidate lists are merged in table order
+    on first use of a key, so classifying a finding is a dictionary lookup
+    followed by the threshold comparisons of the candidate rules.
+    """
+
+    def __init__(
+        self,
+        motif_defs: Optional[Dict[str, Any]] = None,
+        side_resolver: Optional[Callable[[str, Any], Optional[str]]] = None,
+    ):
+        if not motif_defs:
+            motif_defs = load_default_motif_defs()
+        fallback = motif_defs.get("fallback", {})
+        self.fallback = (
+            fallback.get("motif", "unclassified"),
+            fallback.get("recommendation", "investigate"),
+            float(fallback.get("confidence", 0.5)),
+        )
+        self.rules = [
+            MotifRule(order=i, **rule)
+            for i, rule in enumerate(motif_defs.get("rules", []))
+        ]
+        self.side_resolver = side_resolver or (lambda fact_type, observation: None)
+        self._index: Dict[Tuple[Optional[str], Optional[str]], List[MotifRule]] = {}
+        for rule in self.rules:
+            for fact_type in rule.fact_types or [None]:
+                for layer in rule.layers or [None]:
+                    self._index.setdefault((fact_type, layer), []).append(rule)
+        self._candidates: Dict[Tuple[str, Optional[str]], List[MotifRule]] = {}
+
+    def candidates(self, fact_type: str, layer: Optional[str]) -> List[MotifRule]:
+        key = (fact_type, layer)
+        rules = self._candidates.get(key)
+        if rules is None:
+            merged = {}
+            for index_key in (
+                (fact_type, layer),
+                (fact_type, None),
+                (None, layer),
+                (None, None),
+            ):
+                for rule in self._index.get(index_key, []):
+                    merged[rule.order] = rule
+            rules = [merged[order] for order in sorted(merged)]
+            self._candidates[key] = rules
+        return rules
+
+    def classify(self, ctx: MotifContext) -> MotifResult:
+        contributing_facts = [(ctx.fact_type, ctx.scope)]
+        for rule in self.candidates(ctx.fact_type, ctx.layer):
+            if rule.onset_window_max is not None and ctx.onset_window > rule.onset_window_max:
+                continue
+            if rule.trend_direction is not None and ctx.trend_direction != rule.trend_direction:
+                continue
+            if rule.co_occurs_with and not all(
+                fact_type in ctx.fact_types for fact_type in rule.co_occurs_with
+            ):
+                continue
+            if rule.co_occurrence_gt is not None and not (
+                self._co_occurrence(rule, ctx) > rule.co_occurrence_gt
+            ):
+                continue
+            if rule.pair is not None:
+                result = self._classify_pair(rule, ctx)
+                if result is not None:
+                    return result
+                continue
+            if not rule.passes_thresholds(ctx.prevalence, ctx.persistence):
+                continue
+            return rule.motif, rule.recommendation, rule.confidence, contributing_facts
+
+        motif, recommendation, confidence = self.fallback
+        return motif, recommendation, confidence, contributing_facts
+
+    @staticmethod
+    def _co_occurrence(rule: MotifRule, ctx: MotifContext) -> float:
+        """Fraction of the finding's windows in which every ``co_occurs_with``
+        fact type was observed as well."""
+        support = len(ctx.tracker.windows)
+        if not support:
+            return 0.0
+        shared = ctx.tracker.windows
+        for fact_type in rule.co_occurs_with:
+            windows = ctx.fact_type_windows.get(fact_type)
+            if windows is None:
+                return 0.0
+            shared = shared & windows
+        return len(shared) / support
+
+    def _classify_pair(self, rule: MotifRule, ctx: MotifContext) -> Optional[MotifResult]:
+        paired_fact_type = rule.paired_fact_type(ctx.fact_type)
+        paired_tracker = ctx.tracker_map.get((paired_fact_type, ctx.scope))
+        if not paired_tracker or not paired_tracker.observations:
+            return None
+
+        current_side = self.side_resolver(ctx.fact_type, ctx.tracker.observations[-1])
+        paired_side = self.side_resolver(paired_fact_type, paired_tracker.observations[-1])
+        if not current_side or current_side != paired_side:
+            return None
+        if rule.side is not None and current_side != rule.side:
+            return None
+
+        joint_prevalence = min(
+            ctx.prevalence,
+            paired_tracker.prevalence(total_windows=ctx.total_windows),
+        )
+        joint_persistence = min(ctx.persistence, paired_tracker.persistence())
+        if not rule.passes_thresholds(joint_prevalence, joint_persistence):
+            return None
+
+        confidence = rule.confidence
+        if (
+            rule.boosted_confidence is not None
+            and rule.boost_persistence_gt is not None
+            and joint_persistence > rule.boost_persistence_gt
+        ):
+            confidence = rule.boosted_confidence
+        return (
+            rule.motif.format(side=current_side),
+            rule.recommendation.format(side=current_side),
+            confidence,
+            [(ctx.fact_type, ctx.scope), (paired_fact_type, ctx.scope)],
+        )
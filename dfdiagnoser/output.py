@@ -1,8 +1,18 @@
+import hashlib
 import os
 import pandas as pd
-from typing import Optional
+import queue
+import structlog
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from .types import DiagnosisResult, FileOutputFormat
+from .serialization import NDJSONAppender, frame_to_json, frame_to_ndjson, get_backend
+from .types import DiagnosisResult, FileOutputFormat, FileOutputMode, JsonLayout
+
+
+logger = structlog.get_logger()
 
 
 class Output:
@@ -12,6 +22,9 @@ class Output:
     def handle_result(self, result: DiagnosisResult):
         pass
 
+    def close(self):
+        pass
+
 
 class ConsoleOutput(Output):
     def __init__(self):
@@ -21,14 +34,260 @@ class ConsoleOutput(Output):
         pass
 
 
+class ParquetDatasetWriter:
+    """Appends scored views as row groups to rolling parquet files.
+
+    Views are buffered per schema and written as one row group once
+    ``buffer_rows`` rows accumulate or the oldest buffered view is
+    ``max_buffer_sec`` seconds old. Each schema gets its own rolling
+    ``scored-<schema>-<part>.parquet`` file, rotated when it exceeds
+    ``max_file_bytes`` or has been open for ``max_file_sec`` seconds (a file
+    is only readable once rotated or closed). Age limits are checked on every
+    write, so a slow stream still reaches disk. The window index of each view
+    is stored as the ``window_index`` column.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        buffer_rows: int = 65536,
+        max_file_bytes: int = 256 * 1024 ** 2,
+        max_file_sec: float = 300,
+        compression: str = "zstd",
+        max_buffer_sec: float = 30,
+    ):
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.buffer_rows = buffer_rows
+        self.max_file_bytes = max_file_bytes
+        self.max_file_sec = max_file_sec
+        self.compression = compression
+        self.max_buffer_sec = max_buffer_sec
+        self._buffers: Dict[str, List] = {}
+        self._buffered_rows: Dict[str, int] = {}
+        self._buffered_since: Dict[str, float] = {}
+        self._writers: Dict[str, tuple] = {}
+        self._parts: Dict[str, int] = {}
+        self.paths: List[str] = []
+
+    @staticmethod
+    def _schema_key(schema) -> str:
+        fingerprint = "|".join(f"{f.name}:{f.type}" for f in schema)
+        return hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()[:12]
+
+    def write(self, df: pd.DataFrame, window_index: Optional[int] = None):
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        # Category codes are sized per view; fix them so views share a schema
+        for i, field in enumerate(table.schema):
+            if pa.types.is_dictionary(field.type) and field.type.index_type != pa.int32():
+                dictionary_type = pa.dictionary(pa.int32(), field.type.value_type)
+                table = table.set_column(
+                    i, field.with_type(dictionary_type), table.column(i).cast(dictionary_type)
+                )
+        table = table.append_column(
+            "window_index", pa.array([window_index] * table.num_rows, type=pa.int64())
+        )
+        key = self._schema_key(table.schema)
+        self._buffers.setdefault(key, []).append(table)
+        self._buffered_rows[key] = self._buffered_rows.get(key, 0) + table.num_rows
+        self._buffered_since.setdefault(key, time.monotonic())
+        if self._buffered_rows[key] >= self.buffer_rows:
+            self._flush_key(key)
+        self.flush_expired()
+
+    def flush_expired(self):
+        """Flush buffers older than ``max_buffer_sec`` and close files open
+        longer than ``max_file_sec``, for every schema."""
+        now = time.monotonic()
+        for key, since in list(self._buffered_since.items()):
+            if now - since >= self.max_buffer_sec:
+                self._flush_key(key)
+        for key, (_, _, opened_at) in list(self._writers.items()):
+            if now - opened_at >= self.max_file_sec:
+                self._close_writer(key)
+
+    def flush(self):
+        for key in list(self._buffers):
+            self._flush_key(key)
+
+    def close(self):
+        self.flush()
+        for key in list(self._writers):
+            self._close_writer(key)
+
+    def _flush_key(self, key: str):
+        import pyarrow as pa
+
+        tables = self._buffers.pop(key, [])
+        self._buffered_rows.pop(key, None)
+        self._buffered_since.pop(key, None)
+        if not tables:
+            return
+        table = pa.concat_tables(tables)
+        writer, path, opened_at = self._writer_for(key, table.schema)
+        writer.write_table(table, row_group_size=max(table.num_rows, 1))
+        if (
+            os.path.getsize(path) >= self.max_file_bytes
+            or time.monotonic() - opened_at >= self.max_file_sec
+        ):
+            self._close_writer(key)
+
+    def _writer_for(self, key: str, schema):
+        import pyarrow.parquet as pq
+
+        if key not in self._writers:
+            part = self._parts.get(key, 0)
+            self._parts[key] = part + 1
+            path = os.path.join(self.output_dir, f"scored-{key}-{part:05d}.parquet")
+            writer = pq.ParquetWriter(path, schema, compression=self.compression)
+            self._writers[key] = (writer, path, time.monotonic())
+            self.paths.append(path)
+        return self._writers[key]
+
+    def _close_writer(self, key: str):
+        writer, _, _ = self._writers.pop(key)
+        writer.close()
+
+
 class FileOutput(Output):
-    def __init__(self, output_dir: Optional[str] = None, output_format: FileOutputFormat = "json"):
+    def __init__(
+        self,
+        output_dir: Optional[str] = None,
+        output_format: FileOutputFormat = "json",
+        output_mode: FileOutputMode = "files",
+        json_layout: JsonLayout = "index",
+        json_backend: str = "auto",
+        dataset_buffer_rows: int = 65536,
+        dataset_max_file_bytes: int = 256 * 1024 ** 2,
+        dataset_max_file_sec: float = 300,
+        dataset_max_buffer_sec: float = 30,
+        writer_threads: int = 0,
+        queue_size: int = 8,
+    ):
         super().__init__()
         self.output_dir = output_dir
         self.output_format = output_format
+        self.output_mode = output_mode
+        if json_layout not in ("split", "index"):
+            raise ValueError(f"Unsupported JSON layout: {json_layout}")
+        self.json_layout = json_layout
+        # Resolve "auto" (and fail on unknown backends) up front
+        self.json_backend, _ = get_backend(json_backend)
+        self.dataset_buffer_rows = dataset_buffer_rows
+        self.dataset_max_file_bytes = dataset_max_file_bytes
+        self.dataset_max_file_sec = dataset_max_file_sec
+        self.dataset_max_buffer_sec = dataset_max_buffer_sec
+        self.writer_threads = writer_threads
+        self.queue_size = queue_size
         self._seq = 0
+        self._rollup_seq = 0
+        self._created_dirs = set()
+        self._dataset_writer: Optional[ParquetDatasetWriter] = None
+        self._dataset_lock = threading.Lock()
+        self._appender: Optional[NDJSONAppender] = None
+        self._stats_lock = threading.Lock()
+        # Guards path planning (sequence numbers, created directories) when
+        # results are handed in from several threads
+        self._plan_lock = threading.Lock()
+        self._queue: Optional[queue.Queue] = None
+        self._threads: List[threading.Thread] = []
+        self._written = 0
+        self._errors = 0
+        self._max_queue_depth = 0
+        self._blocked_sec = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of views waiting for a background writer."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self._max_queue_depth,
+            "blocked_sec": round(self._blocked_sec, 4),
+            "written": self._written,
+            "errors": self._errors,
+        }
 
     def handle_result(self, result: DiagnosisResult):
+        with self._plan_lock:
+            jobs = self._plan(result)
+        if self.writer_threads <= 0:
+            for job in jobs:
+                self._write(*job)
+            return
+
+        if self._queue is None:
+            self._start_writers()
+        for job in jobs:
+            start = time.perf_counter()
+            self._queue.put(job)
+            blocked = time.perf_counter() - start
+            self._blocked_sec += blocked
+            self._max_queue_depth = max(self._max_queue_depth, self._queue.qsize())
+            if blocked > 0.1:
+                logger.warning(
+                    "output.queue.backpressure",
+                    blocked_sec=round(blocked, 4),
+                    queue_depth=self._queue.qsize(),
+                )
+
+    def close(self):
+        """Drain queued writes, stop writer threads and close the dataset."""
+        if self._queue is not None:
+            for _ in self._threads:
+                self._queue.put(None)
+            for thread in self._threads:
+                thread.join()
+            self._queue = None
+            self._threads = []
+            logger.info("output.writers.closed", **self.stats())
+        if self._dataset_writer is not None:
+            self._dataset_writer.close()
+        if self._appender is not None:
+            self._appender.close()
+
+    def _start_writers(self):
+        self._queue = queue.Queue(maxsize=max(self.queue_size, 1))
+        for i in range(self.writer_threads):
+            thread = threading.Thread(
+                target=self._writer_loop, name=f"dfdiagnoser-output-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _writer_loop(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            try:
+                self._write(*job)
+            except Exception:
+                with self._stats_lock:
+                    self._errors += 1
+                logger.exception("output.write.failed", target=job[1])
+
+    def _plan(self, result: DiagnosisResult) -> List[Tuple[str, Any, pd.DataFrame]]:
+        """Resolve each scored view to a write job on the calling thread.
+
+        Output paths (and streaming sequence numbers) are assigned here so they
+        follow event order even when several writer threads run.
+        """
+        if self.output_mode == "dataset":
+            jobs = [
+                ("dataset", result.window_index, scored_flat_view)
+                for scored_flat_view in result.scored_flat_views
+            ]
+            return jobs + self._rollup_jobs(result, [None] * len(jobs))
+        if self.output_mode != "files":
+            raise ValueError(f"Unsupported output mode: {self.output_mode}")
+
+        jobs = []
+        output_paths: List[Optional[str]] = []
         for i, scored_flat_view in enumerate(result.scored_flat_views):
             # Use original path if available, otherwise generate a sequential filename
             if i < len(result.flat_view_paths) and result.flat_view_paths[i]:
@@ -39,19 +298,96 @@ class FileOutput(Output):
                     output_path = f"{flat_view_path.split('.')[0]}_scored.{self.output_format}"
             else:
                 # Streaming mode: no source path available
-                self._seq += 1
                 if not self.output_dir:
                     self.output_dir = "dfdiagnoser_output"
+                if self.output_format == "ndjson":
+                    # Append every window to one file instead of one file per view
+                    if self._appender is None:
+                        os.makedirs(self.output_dir, exist_ok=True)
+                        self._appender = NDJSONAppender(f"{self.output_dir}/scored.ndjson")
+                    jobs.append(("append", result.window_index, scored_flat_view))
+                    output_paths.append(None)
+                    continue
+                self._seq += 1
                 output_path = f"{self.output_dir}/scored_{self._seq:06d}.{self.output_format}"
 
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            output_dir = os.path.dirname(output_path)
+            if output_dir not in self._created_dirs:
+                os.makedirs(output_dir, exist_ok=True)
+                self._created_dirs.add(output_dir)
+            jobs.append(("file", output_path, scored_flat_view))
+            output_paths.append(output_path)
+        return jobs + self._rollup_jobs(result, output_paths)
 
-            if self.output_format == "json":
-                scored_flat_view.to_json(output_path, orient="index")
-            elif self.output_format == "csv":
-                scored_flat_view.to_csv(output_path, index=True)
-            elif self.output_format == "parquet":
-                scored_flat_view.to_parquet(output_path, index=True)
+    def _rollup_jobs(
+        self, result: DiagnosisResult, output_paths: List[Optional[str]]
+    ) -> List[Tuple[str, Any, pd.DataFrame]]:
+        """Rollups are written as parquet next to their scored view.
+
+        Views without an output file of their own (dataset and ndjson
+        streaming) get ``rollups/window_<window>_<seq>_rollup_<key>.parquet``.
+        """
+        jobs = []
+        for rollups, output_path in zip(result.rollups, output_paths):
+            if output_path is not None:
+                stem = os.path.splitext(output_path)[0]
             else:
-                raise ValueError(
-                    f"Unsupported output format: {self.output_format}")
+                self._rollup_seq += 1
+                rollup_dir = f"{self.output_dir or 'dfdiagnoser_output'}/rollups"
+                if rollup_dir not in self._created_dirs:
+                    os.makedirs(rollup_dir, exist_ok=True)
+                    self._created_dirs.add(rollup_dir)
+                stem = f"{rollup_dir}/window_{result.window_index or 0:06d}_{self._rollup_seq:06d}"
+            for key, rollup in rollups.items():
+                jobs.append(("rollup", f"{stem}_rollup_{key}.parquet", rollup))
+        return jobs
+
+    def _write(self, kind: str, target: Any, scored_flat_view: pd.DataFrame):
+        if kind == "dataset":
+            with self._dataset_lock:
+                if self._dataset_writer is None:
+                    self._dataset_writer = ParquetDatasetWriter(
+                        self.output_dir or "dfdiagnoser_output",
+                        buffer_rows=self.dataset_buffer_rows,
+                        max_file_bytes=self.dataset_max_file_bytes,
+                        max_file_sec=self.dataset_max_file_sec,
+                        max_buffer_sec=self.dataset_max_buffer_sec,
+                    )
+                self._dataset_writer.write(scored_flat_view, window_index=target)
+        elif kind == "append":
+            self._appender.write(scored_flat_view, extra={"window_index": target})
+        elif kind == "rollup":
+            _replace_atomically(target, lambda path: scored_flat_view.to_parquet(path, index=True))
+        elif self.output_format == "json":
+            payload = frame_to_json(scored_flat_view, self.json_layout, self.json_backend)
+            _replace_atomically(target, lambda path: _write_bytes(path, payload))
+        elif self.output_format == "ndjson":
+            payload = frame_to_ndjson(scored_flat_view)
+            _replace_atomically(target, lambda path: _write_bytes(path, payload))
+        elif self.output_format == "csv":
+            _replace_atomically(target, lambda path: scored_flat_view.to_csv(path, index=True))
+        elif self.output_format == "parquet":
+            _replace_atomically(target, lambda path: scored_flat_view.to_parquet(path, index=True))
+        else:
+            raise ValueError(
+                f"Unsupported output format: {self.output_format}")
+        with self._stats_lock:
+            self._written += 1
+
+
+def _write_bytes(path: str, payload: bytes):
+    with open(path, "wb") as f:
+        f.write(payload)
+
+
+def _replace_atomically(target: str, write: Callable[[str], None]):
+    """Write ``target`` through a temporary file so readers and concurrent
+    writers of the same path never see a partial file."""
+    tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,280 @@
+"""Runtime profiling hooks for the streaming diagnoser.
+
+``SIGUSR1`` starts a profiling session that covers the next ``events``
+events and/or ``duration_sec`` seconds (sending it again stops the session
+early). The session either runs ``cProfile`` and writes a ``.pstats`` file,
+or samples the event loop's stack and writes a speedscope ``.speedscope.json``.
+``SIGUSR2`` toggles ``tracemalloc``; while it is on, a snapshot is taken at
+every window boundary and the growth since the previous window is written
+to a text file and logged.
+
+Signal handlers only set flags; sessions start and stop at event
+boundaries in the loop, through ``on_event`` and ``on_window``, and when a
+pull times out, through ``on_idle``, so ``duration_sec`` also ends a
+session while the stream is stalled.
+"""
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+import structlog
+
+
+logger = structlog.get_logger()
+
+PROFILE_MODES = ("cprofile", "sample")
+
+
+def default_profile_dir() -> str:
+    """``profiles/`` inside the Hydra run directory, or the working directory."""
+    try:
+        from hydra.core.hydra_config import HydraConfig
+
+        run_dir = HydraConfig.get().runtime.output_dir
+    except Exception:
+        run_dir = os.getcwd()
+    return os.path.join(run_dir, "profiles")
+
+
+class _StackSampler:
+    """Samples one thread's stack at a fixed interval into speedscope format."""
+
+    def __init__(self, thread_id: int, interval_sec: float):
+        self.thread_id = thread_id
+        self.interval_sec = interval_sec
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="dfdiagnoser-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_sec):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                self.samples[tuple(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def speedscope(self, name: str) -> Dict[str, Any]:
+        frames: List[Dict[str, Any]] = []
+        frame_index: Dict[Tuple[str, str, int], int] = {}
+        samples, weights = [], []
+        for stack, count in self.samples.items():
+            indices = []
+            for key in stack:
+                if key not in frame_index:
+                    frame_index[key] = len(frames)
+                    frames.append({"name": key[0], "file": key[1], "line": key[2]})
+                indices.append(frame_index[key])
+            samples.append(indices)
+            weights.append(count * self.interval_sec)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+            "exporter": "dfdiagnoser",
+        }
+
+
+class RuntimeProfiler:
+    def __init__(
+        self,
+        output_dir: str = "",
+        mode: str = "cprofile",
+        events: int = 100,
+        duration_sec: float = 0,
+        sample_interval_ms: float = 5,
+        tracemalloc_top: int = 20,
+    ):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unsupported profile mode: {mode}")
+        self.output_dir = output_dir
+        self.mode = mode
+        self.events = events
+        self.duration_sec = duration_sec
+        self.sample_interval_sec = sample_interval_ms / 1000
+        self.tracemalloc_top = tracemalloc_top
+        self.paths: List[str] = []
+        self._profile_requested = False
+        self._tracemalloc_requested = False
+        self._session = None
+        self._session_events = 0
+        self._session_started = 0.0
+        self._snapshot = None
+        self._tracing = False
+        self._previous_handlers: Dict[int, Any] = {}
+
+    # Signal side: only flip flags
+    def request_profile(self, *args):
+        self._profile_requested = True
+
+    def request_tracemalloc(self, *args):
+        self._tracemalloc_requested = True
+
+    def install(self):
+        """Route ``SIGUSR1``/``SIGUSR2`` to this profiler (main thread only)."""
+        if threading.current_thread() is not threading.main_thread():
+            return
+        for signum, handler in (
+            (signal.SIGUSR1, self.request_profile),
+            (signal.SIGUSR2, self.request_tracemalloc),
+        ):
+            self._previous_handlers[signum] = signal.signal(signum, handler)
+
+    def uninstall(self):
+        for signum, handler in self._previous_handlers.items():
+            signal.signal(signum, handler)
+        self._previous_handlers.clear()
+
+    # Loop side
+    @property
+    def active(self) -> bool:
+        return self._session is not None
+
+    def on_event(self):
+        if self._handle_profile_request() or self._session is None:
+            return
+        self._session_events += 1
+        if self.events > 0 and self._session_events >= self.events:
+            self._stop_session(reason="events")
+        elif self._session_expired():
+            self._stop_session(reason="duration")
+
+    def on_idle(self):
+        if self._handle_profile_request() or self._session is None:
+            return
+        if self._session_expired():
+            self._stop_session(reason="duration")
+
+    def _handle_profile_request(self) -> bool:
+        if not self._profile_requested:
+            return False
+        self._profile_requested = False
+        if self._session is None:
+            self._start_session()
+        else:
+            self._stop_session(reason="signal")
+        return True
+
+    def _session_expired(self) -> bool:
+        return (
+            self.duration_sec > 0
+            and time.perf_counter() - self._session_started >= self.duration_sec
+        )
+
+    def on_window(self, window_index: int):
+        import tracemalloc
+
+        if self._tracemalloc_requested:
+            self._tracemalloc_requested = False
+            if self._tracing:
+                self._stop_tracemalloc()
+                logger.info("profiling.tracemalloc.stopped", window=window_index)
+                return
+            tracemalloc.start()
+            self._tracing = True
+            logger.info("profiling.tracemalloc.started", window=window_index)
+        if not self._tracing:
+            return
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),)
+        )
+        if self._snapshot is not None:
+            self._write_tracemalloc_diff(window_index, snapshot.compare_to(self._snapshot, "lineno"))
+        self._snapshot = snapshot
+
+    def close(self):
+        if self._session is not None:
+            self._stop_session(reason="shutdown")
+        if self._tracing:
+            self._stop_tracemalloc()
+        self.uninstall()
+
+    def _stop_tracemalloc(self):
+        import tracemalloc
+
+        tracemalloc.stop()
+        self._tracing = False
+        self._snapshot = None
+
+    def _path(self, name: str) -> str:
+        output_dir = self.output_dir or default_profile_dir()
+        os.makedirs(output_dir, exist_ok=True)
+        return os.path.join(output_dir, name)
+
+    def _start_session(self):
+        if self.mode == "cprofile":
+            import cProfile
+
+            self._session = cProfile.Profile()
+            self._session.enable()
+        else:
+            self._session = _StackSampler(threading.get_ident(), self.sample_interval_sec)
+        self._session_events = 0
+        self._session_started = time.perf_counter()
+        logger.info(
+            "profiling.session.started",
+            mode=self.mode,
+            events=self.events,
+            duration_sec=self.duration_sec,
+        )
+
+    def _stop_session(self, reason: str):
+        session, self._session = self._session, None
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        if self.mode == "cprofile":
+            session.disable()
+            path = self._path(f"profile-{stamp}-{os.getpid()}.pstats")
+            session.dump_stats(path)
+        else:
+            session.stop()
+            path = self._path(f"profile-{stamp}-{os.getpid()}.speedscope.json")
+            with open(path, "w") as f:
+                json.dump(session.speedscope(f"dfdiagnoser {stamp}"), f)
+        self.paths.append(path)
+        logger.info(
+            "profiling.session.stopped",
+            path=path,
+            reason=reason,
+            events=self._session_events,
+            elapsed=round(time.perf_counter() - self._session_started, 4),
+        )
+
+    def _write_tracemalloc_diff(self, window_index: int, stats):
+        top = stats[: self.tracemalloc_top]
+        path = self._path(f"tracemalloc-window-{window_index:06d}.txt")
+        with open(path, "w") as f:
+            for stat in top:
+                f.write(f"{stat}\n")
+        self.paths.append(path)
+        logger.info(
+            "profiling.tracemalloc.diff",
+            window=window_index,
+            path=path,
+            growth_bytes=sum(stat.size_diff for stat in stats),
+            top=[str(stat) for stat in top[:5]],
+        )
@@ -0,0 +1,172 @@
+"""Score rollups over the ``d_`` dimension columns of scored views.
+
+For each configured combination of dimensions (``d_`` columns or index
+levels), every dimension is dictionary-encoded with ``pd.factorize`` and
+folded into the group ids one dimension at a time, re-factorizing after
+each step so the combined key never exceeds ``rows x uniques``. The
+per-group, per-metric score histogram is counted with ``np.bincount`` in
+passes over bounded ranges of groups, and only its non-empty
+``(group, metric, bin)`` cells are kept, so memory follows the data rather
+than ``groups x metrics``. The row count and maximum score are derived
+from the histogram.
+
+A rollup is a long frame indexed by ``(*dimensions, metric)`` with the
+columns ``rows``, ``count``, ``max_score`` and one per ``HIST_LEVELS`` bin;
+``(group, metric)`` pairs without any score are left out.
+"""
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .summaries import HIST_LEVELS, NULL_BIN, SCORE_SUFFIX, score_block, score_codes
+
+
+DIMENSION_PREFIX = "d_"
+# Upper bound on rows x metrics bin ids materialized per chunk
+CHUNK_CELLS = 1 << 22
+# Largest groups x metrics x bins histogram counted densely
+DENSE_CELLS = 1 << 22
+
+
+def rollup_key(dimensions: Sequence[str]) -> str:
+    return "+".join(dimensions)
+
+
+def dimension_sets(
+    df: pd.DataFrame, configured: Optional[Sequence[Sequence[str]]] = None
+) -> List[List[str]]:
+    """Dimension combinations to roll ``df`` up by.
+
+    Without ``configured`` sets every ``d_`` column is rolled up on its own.
+    Configured sets naming a column or index level the view lacks are skipped.
+    """
+    if not configured:
+        return [[col] for col in df.columns if col.startswith(DIMENSION_PREFIX)]
+    available = set(df.columns) | {name for name in df.index.names if name}
+    return [list(dims) for dims in configured if dims and set(dims) <= available]
+
+
+def _values(df: pd.DataFrame, dimension: str):
+    if dimension in df.columns:
+        values = df[dimension]
+    else:
+        values = df.index.get_level_values(dimension)
+    if isinstance(values.dtype, pd.ArrowDtype):
+        import pyarrow as pa
+
+        if pa.types.is_dictionary(values.dtype.pyarrow_dtype):
+            # Arrow dictionary columns ("mmap" mode with categorical
+            # dimensions) factorize into uniques a MultiIndex cannot be built
+            # from; decode them to category, which keeps the codes
+            return pa.array(values.array).to_pandas().array
+    return values
+
+
+def _encode(values) -> tuple:
+    """Dictionary-encode ``values``; missing values get their own code."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    codes = codes.astype(np.int64)
+    missing = codes < 0
+    if missing.any():
+        codes[missing] = len(uniques)
+        uniques = pd.Index(uniques).append(pd.Index([None]))
+    return codes, pd.Index(uniques)
+
+
+def _group_ids(encoded: Sequence[tuple], n_rows: int) -> np.ndarray:
+    """Group id of every row, numbered in order of first appearance."""
+    group_ids = np.zeros(n_rows, dtype=np.int64)
+    for codes, uniques in encoded:
+        group_ids, _ = pd.factorize(group_ids * (len(uniques) or 1) + codes)
+        group_ids = group_ids.astype(np.int64, copy=False)
+    return group_ids
+
+
+def _cell_counts(group_ids: np.ndarray, n_groups: int, block: np.ndarray) -> tuple:
+    """Sorted non-empty ``(group * metrics + metric) * bins + bin`` cells and
+    their counts; missing scores are left out.
+
+    Groups are counted in passes of at most ``DENSE_CELLS`` histogram cells,
+    over the rows of those groups only.
+    """
+    n_bins = len(HIST_LEVELS)
+    n_metrics = block.shape[1]
+    group_cells = n_metrics * n_bins
+    groups_per_pass = max(DENSE_CELLS // max(group_cells, 1), 1)
+    order = sorted_ids = None
+    if n_groups > groups_per_pass:
+        order = np.argsort(group_ids, kind="stable")
+        sorted_ids = group_ids[order]
+    offsets = np.arange(n_metrics, dtype=np.int64) * n_bins
+    chunk = max(CHUNK_CELLS // max(n_metrics, 1), 1)
+    cells, counts = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+    for first in range(0, n_groups, groups_per_pass):
+        last = min(first + groups_per_pass, n_groups)
+        lo, hi = 0, len(group_ids)
+        if order is not None:
+            lo, hi = np.searchsorted(sorted_ids, [first, last])
+        hist = np.zeros((last - first) * group_cells, dtype=np.int64)
+        for start in range(lo, hi, chunk):
+            rows = slice(start, min(start + chunk, hi))
+            if order is not None:
+                rows = order[rows]
+            codes = score_codes(block[rows])
+            ids = (group_ids[rows, None] - first) * group_cells + offsets + codes
+            hist += np.bincount(ids[codes != NULL_BIN], minlength=len(hist))
+        nonzero = np.flatnonzero(hist)
+        cells.append(nonzero + first * group_cells)
+        counts.append(hist[nonzero])
+    return np.concatenate(cells), np.concatenate(counts)
+
+
+def build_rollup(scored_df: pd.DataFrame, dimensions: Sequence[str]) -> pd.DataFrame:
+    """Roll the score columns of ``scored_df`` up by ``dimensions``."""
+    metrics = [col for col in scored_df.columns if col.endswith(SCORE_SUFFIX)]
+    n_bins = len(HIST_LEVELS)
+
+    encoded = [_encode(_values(scored_df, dim)) for dim in dimensions]
+    group_ids = _group_ids(encoded, len(scored_df))
+    n_groups = int(group_ids.max()) + 1 if len(group_ids) else 0
+    # Ids are numbered in order of first appearance: a row starts a group
+    # when its id exceeds every id before it
+    seen = np.maximum.accumulate(group_ids)
+    first_rows = np.flatnonzero(np.r_[True, seen[1:] > seen[:-1]][: len(group_ids)])
+
+    cells, counts = _cell_counts(group_ids, n_groups, score_block(scored_df, metrics))
+    # Cells are sorted, so equal (group, metric) pairs are adjacent
+    cell_pairs = cells // n_bins
+    starts = np.r_[True, cell_pairs[1:] != cell_pairs[:-1]][: len(cells)]
+    pair_idx = np.cumsum(starts) - 1
+    pairs = cell_pairs[starts]
+    hist = np.zeros((len(pairs), n_bins), dtype=np.int64)
+    hist[pair_idx, cells % n_bins] = counts
+    group_idx = pairs // max(len(metrics), 1)
+    metric_idx = pairs % max(len(metrics), 1)
+
+    count = hist.sum(axis=1)
+    rows = np.bincount(group_ids, minlength=n_groups)[group_idx]
+    hist[:, NULL_BIN] = rows - count
+    # Highest non-empty score bin (1 = trivial ... 5 = critical)
+    max_score = NULL_BIN - np.argmax(hist[:, NULL_BIN - 1 :: -1] > 0, axis=1)
+
+    group_rows = first_rows[group_idx]
+    index = pd.MultiIndex.from_arrays(
+        [uniques.take(codes[group_rows]) for codes, uniques in encoded]
+        + [pd.Index([metric[: -len(SCORE_SUFFIX)] for metric in metrics]).take(metric_idx)],
+        names=list(dimensions) + ["metric"],
+    )
+    frame = {"rows": rows, "count": count, "max_score": max_score}
+    for level_index, level in enumerate(HIST_LEVELS):
+        frame[level] = hist[:, level_index]
+    return pd.DataFrame(frame, index=index)
+
+
+def build_rollups(
+    scored_df: pd.DataFrame, configured: Optional[Sequence[Sequence[str]]] = None
+) -> Dict[str, pd.DataFrame]:
+    """Rollups of ``scored_df`` for every applicable dimension set, by key."""
+    return {
+        rollup_key(dims): build_rollup(scored_df, dims)
+        for dims in dimension_sets(scored_df, configured)
+    }
@@ -0,0 +1,245 @@
+import dataclasses as dc
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+LAYER_PLACEHOLDER = "{posix_layer}"
+TIME_METRIC_PLACEHOLDER = "{time_metric}"
+LAYER_MARKER = "posix"
+LAYER_ANCHOR_SUFFIX = "count_sum"
+
+_LAYER_TOKEN_RE = re.compile(r"\{posix_layer\}_(\w+)")
+_IDENTIFIER_RE = re.compile(r"\b[A-Za-z_]\w*\b")
+_EVAL_FUNCTIONS = {"abs"}
+_LAYER_VAR_PREFIX = "__layer_"
+
+
+@dc.dataclass
+class RuleReasonDefinition:
+    condition: str
+    message: str
+
+
+@dc.dataclass
+class RuleDefinition:
+    key: str
+    name: str
+    condition: str
+    reasons: List[RuleReasonDefinition] = dc.field(default_factory=list)
+
+    @property
+    def is_layered(self) -> bool:
+        return LAYER_PLACEHOLDER in self.condition or any(
+            LAYER_PLACEHOLDER in reason.condition for reason in self.reasons
+        )
+
+
+@dc.dataclass
+class _CompiledCheck:
+    rule_key: str
+    check: str
+    expression: str
+    layer_suffixes: List[str]
+    plain_names: List[str]
+
+
+def load_rule_definitions(rule_defs: Optional[Dict[str, Any]]) -> List[RuleDefinition]:
+    """Flatten a (possibly grouped) ``rule_defs`` mapping into rule definitions.
+
+    Hydra composes ``rule_defs/<group>`` config files as nested mappings, e.g.
+    ``{"posix": {"small_reads": {...}}}``. Any mapping that carries a
+    ``condition`` is treated as a rule; anything else is descended into.
+    """
+    rules = []
+    for key, value in (rule_defs or {}).items():
+        if not isinstance(value, dict):
+            continue
+        if "condition" in value:
+            reasons = [
+                RuleReasonDefinition(
+                    condition=reason["condition"],
+                    message=reason.get("message", ""),
+                )
+                for reason in value.get("reasons") or []
+            ]
+            rules.append(
+                RuleDefinition(
+                    key=key,
+                    name=value.get("name", key),
+                    condition=value["condition"],
+                    reasons=reasons,
+                )
+            )
+        else:
+            rules.extend(load_rule_definitions(value))
+    return rules
+
+
+def discover_layers(columns: Iterable[str], time_metric: str = "time_sum") -> List[str]:
+    """Discover the ``{posix_layer}`` values present in a flat view schema.
+
+    A layer is a column prefix containing ``posix`` that has both
+    ``<prefix>_count_sum`` and ``<prefix>_<time_metric>`` columns. Prefixes
+    nested under another layer (e.g. ``reader_posix_lustre_read``) are
+    operation breakdowns of that layer and are dropped.
+    """
+    columns = set(columns)
+    candidates = set()
+    anchor = f"_{LAYER_ANCHOR_SUFFIX}"
+    for col in columns:
+        if not col.endswith(anchor):
+            continue
+        prefix = col[: -len(anchor)]
+        if LAYER_MARKER not in prefix.split("_"):
+            continue
+        if f"{prefix}_{time_metric}" in columns:
+            candidates.add(prefix)
+    return sorted(
+        prefix
+        for prefix in candidates
+        if not any(prefix.startswith(f"{other}_") for other in candidates)
+    )
+
+
+class RuleEngine:
+    """Evaluates rule definitions across every layer of a flat view.
+
+    Each condition is compiled once into an expression over per-layer
+    variables. At evaluation time the referenced columns of all layers are
+    stacked into ``(n_layers, n_rows)`` arrays so that a condition is a single
+    array computation regardless of how many layers the view carries.
+    """
+
+    def __init__(
+        self,
+        rule_defs: Optional[Dict[str, Any]] = None,
+        time_metric: str = "time_sum",
+        n_jobs: int = 1,
+        min_layers_per_job: int = 4,
+    ):
+        self.rules = load_rule_definitions(rule_defs)
+        self.time_metric = time_metric
+        self.n_jobs = max(1, n_jobs)
+        self.min_layers_per_job = max(1, min_layers_per_job)
+        self._checks = [
+            check for rule in self.rules for check in self._compile_rule(rule)
+        ]
+        self._layer_cache: Dict[Tuple[str, ...], List[str]] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+
+    def layers_for(self, columns: Sequence[str]) -> List[str]:
+        schema = tuple(columns)
+        layers = self._layer_cache.get(schema)
+        if layers is None:
+            layers = discover_layers(schema, time_metric=self.time_metric)
+            self._layer_cache[schema] = layers
+        return layers
+
+    def required_columns(self, columns: Sequence[str]) -> List[str]:
+        """Columns of ``columns`` that the rule conditions reference."""
+        layers = self.layers_for(columns)
+        available = set(columns)
+        required = set()
+        for check in self._checks:
+            for suffix in check.layer_suffixes:
+                required.update(f"{layer}_{suffix}" for layer in layers)
+            required.update(check.plain_names)
+        return sorted(required & available)
+
+    def evaluate(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Evaluate all rules against ``df``.
+
+        Returns a boolean frame indexed like ``df`` whose columns are a
+        ``(rule, layer, check)`` MultiIndex, where ``check`` is ``condition``
+        or ``reason_<i>``. Rules without a layer placeholder use an empty
+        layer name.
+        """
+        layers = self.layers_for(df.columns)
+        results: Dict[Tuple[str, str, str], np.ndarray] = {}
+        for check in self._checks:
+            check_layers = layers if check.layer_suffixes else [""]
+            if not check_layers:
+                continue
+            matches = self._evaluate_check(df, check, check_layers)
+            for layer, row in zip(check_layers, matches):
+                results[(check.rule_key, layer, check.check)] = row
+
+        columns = pd.MultiIndex.from_tuples(
+            list(results), names=["rule", "layer", "check"]
+        )
+        if not results:
+            return pd.DataFrame(index=df.index, columns=columns, dtype=bool)
+        return pd.DataFrame(
+            np.column_stack(list(results.values())),
+            index=df.index,
+            columns=columns,
+        )
+
+    def _compile_rule(self, rule: RuleDefinition) -> List[_CompiledCheck]:
+        checks = [self._compile_check(rule.key, "condition", rule.condition)]
+        for i, reason in enumerate(rule.reasons):
+            checks.append(self._compile_check(rule.key, f"reason_{i}", reason.condition))
+        return checks
+
+    def _compile_check(self, rule_key: str, check: str, condition: str) -> _CompiledCheck:
+        condition = condition.replace(TIME_METRIC_PLACEHOLDER, self.time_metric)
+        layer_suffixes = sorted(set(_LAYER_TOKEN_RE.findall(condition)))
+        expression = _LAYER_TOKEN_RE.sub(
+            lambda m: f"{_LAYER_VAR_PREFIX}{m.group(1)}", condition
+        )
+        plain_names = sorted(
+            name
+            for name in set(_IDENTIFIER_RE.findall(expression))
+            if name not in _EVAL_FUNCTIONS and not name.startswith(_LAYER_VAR_PREFIX)
+        )
+        return _CompiledCheck(
+            rule_key=rule_key,
+            check=check,
+            expression=expression,
+            layer_suffixes=layer_suffixes,
+            plain_names=plain_names,
+        )
+
+    def _evaluate_check(
+        self, df: pd.DataFrame, check: _CompiledCheck, layers: List[str]
+    ) -> np.ndarray:
+        n_chunks = min(self.n_jobs, max(1, len(layers) // self.min_layers_per_job))
+        if n_chunks <= 1:
+            return self._evaluate_layers(df, check, layers)
+        chunks = [list(chunk) for chunk in np.array_split(layers, n_chunks)]
+        with ThreadPoolExecutor(max_workers=n_chunks) as executor:
+            parts = list(
+                executor.map(lambda chunk: self._evaluate_layers(df, check, chunk), chunks)
+            )
+        return np.concatenate(parts, axis=0)
+
+    @staticmethod
+    def _evaluate_layers(
+        df: pd.DataFrame, check: _CompiledCheck, layers: List[str]
+    ) -> np.ndarray:
+        n_rows = len(df)
+        local_dict = {}
+        for suffix in check.layer_suffixes:
+            local_dict[f"{_LAYER_VAR_PREFIX}{suffix}"] = np.vstack(
+                [_column_values(df, f"{layer}_{suffix}", n_rows) for layer in layers]
+            )
+        for name in check.plain_names:
+            local_dict[name] = _column_values(df, name, n_rows)[np.newaxis, :]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = pd.eval(check.expression, local_dict=local_dict, engine="python")
+        result = np.asarray(result, dtype=bool)
+        return np.broadcast_to(result, (len(layers), n_rows))
+
+
+def _column_values(df: pd.DataFrame, column: str, n_rows: int) -> np.ndarray:
+    if column not in df.columns:
+        return np.full(n_rows, np.nan)
+    return pd.to_numeric(df[column], errors="coerce").to_numpy(
+        dtype="float64", na_value=np.nan
+    )
@@ -1,6 +1,7 @@
 import numpy as np
 import pandas as pd
 from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 
 class Score(Enum):
@@ -32,6 +33,97 @@ SLOPE_BINS = [
 ]
 
 
+SCORED_SUFFIXES = ('_pct', '_per', '_util', '_slope', '_intensity_mean')
+
+
+def scored_columns(columns: Iterable[str], metric_boundaries: dict) -> List[str]:
+    """Columns of ``columns`` that ``score_metrics`` reads.
+
+    These are the ``d_`` dimensions, metrics with a scored suffix and the
+    metrics that have a boundary.
+    """
+    return [
+        col for col in columns
+        if col.startswith('d_')
+        or col.endswith(SCORED_SUFFIXES)
+        or col in metric_boundaries
+    ]
+
+
+def severity_code(level: str) -> int:
+    """Lowest score value at ``level`` (``trivial`` is 1, ``critical`` 5)."""
+    if level not in SCORE_NAMES:
+        raise ValueError(f"Unsupported severity: {level}")
+    return SCORE_NAMES.index(level) + 1
+
+
+def severity_thresholds(
+    columns: Iterable[str], metric_boundaries: dict, min_severity: str
+) -> Optional[Dict[str, Tuple[bool, float]]]:
+    """Raw-value bounds a row must cross to score at least ``min_severity``.
+
+    Score bins are monotone in the metric value, so ``score >= k`` holds
+    exactly when the value is above ``bins[k - 1]`` (below the mirrored bound
+    for the inverted ``_util`` and ``bw_mean`` metrics). Returns
+    ``column -> (inverted, threshold)`` for every column ``score_metrics``
+    would score, or ``None`` when some column cannot be bounded.
+    """
+    k = severity_code(min_severity) - 1
+    thresholds = {}
+    for col in columns:
+        if col.startswith('d_'):
+            continue
+        if col in metric_boundaries:
+            boundary = metric_boundaries[col]
+            if not boundary or boundary < 0:
+                return None
+            if 'bw_mean' in col:
+                thresholds[col] = (True, boundary * (1 - PERCENTAGE_BINS[k]))
+            else:
+                thresholds[col] = (False, boundary * PERCENTAGE_BINS[k])
+        elif col.endswith('_util'):
+            thresholds[col] = (True, 1 - PERCENTAGE_BINS[k])
+        elif col.endswith('_pct') or col.endswith('_per'):
+            thresholds[col] = (False, PERCENTAGE_BINS[k])
+        elif col.endswith('_slope'):
+            thresholds[col] = (False, SLOPE_BINS[k])
+        elif col.endswith('_intensity_mean'):
+            thresholds[col] = (False, INTENSITY_BINS[k])
+    return thresholds
+
+
+def may_reach_severity(
+    stats: Dict[str, Sequence[Any]], thresholds: Dict[str, Tuple[bool, float]]
+) -> bool:
+    """Whether a row group with ``stats`` (``column -> [min, max]``) can hold
+    a row at the severity ``thresholds`` were built for.
+
+    Columns without statistics are assumed to reach it; bounds get a small
+    slack so float rounding in ``score_metrics`` never causes a false skip.
+    """
+    for col, (inverted, threshold) in thresholds.items():
+        bounds = stats.get(col)
+        if bounds is None:
+            return True
+        low, high = bounds
+        if low is None:  # all null: never scored
+            continue
+        slack = 1e-9 * max(1.0, abs(threshold))
+        if (low < threshold + slack) if inverted else (high > threshold - slack):
+            return True
+    return False
+
+
+def rows_at_least(scored_df: pd.DataFrame, min_severity: str) -> np.ndarray:
+    """Boolean mask of rows with any score at ``min_severity`` or above."""
+    score_cols = [col for col in scored_df.columns if col.endswith('_score')]
+    if not score_cols:
+        return np.zeros(len(scored_df), dtype=bool)
+    block = scored_df[score_cols].to_numpy(dtype='float64', na_value=np.nan)
+    with np.errstate(invalid='ignore'):
+        return (block >= severity_code(min_severity)).any(axis=1)
+
+
 def score_metrics(df: pd.DataFrame, metric_boundaries: dict) -> pd.DataFrame:
     metrics = [col for col in df.columns if not col.startswith('d_')]
 
@@ -74,3 +166,163 @@ def score_metrics(df: pd.DataFrame, metric_boundaries: dict) -> pd.DataFrame:
         df = pd.concat([df, score_df], axis=1)
 
     return df.sort_index(axis=1)
+
+
+def is_inverted(metric: str, metric_boundaries: dict) -> bool:
+    """Whether lower values of ``metric`` score higher."""
+    if metric in metric_boundaries:
+        return 'bw_mean' in metric
+    return metric.endswith('_util')
+
+
+def top_indices(primary: np.ndarray, secondary: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the ``k`` largest ``(primary, secondary)`` pairs in O(n).
+
+    ``np.partition`` finds the k-th largest primary key; rows above it are
+    kept and ties on it are resolved by ``secondary`` with ``np.argpartition``.
+    NaN keys rank lowest. The result is unordered.
+    """
+    n = len(primary)
+    if n <= k:
+        return np.arange(n)
+    if k <= 0:
+        return np.arange(0)
+    primary = np.nan_to_num(primary, nan=-np.inf)
+    secondary = np.nan_to_num(secondary, nan=-np.inf)
+    kth = np.partition(primary, n - k)[n - k]
+    above = np.flatnonzero(primary > kth)
+    ties = np.flatnonzero(primary == kth)
+    need = k - len(above)
+    if len(ties) > need:
+        ties = ties[np.argpartition(-secondary[ties], need - 1)[:need]]
+    return np.concatenate([above, ties])
+
+
+class TopK:
+    """The ``k`` most severe rows of a view, fed one frame (batch) at a time.
+
+    Each batch is scored and reduced to at most ``k`` candidates per
+    ranking with :func:`top_indices`, then merged with the candidates kept
+    so far, so memory stays O(k) per ranking however large the view is.
+
+    Rows are ranked by their combined score (sum of all scores, ties broken
+    by the highest single score) and, for each scored metric, by that
+    metric's score with ties broken by how extreme its value is. Candidates
+    keep the index and the ``d_`` dimension values.
+
+    With ``metric``, only that metric is scored and ranked (no combined
+    ranking is kept).
+    """
+
+    def __init__(
+        self,
+        k: int,
+        metric_boundaries: Optional[dict] = None,
+        per_metric: bool = True,
+        metric: Optional[str] = None,
+    ):
+        self.k = k
+        self.metric_boundaries = metric_boundaries or {}
+        self.per_metric = per_metric or metric is not None
+        self._ranked_metric = metric
+        self.rows_seen = 0
+        self._combined: Optional[pd.DataFrame] = None
+        self._metrics: Dict[str, pd.DataFrame] = {}
+
+    def update(self, df: pd.DataFrame) -> "TopK":
+        self.rows_seen += len(df)
+        if df.empty:
+            return self
+        metric_boundaries = self.metric_boundaries
+        if self._ranked_metric is not None:
+            df = df[[
+                col for col in df.columns
+                if col.startswith('d_') or col == self._ranked_metric
+            ]]
+            metric_boundaries = {
+                metric: boundary for metric, boundary in metric_boundaries.items()
+                if metric == self._ranked_metric
+            }
+        scored = score_metrics(df, metric_boundaries)
+        dims = [col for col in scored.columns if col.startswith('d_')]
+        score_cols = [col for col in scored.columns if col.endswith('_score')]
+        if self._ranked_metric is None:
+            block = scored[score_cols].to_numpy(dtype='float64', na_value=np.nan)
+            with np.errstate(invalid='ignore'):
+                combined = scored[dims + score_cols].assign(
+                    combined_score=np.nansum(block, axis=1),
+                    max_score=np.fmax.reduce(block, axis=1) if score_cols else np.nan,
+                )
+            self._combined = self._merge(
+                self._combined, combined, 'combined_score', 'max_score'
+            )
+        if not self.per_metric:
+            return self
+        for score_col in score_cols:
+            metric = score_col[: -len('_score')]
+            candidates = scored[dims + [metric, score_col]]
+            candidates = candidates.assign(
+                _severity=-candidates[metric] if is_inverted(metric, self.metric_boundaries)
+                else candidates[metric]
+            )
+            self._metrics[metric] = self._merge(
+                self._metrics.get(metric), candidates, score_col, '_severity'
+            )
+        return self
+
+    def _merge(
+        self, kept: Optional[pd.DataFrame], batch: pd.DataFrame, primary: str, secondary: str
+    ) -> pd.DataFrame:
+        batch = batch.iloc[self._select(batch, primary, secondary)]
+        if kept is not None:
+            batch = pd.concat([kept, batch])
+            batch = batch.iloc[self._select(batch, primary, secondary)]
+        return batch
+
+    def _select(self, df: pd.DataFrame, primary: str, secondary: str) -> np.ndarray:
+        return top_indices(
+            df[primary].to_numpy(dtype='float64', na_value=np.nan),
+            df[secondary].to_numpy(dtype='float64', na_value=np.nan),
+            self.k,
+        )
+
+    @staticmethod
+    def _ordered(df: Optional[pd.DataFrame], primary: str, secondary: str) -> pd.DataFrame:
+        if df is None:
+            return pd.DataFrame()
+        keys = [
+            np.nan_to_num(df[col].to_numpy(dtype='float64', na_value=np.nan), nan=-np.inf)
+            for col in (secondary, primary)
+        ]
+        return df.iloc[np.lexsort(keys)[::-1]]
+
+    def combined(self) -> pd.DataFrame:
+        """Worst rows overall, most severe first."""
+        return self._ordered(self._combined, 'combined_score', 'max_score')
+
+    def metric(self, metric: str) -> pd.DataFrame:
+        """Worst rows for ``metric``, most severe first."""
+        ordered = self._ordered(self._metrics.get(metric), f'{metric}_score', '_severity')
+        return ordered.drop(columns='_severity', errors='ignore')
+
+    @property
+    def metrics(self) -> List[str]:
+        return sorted(self._metrics)
+
+
+def top_k(
+    frames: Iterable[pd.DataFrame],
+    k: int,
+    metric_boundaries: Optional[dict] = None,
+    metric: Optional[str] = None,
+) -> pd.DataFrame:
+    """The ``k`` worst rows of a view given as one or more frames.
+
+    Ranked by combined score, or by ``metric`` when given.
+    """
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+    topk = TopK(k, metric_boundaries, per_metric=False, metric=metric)
+    for frame in frames:
+        topk.update(frame)
+    return topk.metric(metric) if metric is not None else topk.combined()
@@ -0,0 +1,164 @@
+"""JSON serialization backends for scored views and findings.
+
+Backends are looked up by name with :func:`get_backend`: ``"orjson"`` and
+``"msgspec"`` when installed (see the ``fast`` extra), ``"json"`` (stdlib)
+always, and ``"auto"`` for the fastest available one. Other encoders can be
+added with :func:`register_backend`. Every backend returns ``bytes``.
+
+Scored views are written by :func:`frame_to_json`. The default ``"index"``
+layout (pandas ``orient="index"``) needs a key per cell and stays on
+pandas' encoder. The opt-in ``"split"`` layout (pandas ``orient="split"``)
+hands all-float views to orjson as one contiguous ``float64`` block, which
+it encodes natively.
+"""
+import json
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+JsonDumps = Callable[[Any], bytes]
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (pd.Timestamp, pd.Timedelta)):
+        return str(obj)
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _json_backend() -> JsonDumps:
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, default=_default).encode("utf-8")
+
+    return dumps
+
+
+def _orjson_backend() -> JsonDumps:
+    import orjson
+
+    options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default, option=options)
+
+    return dumps
+
+
+def _msgspec_backend() -> JsonDumps:
+    import msgspec
+
+    return msgspec.json.Encoder(enc_hook=_default).encode
+
+
+_BACKENDS: Dict[str, Callable[[], JsonDumps]] = {
+    "orjson": _orjson_backend,
+    "msgspec": _msgspec_backend,
+    "json": _json_backend,
+}
+_AUTO_ORDER = ["orjson", "msgspec", "json"]
+
+
+def register_backend(name: str, factory: Callable[[], JsonDumps]):
+    """Make ``factory()`` (returning a ``dumps`` to bytes) available as ``name``."""
+    _BACKENDS[name] = factory
+
+
+def get_backend(name: str = "auto") -> Tuple[str, JsonDumps]:
+    """``(name, dumps)`` of a backend; ``"auto"`` picks the first installed one."""
+    if name == "auto":
+        for candidate in _AUTO_ORDER:
+            try:
+                return candidate, _BACKENDS[candidate]()
+            except ModuleNotFoundError:
+                continue
+    if name not in _BACKENDS:
+        raise ValueError(f"Unsupported JSON backend: {name}")
+    return name, _BACKENDS[name]()
+
+
+JSON_BACKEND, dumps = get_backend()
+
+
+def _is_float(dtype) -> bool:
+    return isinstance(dtype, np.dtype) and dtype.kind == "f"
+
+
+def frame_to_json(df: pd.DataFrame, layout: str = "index", backend: str = "auto") -> bytes:
+    """Serialize a scored view as one JSON document.
+
+    ``"index"`` is pandas' ``orient="index"`` layout. ``"split"`` is the
+    ``orient="split"`` layout (read it back with
+    ``pd.read_json(path, orient="split")``); with orjson, views whose
+    columns are all floats are encoded from a single ``float64`` block, and
+    any other view goes through pandas so integer scores stay integers.
+    """
+    if layout == "index":
+        return df.to_json(orient="index").encode("utf-8")
+    if layout != "split":
+        raise ValueError(f"Unsupported JSON layout: {layout}")
+    name = backend
+    if backend == "auto":
+        name, _ = get_backend(backend)
+    if name == "orjson" and all(_is_float(dtype) for dtype in df.dtypes):
+        import orjson
+
+        block = np.ascontiguousarray(df.to_numpy(dtype="float64", na_value=np.nan))
+        return orjson.dumps(
+            {"columns": [str(c) for c in df.columns], "index": df.index.tolist(), "data": block},
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY,
+        )
+    return df.to_json(orient="split").encode("utf-8")
+
+
+def frame_to_ndjson(df: pd.DataFrame, extra: Optional[Dict[str, Any]] = None) -> bytes:
+    """Serialize a view as newline-delimited records, one row per line.
+
+    Index levels become leading fields, and ``extra`` (e.g. the window index)
+    is added as constant columns, so lines from many windows can be appended
+    to one file and read back with ``pd.read_json(path, lines=True)``.
+    """
+    frame = df.reset_index()
+    if extra:
+        frame = frame.assign(**extra)
+    if frame.empty:
+        return b""
+    text = frame.to_json(orient="records", lines=True)
+    if not text.endswith("\n"):
+        text += "\n"
+    return text.encode("utf-8")
+
+
+class NDJSONAppender:
+    """Appends serialized views to a single NDJSON file.
+
+    Views are serialized outside the lock and written with one ``write``
+    call each, so concurrent writer threads never interleave lines.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def write(self, df: pd.DataFrame, extra: Optional[Dict[str, Any]] = None):
+        payload = frame_to_ndjson(df, extra=extra)
+        if not payload:
+            return
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "ab")
+            self._file.write(payload)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
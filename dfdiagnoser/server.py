@@ -0,0 +1,211 @@
+"""Long-lived diagnosis server listening on a local Unix socket.
+
+The server keeps one warm ``Diagnoser`` (compiled rules, motif table, read
+and result caches) and the configured output, and serves
+``diagnose_checkpoint`` requests from ``dfdiagnoser.client`` concurrently.
+Requests for the same checkpoint are serialized (diagnosis and output), so
+they never write the same output files at once; different checkpoints run
+in parallel.
+
+The protocol is one JSON object per line in each direction::
+
+    {"op": "diagnose_checkpoint", "checkpoint_dir": "...", "metric_boundaries": {...},
+     "min_severity": "high"}
+    {"ok": true, "elapsed_sec": 0.012, "views": [{"path": "...", "rows": 56, ...}]}
+
+Other ops are ``ping`` and ``shutdown``. Failures are returned as
+``{"ok": false, "error": "...", "error_type": "..."}``.
+
+The socket is created with mode ``0600``. A server refuses to start when
+another one already answers on its path, and only ever removes sockets
+(never other files) left behind there.
+"""
+import errno
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import structlog
+
+from .client import DEFAULT_SOCKET_PATH
+
+
+logger = structlog.get_logger()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    server: "DiagnoserServer"
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = self.server.dispatch(line)
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class DiagnoserServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: str,
+        diagnoser,
+        output=None,
+        metric_boundaries: Optional[Dict[str, Any]] = None,
+    ):
+        # A stale socket from a previous run would make bind() fail
+        _remove_stale_socket(socket_path)
+        self.socket_path = socket_path
+        self._bound = False
+        super().__init__(socket_path, _RequestHandler)
+        self.diagnoser = diagnoser
+        self.output = output
+        self.metric_boundaries = metric_boundaries or {}
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._checkpoint_locks: Dict[str, threading.Lock] = {}
+
+    def server_bind(self):
+        # Create the socket owner-only rather than chmod-ing it after bind()
+        umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+        self._bound = True
+
+    def _checkpoint_lock(self, checkpoint_dir: str) -> threading.Lock:
+        with self._lock:
+            return self._checkpoint_locks.setdefault(checkpoint_dir, threading.Lock())
+
+    def dispatch(self, line: bytes) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            request = json.loads(line)
+            op = request.get("op")
+            if op == "ping":
+                response = {"ok": True, "pid": os.getpid(), "requests": self.requests}
+            elif op == "diagnose_checkpoint":
+                response = self.diagnose_checkpoint(request)
+            elif op == "shutdown":
+                threading.Thread(target=self.shutdown, daemon=True).start()
+                response = {"ok": True}
+            else:
+                raise ValueError(f"Unsupported op: {op}")
+        except Exception as e:
+            logger.exception("server.request.failed")
+            response = {"ok": False, "error": str(e), "error_type": type(e).__name__}
+        response["elapsed_sec"] = round(time.perf_counter() - start, 6)
+        return response
+
+    def diagnose_checkpoint(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        checkpoint_dir = request["checkpoint_dir"]
+        metric_boundaries = request.get("metric_boundaries")
+        if metric_boundaries is None:
+            metric_boundaries = self.metric_boundaries
+        checkpoint_dir = os.path.abspath(checkpoint_dir)
+        with self._checkpoint_lock(checkpoint_dir):
+            result = self.diagnoser.diagnose_checkpoint(
+                checkpoint_dir,
+                metric_boundaries=metric_boundaries,
+                min_severity=request.get("min_severity"),
+            )
+            if self.output is not None and request.get("write_output", True):
+                self.output.handle_result(result)
+        with self._lock:
+            self.requests += 1
+        views: List[Dict[str, Any]] = []
+        for i, (path, scored) in enumerate(zip(result.flat_view_paths, result.scored_flat_views)):
+            view = {"path": path, "rows": len(scored), "columns": len(scored.columns)}
+            if i < len(result.rule_matches):
+                view["rule_matches"] = int(result.rule_matches[i].to_numpy().sum())
+            views.append(view)
+        return {"ok": True, "views": views}
+
+    def server_close(self):
+        super().server_close()
+        if self._bound:
+            self._bound = False
+            try:
+                if stat.S_ISSOCK(os.lstat(self.socket_path).st_mode):
+                    os.remove(self.socket_path)
+            except FileNotFoundError:
+                pass
+
+
+def _remove_stale_socket(socket_path: str):
+    """Remove a socket at ``socket_path`` that no server answers on."""
+    try:
+        mode = os.lstat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(errno.EEXIST, "Not a socket, refusing to replace it", socket_path)
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        pass
+    else:
+        raise OSError(errno.EADDRINUSE, "A server is already listening on", socket_path)
+    finally:
+        probe.close()
+    try:
+        os.remove(socket_path)
+    except FileNotFoundError:
+        pass
+
+
+def main(argv: Optional[List[str]] = None):
+    """Run ``dfdiagnoser-server [--socket PATH] [hydra overrides...]``."""
+    import argparse
+
+    from omegaconf import OmegaConf
+
+    from . import init_with_hydra
+
+    parser = argparse.ArgumentParser(
+        prog="dfdiagnoser-server",
+        description="Serve checkpoint diagnoses from a warm diagnoser over a Unix socket.",
+    )
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Unix socket path")
+    parser.add_argument("overrides", nargs="*", help="Hydra config overrides")
+    args = parser.parse_args(argv)
+
+    overrides = list(args.overrides)
+    if not any(o.startswith("input.checkpoint_dir=") for o in overrides):
+        # Requests name their own checkpoint; the configured input is unused
+        overrides.append("input.checkpoint_dir=.")
+    instance = init_with_hydra(overrides)
+    metric_boundaries = {}
+    if "metric_boundaries" in instance.hydra_config:
+        metric_boundaries = OmegaConf.to_object(instance.hydra_config.metric_boundaries)
+
+    server = DiagnoserServer(
+        args.socket,
+        instance.diagnoser,
+        output=instance.output,
+        metric_boundaries=metric_boundaries,
+    )
+    logger.info("server.started", socket=args.socket, pid=os.getpid())
+    print(f"dfdiagnoser server listening on {args.socket}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        instance.close()
+        logger.info("server.stopped", requests=server.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,19 @@
 import dataclasses as dc
+import json
+import os
+import time
 from collections import defaultdict
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
+from .summaries import ScoredSummaryTable
+
+SNAPSHOT_FILENAME = "state_snapshot.parquet"
+SNAPSHOT_METADATA_KEY = b"dfdiagnoser.state"
+SNAPSHOT_VERSION = 1
+
 
 @dc.dataclass
 class FactObservation:
@@ -15,53 +25,163 @@ class FactObservation:
     opportunity_tags: List[str] = dc.field(default_factory=list)
 
 
+def _popcount(words: np.ndarray) -> int:
+    if hasattr(np, "bitwise_count"):
+        return int(np.bitwise_count(words).sum(dtype=np.int64))
+    return int(np.unpackbits(words.view(np.uint8)).sum(dtype=np.int64))
+
+
+class WindowBitset:
+    """Set of window indices stored as a bit mask.
+
+    Windows are added to a Python ``int`` mask, which costs about as much as
+    a ``set.add``. Queries run on the mask viewed as ``uint64`` words
+    (cached until the next new window), so comparing the windows of two
+    facts is one bitwise AND and popcount over ``windows / 64`` words.
+    """
+
+    def __init__(self, windows=()):
+        self._mask = 0
+        self._count = 0
+        self._last = -1
+        self._words: Optional[np.ndarray] = None
+        for window in windows:
+            self.add(window)
+
+    @property
+    def mask(self) -> int:
+        """The windows as a Python ``int`` (bit ``i`` set for window ``i``)."""
+        return self._mask
+
+    @classmethod
+    def from_mask(cls, mask: int) -> "WindowBitset":
+        bitset = cls()
+        bitset._mask = mask
+        bitset._last = mask.bit_length() - 1
+        bitset._count = _popcount(bitset.words())
+        return bitset
+
+    def add(self, window: int):
+        if window < 0:
+            raise ValueError(f"Window index must be non-negative: {window}")
+        bit = 1 << window
+        if not self._mask & bit:
+            self._mask |= bit
+            self._count += 1
+            if window > self._last:
+                self._last = window
+            self._words = None
+
+    def __contains__(self, window: int) -> bool:
+        return window >= 0 and bool(self._mask >> window & 1)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(np.flatnonzero(self.bits()).tolist())
+
+    def __and__(self, other: "WindowBitset") -> "WindowBitset":
+        return WindowBitset.from_mask(self._mask & other._mask)
+
+    def words(self) -> np.ndarray:
+        """The mask as little-endian ``uint64`` words (read-only)."""
+        if self._words is None:
+            n_words = self._last // 64 + 1 if self._last >= 0 else 1
+            self._words = np.frombuffer(
+                self._mask.to_bytes(n_words * 8, "little"), dtype="<u8"
+            )
+        return self._words
+
+    def bits(self) -> np.ndarray:
+        """Boolean membership array for windows ``0 .. max``."""
+        unpacked = np.unpackbits(self.words().view(np.uint8), bitorder="little")
+        return unpacked[: self._last + 1].astype(bool)
+
+    def max(self) -> Optional[int]:
+        return self._last if self._count else None
+
+    def count(self, start: int = 0, stop: Optional[int] = None) -> int:
+        """Number of windows in ``[start, stop)``."""
+        stop = self._last + 1 if stop is None else min(stop, self._last + 1)
+        start = max(start, 0)
+        if start >= stop:
+            return 0
+        if start == 0 and stop == self._last + 1:
+            return self._count
+        first, last = start // 64, (stop - 1) // 64
+        words = self.words()[first : last + 1].copy()
+        words[0] &= np.uint64(((1 << 64) - 1) ^ ((1 << (start % 64)) - 1))
+        words[-1] &= np.uint64((1 << ((stop - 1) % 64 + 1)) - 1)
+        return _popcount(words)
+
+    def intersection_count(self, other: "WindowBitset") -> int:
+        words, other_words = self.words(), other.words()
+        n = min(len(words), len(other_words))
+        return _popcount(words[:n] & other_words[:n])
+
+    def longest_run(self) -> int:
+        """Length of the longest run of consecutive windows."""
+        if not self._count:
+            return 0
+        edges = np.diff(np.concatenate(([0], self.bits().view(np.int8), [0])))
+        return int((np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)).max())
+
+
 class FactTracker:
     """Tracks all observations of one (fact_type, scope) combination."""
 
     def __init__(self):
         self.observations: List[FactObservation] = []
-        self._windows_seen: set = set()
+        self.windows = WindowBitset()
+        # Facts of a window arrive together: skip re-adding the latest one
+        self._recent_window = -1
         self._total_windows: int = 0
 
     def record(self, obs: FactObservation):
         self.observations.append(obs)
-        self._windows_seen.add(obs.window_index)
+        if obs.window_index != self._recent_window:
+            self.windows.add(obs.window_index)
+            self._recent_window = obs.window_index
 
     def prevalence(self, total_windows: Optional[int] = None) -> float:
         """Fraction of total windows where this fact was observed."""
         effective_total = total_windows if total_windows is not None else self._total_windows
         if effective_total == 0:
             return 0.0
-        return len(self._windows_seen) / effective_total
+        return len(self.windows) / effective_total
+
+    def sliding_prevalence(self, window: int, end: Optional[int] = None) -> float:
+        """Fraction of the ``window`` windows before ``end`` where this fact was observed.
+
+        ``end`` defaults to the number of windows seen so far.
+        """
+        if end is None:
+            end = max(self._total_windows, self.windows.max() + 1 if self.windows else 0)
+        start = max(end - window, 0)
+        if end <= start:
+            return 0.0
+        return self.windows.count(start, end) / (end - start)
 
     def persistence(self) -> int:
         """Longest consecutive run of windows with this fact."""
-        if not self._windows_seen:
-            return 0
-        sorted_wins = sorted(self._windows_seen)
-        longest = 1
-        current = 1
-        for i in range(1, len(sorted_wins)):
-            if sorted_wins[i] == sorted_wins[i - 1] + 1:
-                current += 1
-                longest = max(longest, current)
-            else:
-                current = 1
-        return longest
+        return self.windows.longest_run()
+
+    def co_occurrence(self, other: "FactTracker") -> int:
+        """Number of windows in which both this fact and ``other`` were observed."""
+        return self.windows.intersection_count(other.windows)
 
     def update_total_windows(self, total: int):
         self._total_windows = total
 
     def support_windows(self) -> int:
-        return len(self._windows_seen)
+        return len(self.windows)
 
     def last_seen_window(self) -> Optional[int]:
-        if not self._windows_seen:
-            return None
-        return max(self._windows_seen)
+        return self.windows.max()
 
     def observed_in_window(self, window_index: int) -> bool:
-        return window_index in self._windows_seen
+        return window_index in self.windows
 
 
 class DiagnosisStateStore:
@@ -70,15 +190,40 @@ class DiagnosisStateStore:
     def __init__(self):
         self.current_window: int = 0
         self._trackers: Dict[Tuple[str, str], FactTracker] = defaultdict(FactTracker)
-        self._scored_summaries: List[Dict[str, Any]] = []
+        self.scored_summaries = ScoredSummaryTable()
+        self._fact_types: set = set()
+        # Union of the tracker windows per fact type, rebuilt after new facts
+        self._fact_type_windows: Optional[Dict[str, WindowBitset]] = None
+        self._journal = None
+
+    def attach_journal(self, journal):
+        """Append every subsequent fact and window boundary to ``journal``."""
+        self._journal = journal
 
     def record_fact(self, key: Tuple[str, str], obs: FactObservation):
         self._trackers[key].record(obs)
+        self._fact_types.add(key[0])
+        self._fact_type_windows = None
+        if self._journal is not None:
+            self._journal.append_fact(key, obs)
+
+    def record_facts(self, keys: List[Tuple[str, str]], obs_batch: List[FactObservation]):
+        """Record a batch of observations; ``keys[i]`` goes with ``obs_batch[i]``."""
+        trackers = self._trackers
+        journal = self._journal
+        for key, obs in zip(keys, obs_batch):
+            trackers[key].record(obs)
+            if journal is not None:
+                journal.append_fact(key, obs)
+        self._fact_types.update(key[0] for key in keys)
+        self._fact_type_windows = None
 
     def advance_window(self):
         self.current_window += 1
         for tracker in self._trackers.values():
             tracker.update_total_windows(self.current_window)
+        if self._journal is not None:
+            self._journal.append_window(self.current_window)
 
     def effective_total_windows(self) -> int:
         max_seen_window = -1
@@ -90,19 +235,133 @@ class DiagnosisStateStore:
 
     def record_scored_summary(self, scored_df: pd.DataFrame):
         """Extract and store summary stats from a scored flat view."""
-        score_cols = [c for c in scored_df.columns if c.endswith("_score")]
-        if not score_cols:
-            return
-        summary = {
-            "window_index": self.current_window,
-            "n_rows": len(scored_df),
-        }
-        for col in score_cols:
-            vals = scored_df[col].dropna()
-            if len(vals) > 0:
-                summary[f"{col}_mean"] = float(vals.mean())
-                summary[f"{col}_max"] = float(vals.max())
-        self._scored_summaries.append(summary)
+        self.scored_summaries.append(self.current_window, scored_df)
+
+    def fact_types(self) -> set:
+        """Fact types recorded so far, maintained incrementally."""
+        return self._fact_types
+
+    def fact_type_windows(self) -> Dict[str, WindowBitset]:
+        """Windows in which each fact type was observed, in any scope."""
+        if self._fact_type_windows is None:
+            masks: Dict[str, int] = defaultdict(int)
+            for (fact_type, _), tracker in self._trackers.items():
+                masks[fact_type] |= tracker.windows.mask
+            self._fact_type_windows = {
+                fact_type: WindowBitset.from_mask(mask) for fact_type, mask in masks.items()
+            }
+        return self._fact_type_windows
+
+    def co_occurrence(self, key_a: Tuple[str, str], key_b: Tuple[str, str]) -> int:
+        """Number of windows in which both tracked facts were observed."""
+        tracker_a, tracker_b = self._trackers.get(key_a), self._trackers.get(key_b)
+        if tracker_a is None or tracker_b is None:
+            return 0
+        return tracker_a.co_occurrence(tracker_b)
 
     def all_trackers(self) -> List[Tuple[Tuple[str, str], FactTracker]]:
         return list(self._trackers.items())
+
+    def save_snapshot(self, path: str, position: Optional[Dict[str, Any]] = None) -> str:
+        """Write a compact parquet snapshot of the store to ``path``.
+
+        Observations are stored one row per (key, observation) in record
+        order; the window counter, scored summaries and the stream
+        ``position`` the snapshot corresponds to are kept in the schema
+        metadata. The file is written to a temporary name and renamed so a
+        crash never leaves a truncated snapshot behind.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns = {
+            "fact_type": [],
+            "scope": [],
+            "window_index": [],
+            "epoch": [],
+            "severity_score": [],
+            "severity_label": [],
+            "evidence": [],
+            "opportunity_tags": [],
+        }
+        for (fact_type, scope), tracker in self._trackers.items():
+            for obs in tracker.observations:
+                columns["fact_type"].append(fact_type)
+                columns["scope"].append(scope)
+                columns["window_index"].append(obs.window_index)
+                columns["epoch"].append(obs.epoch)
+                columns["severity_score"].append(float(obs.severity_score))
+                columns["severity_label"].append(obs.severity_label)
+                columns["evidence"].append(json.dumps(obs.evidence, default=str))
+                columns["opportunity_tags"].append([str(t) for t in obs.opportunity_tags])
+
+        schema = pa.schema(
+            [
+                ("fact_type", pa.dictionary(pa.int32(), pa.string())),
+                ("scope", pa.dictionary(pa.int32(), pa.string())),
+                ("window_index", pa.int64()),
+                ("epoch", pa.int64()),
+                ("severity_score", pa.float64()),
+                ("severity_label", pa.dictionary(pa.int32(), pa.string())),
+                ("evidence", pa.string()),
+                ("opportunity_tags", pa.list_(pa.string())),
+            ]
+        )
+        state_meta = {
+            "version": SNAPSHOT_VERSION,
+            "created_at": time.time(),
+            "current_window": self.current_window,
+            "position": position or {},
+            "scored_summaries": self.scored_summaries.to_dict(),
+        }
+        schema = schema.with_metadata(
+            {SNAPSHOT_METADATA_KEY: json.dumps(state_meta, default=str).encode("utf-8")}
+        )
+        table = pa.Table.from_pydict(columns, schema=schema)
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load_snapshot(cls, path: str) -> Tuple["DiagnosisStateStore", Dict[str, Any]]:
+        """Restore a store written by :meth:`save_snapshot`.
+
+        Returns the store and the stream position recorded with it.
+        """
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path)
+        raw_meta = (table.schema.metadata or {}).get(SNAPSHOT_METADATA_KEY)
+        if raw_meta is None:
+            raise ValueError(f"{path} is not a dfdiagnoser state snapshot")
+        state_meta = json.loads(raw_meta.decode("utf-8"))
+        if state_meta.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(
+                f"Unsupported state snapshot version {state_meta.get('version')} in {path}"
+            )
+
+        store = cls()
+        columns = table.to_pydict()
+        for i in range(table.num_rows):
+            obs = FactObservation(
+                window_index=columns["window_index"][i],
+                epoch=columns["epoch"][i],
+                severity_score=columns["severity_score"][i],
+                severity_label=columns["severity_label"][i],
+                evidence=json.loads(columns["evidence"][i]),
+                opportunity_tags=list(columns["opportunity_tags"][i] or []),
+            )
+            store.record_fact((columns["fact_type"][i], columns["scope"][i]), obs)
+        store.current_window = state_meta["current_window"]
+        for tracker in store._trackers.values():
+            tracker.update_total_windows(store.current_window)
+        scored_summaries = state_meta.get("scored_summaries") or []
+        if isinstance(scored_summaries, dict):
+            store.scored_summaries = ScoredSummaryTable.from_dict(scored_summaries)
+        else:
+            # Snapshots written before the columnar table kept per-window dicts
+            store.scored_summaries = ScoredSummaryTable.from_records(scored_summaries)
+        return store, state_meta.get("position", {})
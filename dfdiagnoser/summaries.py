@@ -0,0 +1,243 @@
+"""Columnar history of per-window score summaries."""
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+SCORE_SUFFIX = "_score"
+STATS = ("mean", "max", "count")
+# Histogram bins: score 1..5 (trivial..critical) and missing scores. Score 0
+# (value at or below the lowest boundary) is counted as trivial.
+HIST_LEVELS = ("trivial", "low", "medium", "high", "critical", "null")
+NULL_BIN = len(HIST_LEVELS) - 1
+
+
+class ScoredSummaryTable:
+    """Per-window mean/max/count of every score column, stored columnar.
+
+    Rows are windows (in the order views were recorded) and columns are
+    score metrics, held in preallocated numpy arrays that grow by doubling.
+    A view is reduced in one pass over its score block; metrics first seen
+    in a later view get a new column that is NaN (count 0) for earlier rows.
+
+    ``hist[row, metric]`` holds the number of rows per ``HIST_LEVELS`` bin,
+    so distribution queries (e.g. :meth:`fraction_at_least`) need no scored
+    frames.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.metrics: List[str] = []
+        self._metric_index: Dict[str, int] = {}
+        self._size = 0
+        self._capacity = max(capacity, 1)
+        self.window_index = np.zeros(self._capacity, dtype=np.int64)
+        self.n_rows = np.zeros(self._capacity, dtype=np.int64)
+        self.mean = np.full((self._capacity, 0), np.nan)
+        self.max = np.full((self._capacity, 0), np.nan)
+        self.count = np.zeros((self._capacity, 0), dtype=np.int64)
+        self.hist = np.zeros((self._capacity, 0, len(HIST_LEVELS)), dtype=np.int32)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _ensure_rows(self, rows: int):
+        if rows <= self._capacity:
+            return
+        capacity = self._capacity
+        while capacity < rows:
+            capacity *= 2
+        grow = capacity - self._capacity
+        self.window_index = np.concatenate([self.window_index, np.zeros(grow, dtype=np.int64)])
+        self.n_rows = np.concatenate([self.n_rows, np.zeros(grow, dtype=np.int64)])
+        self.mean = np.vstack([self.mean, np.full((grow, self.mean.shape[1]), np.nan)])
+        self.max = np.vstack([self.max, np.full((grow, self.max.shape[1]), np.nan)])
+        self.count = np.vstack([self.count, np.zeros((grow, self.count.shape[1]), dtype=np.int64)])
+        self.hist = np.concatenate(
+            [self.hist, np.zeros((grow,) + self.hist.shape[1:], dtype=np.int32)]
+        )
+        self._capacity = capacity
+
+    def _columns_for(self, metrics: List[str]) -> np.ndarray:
+        new = [m for m in metrics if m not in self._metric_index]
+        if new:
+            for metric in new:
+                self._metric_index[metric] = len(self.metrics)
+                self.metrics.append(metric)
+            extra = len(new)
+            self.mean = np.hstack([self.mean, np.full((self._capacity, extra), np.nan)])
+            self.max = np.hstack([self.max, np.full((self._capacity, extra), np.nan)])
+            self.count = np.hstack(
+                [self.count, np.zeros((self._capacity, extra), dtype=np.int64)]
+            )
+            self.hist = np.concatenate(
+                [self.hist, np.zeros((self._capacity, extra, len(HIST_LEVELS)), dtype=np.int32)],
+                axis=1,
+            )
+        return np.fromiter((self._metric_index[m] for m in metrics), dtype=np.intp, count=len(metrics))
+
+    def append(self, window_index: int, scored_df: pd.DataFrame) -> bool:
+        """Reduce the score columns of ``scored_df`` into a new row."""
+        score_cols = [c for c in scored_df.columns if c.endswith(SCORE_SUFFIX)]
+        if not score_cols:
+            return False
+        block = score_block(scored_df, score_cols)
+        valid = ~np.isnan(block)
+        counts = valid.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(valid, block, 0).sum(axis=0) / counts
+        maxes = np.fmax.reduce(block, axis=0) if len(block) else np.full(len(score_cols), np.nan)
+        hist = score_histogram(block)
+
+        columns = self._columns_for(score_cols)
+        row = self._size
+        self._ensure_rows(row + 1)
+        self.window_index[row] = window_index
+        self.n_rows[row] = len(scored_df)
+        self.mean[row, columns] = means
+        self.max[row, columns] = maxes
+        self.count[row, columns] = counts
+        self.hist[row, columns] = hist
+        self._size += 1
+        return True
+
+    def fraction_at_least(self, level: str = "high") -> pd.DataFrame:
+        """Per view and metric, the fraction of scored rows at ``level`` or above.
+
+        Missing scores are excluded from the denominator; metrics without
+        any score in a view are NaN.
+        """
+        start = HIST_LEVELS.index(level)
+        if start == NULL_BIN:
+            raise ValueError(f"Unsupported score level: {level}")
+        hist = self.hist[: self._size]
+        scored = hist[..., :NULL_BIN].sum(axis=2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fraction = hist[..., start:NULL_BIN].sum(axis=2) / scored
+        return pd.DataFrame(fraction, index=self._frame_index(), columns=list(self.metrics))
+
+    def rows_for_window(self, window_index: int) -> np.ndarray:
+        return np.flatnonzero(self.window_index[: self._size] == window_index)
+
+    def window(self, window_index: int) -> Dict[str, Any]:
+        """Summary of the last view recorded in ``window_index`` (empty if none)."""
+        rows = self.rows_for_window(window_index)
+        if not len(rows):
+            return {}
+        return self._record(rows[-1])
+
+    def _record(self, row: int) -> Dict[str, Any]:
+        record = {
+            "window_index": int(self.window_index[row]),
+            "n_rows": int(self.n_rows[row]),
+        }
+        for j, metric in enumerate(self.metrics):
+            if not np.isnan(self.mean[row, j]):
+                record[f"{metric}_mean"] = float(self.mean[row, j])
+                record[f"{metric}_max"] = float(self.max[row, j])
+        return record
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Rows in the legacy ``{col}_score_mean``/``{col}_score_max`` dict form."""
+        return [self._record(row) for row in range(self._size)]
+
+    def to_frame(self, stat: Optional[str] = None) -> pd.DataFrame:
+        """History as a frame with one row per view.
+
+        With ``stat`` (``mean``, ``max`` or ``count``) the columns are the
+        score metrics; otherwise they are a ``(stat, metric)`` MultiIndex.
+        """
+        index = self._frame_index()
+        frames = {
+            name: pd.DataFrame(
+                getattr(self, name)[: self._size], index=index, columns=list(self.metrics)
+            )
+            for name in STATS
+        }
+        if stat is not None:
+            return frames[stat]
+        return pd.concat(frames, axis=1)
+
+    def _frame_index(self) -> pd.MultiIndex:
+        return pd.MultiIndex.from_arrays(
+            [self.window_index[: self._size], self.n_rows[: self._size]],
+            names=["window_index", "n_rows"],
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable columnar form (NaN written as ``None``)."""
+        def rows(values):
+            return [[None if np.isnan(v) else float(v) for v in row] for row in values[: self._size]]
+
+        return {
+            "metrics": list(self.metrics),
+            "window_index": self.window_index[: self._size].tolist(),
+            "n_rows": self.n_rows[: self._size].tolist(),
+            "mean": rows(self.mean),
+            "max": rows(self.max),
+            "count": self.count[: self._size].tolist(),
+            "hist": self.hist[: self._size].tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ScoredSummaryTable":
+        table = cls(capacity=max(len(data["window_index"]), 1))
+        size = len(data["window_index"])
+        table._columns_for(list(data["metrics"]))
+        table._size = size
+        if size:
+            table.window_index[:size] = data["window_index"]
+            table.n_rows[:size] = data["n_rows"]
+            table.mean[:size] = np.array(data["mean"], dtype=float)
+            table.max[:size] = np.array(data["max"], dtype=float)
+            table.count[:size] = data["count"]
+            if "hist" in data:
+                table.hist[:size] = np.array(data["hist"], dtype=np.int32).reshape(
+                    (size, len(table.metrics), len(HIST_LEVELS))
+                )
+        return table
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]]) -> "ScoredSummaryTable":
+        """Rebuild from legacy per-window dicts (counts are not recoverable)."""
+        table = cls(capacity=max(len(records), 1))
+        for record in records:
+            metrics = sorted(
+                key[: -len("_mean")] for key in record if key.endswith(f"{SCORE_SUFFIX}_mean")
+            )
+            columns = table._columns_for(metrics)
+            row = table._size
+            table._ensure_rows(row + 1)
+            table.window_index[row] = record.get("window_index", 0)
+            table.n_rows[row] = record.get("n_rows", 0)
+            table.mean[row, columns] = [record[f"{m}_mean"] for m in metrics]
+            table.max[row, columns] = [record[f"{m}_max"] for m in metrics]
+            table._size += 1
+        return table
+
+
+def score_block(scored_df: pd.DataFrame, score_cols: List[str]) -> np.ndarray:
+    """Score columns as one ``(rows, metrics)`` float64 array, NA as NaN."""
+    return scored_df[score_cols].to_numpy(dtype="float64", na_value=np.nan)
+
+
+def score_codes(block: np.ndarray) -> np.ndarray:
+    """``HIST_LEVELS`` bin of every score in a block, as int8."""
+    codes = np.full(block.shape, NULL_BIN, dtype=np.int8)
+    valid = ~np.isnan(block)
+    codes[valid] = np.clip(block[valid], 1, NULL_BIN) - 1
+    return codes
+
+
+def score_histogram(block: np.ndarray) -> np.ndarray:
+    """Count rows per ``HIST_LEVELS`` bin for each column of a score block.
+
+    Scores are mapped to int8 bin codes and all columns are counted with a
+    single ``np.bincount`` over ``column * n_bins + code``.
+    """
+    n_bins = len(HIST_LEVELS)
+    n_cols = block.shape[1]
+    codes = score_codes(block)
+    offsets = np.arange(n_cols, dtype=np.intp) * n_bins
+    counts = np.bincount((codes + offsets).ravel(), minlength=n_cols * n_bins)
+    return counts.reshape(n_cols, n_bins)
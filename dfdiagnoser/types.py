@@ -3,7 +3,10 @@ import pandas as pd
 from typing import Any, Dict, List, Literal, Optional, Tuple
 
 
-FileOutputFormat = Literal["csv", "json", "parquet"]
+FileOutputFormat = Literal["csv", "json", "ndjson", "parquet"]
+FileOutputMode = Literal["files", "dataset"]
+JsonLayout = Literal["split", "index"]
+CheckpointReadMode = Literal["default", "mmap", "dataset"]
 
 
 @dc.dataclass
@@ -37,3 +40,11 @@ class DiagnosisResult:
     flat_view_paths: List[str]
     scored_flat_views: List[pd.DataFrame]
     findings: List[DiagnosisFinding] = dc.field(default_factory=list)
+    # One boolean (rule, layer, check) frame per scored flat view
+    rule_matches: List[pd.DataFrame] = dc.field(default_factory=list)
+    # Analysis window the views were scored in (streaming mode only)
+    window_index: Optional[int] = None
+    # Merged ``_raw_stats_*.json`` of the checkpoint (checkpoint mode only)
+    raw_stats: Dict[str, Any] = dc.field(default_factory=dict)
+    # Per scored flat view, dimension rollups by key (when rollups are enabled)
+    rollups: List[Dict[str, pd.DataFrame]] = dc.field(default_factory=list)
@@ -1,17 +1,59 @@
+import atexit
+import functools
 import logging
 import logging.config
+import logging.handlers
+import queue
 import structlog
+import threading
 import time
 from contextlib import contextmanager
 from pathlib import Path
-from rich.console import Console
+from typing import Dict, Optional
 
-from .notebook_utils import IN_JUPYTER
+from .notebook_utils import in_jupyter
 
-console = Console()
 
+@functools.lru_cache(maxsize=None)
+def get_console():
+    """Shared rich console, created on first use to keep imports light."""
+    from rich.console import Console
 
-def configure_logging(log_file: str, level: str = "info") -> None:
+    return Console()
+
+
+class _StructlogQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that leaves rendering to the listener thread.
+
+    The stock ``prepare`` formats the message on the calling thread, which
+    is exactly the work we want to move off the event loop; structlog has
+    already copied the event into a fresh dict, so the record is enqueued
+    as is.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def stop_logging() -> None:
+    """Flush and stop the background log listener, if one is running."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_logging(log_file: str, level: str = "info", async_logging: bool = False) -> None:
+    """Route structlog and stdlib logging to a JSON lines file.
+
+    With ``async_logging`` the root logger only enqueues records, and a
+    ``QueueListener`` thread renders JSON and writes the file.
+    """
+    global _listener
+    stop_logging()
     log_path = Path(log_file)
     log_path.parent.mkdir(parents=True, exist_ok=True)
 
@@ -49,6 +91,18 @@ def configure_logging(log_file: str, level: str = "info") -> None:
 
     logging.config.dictConfig(logging_config)
 
+    if async_logging:
+        root = logging.getLogger()
+        handlers = list(root.handlers)
+        log_queue = queue.SimpleQueue()
+        for handler in handlers:
+            root.removeHandler(handler)
+        root.addHandler(_StructlogQueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(
+            log_queue, *handlers, respect_handler_level=True
+        )
+        _listener.start()
+
     structlog.configure(
         processors=[
             structlog.stdlib.filter_by_level,
@@ -68,6 +122,50 @@ def configure_logging(log_file: str, level: str = "info") -> None:
     )
 
 
+atexit.register(stop_logging)
+
+
+class SampledLogger:
+    """Level-gated, sampled logging for events emitted on the hot path.
+
+    ``level`` is the level hot-path events are logged at, or ``"off"``.
+    With ``sample_every=N`` only the first of every N occurrences of an
+    event is logged, carrying ``skipped=<count>`` for the suppressed ones
+    in between. ``should_log`` lets callers skip building expensive fields
+    for events that will not be emitted.
+    """
+
+    def __init__(self, logger=None, level: str = "info", sample_every: int = 1):
+        self.logger = logger or structlog.get_logger()
+        self.level = level.lower()
+        self.sample_every = max(1, sample_every)
+        self._levelno = (
+            None if self.level == "off" else logging.getLevelName(self.level.upper())
+        )
+        self._counts: Dict[str, int] = {}
+        self._skipped: Dict[str, int] = {}
+
+    def should_log(self, event: str) -> bool:
+        if self._levelno is None or not logging.getLogger().isEnabledFor(self._levelno):
+            return False
+        count = self._counts.get(event, 0)
+        self._counts[event] = count + 1
+        if count % self.sample_every:
+            self._skipped[event] = self._skipped.get(event, 0) + 1
+            return False
+        return True
+
+    def log(self, event: str, **kwargs):
+        """Emit ``event``; callers are expected to have checked ``should_log``."""
+        if self.sample_every > 1:
+            kwargs["skipped"] = self._skipped.pop(event, 0)
+        getattr(self.logger, self.level)(event, **kwargs)
+
+    def maybe_log(self, event: str, **kwargs):
+        if self.should_log(event):
+            self.log(event, **kwargs)
+
+
 @contextmanager
 def console_block(message: str, level: str = "info", logger=None, **kwargs):
     """
@@ -75,11 +173,14 @@ def console_block(message: str, level: str = "info", logger=None, **kwargs):
     """
     logger = logger or structlog.get_logger()
     start = time.perf_counter()
-    if IN_JUPYTER:
+    # Spinners are only drawn from the main thread; rich allows a single live
+    # display, and worker threads (e.g. the diagnosis server) run concurrently.
+    if in_jupyter() or threading.current_thread() is not threading.main_thread():
         yield
         elapsed = time.perf_counter() - start
         getattr(logger, level)(message, elapsed=elapsed, **kwargs)
         return
+    console = get_console()
     with console.status(f"{message}...", spinner="dots"):
         try:
             getattr(logger, level)(f"▶ {message}...", **kwargs)
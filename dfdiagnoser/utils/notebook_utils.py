@@ -1,14 +1,23 @@
-try:
-    from IPython import get_ipython
-
-    ipy = get_ipython()
-    if ipy is not None:
-        shell = ipy.__class__.__name__
-        if shell == "ZMQInteractiveShell":
-            IN_JUPYTER = True
-        else:
-            IN_JUPYTER = False
-    else:
-        IN_JUPYTER = False
-except (NameError, ImportError, AttributeError):
-    IN_JUPYTER = False
+import functools
+import sys
+
+
+@functools.lru_cache(maxsize=None)
+def in_jupyter() -> bool:
+    # A Jupyter kernel has always imported IPython already, so there is no
+    # need to pay for importing it ourselves just to find out we are not in one.
+    if "IPython" not in sys.modules:
+        return False
+    try:
+        from IPython import get_ipython
+
+        ipy = get_ipython()
+        return ipy is not None and ipy.__class__.__name__ == "ZMQInteractiveShell"
+    except (NameError, ImportError, AttributeError):
+        return False
+
+
+def __getattr__(name):
+    if name == "IN_JUPYTER":
+        return in_jupyter()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -6,6 +6,23 @@ import time
 import uuid
 
 
+@pytest.fixture
+def fake_stream(monkeypatch):
+    """Replace the Mofka consumer with one that yields the given events."""
+    from dfdiagnoser.streaming import mofka_io
+
+    from .fakes import FakeConsumer
+
+    def install(events):
+        consumer = FakeConsumer(events)
+        monkeypatch.setattr(
+            mofka_io, "open_consumer", lambda *args, **kwargs: (object(), consumer)
+        )
+        return consumer
+
+    return install
+
+
 def _mofka_available():
     try:
         import mochi.mofka.client as mofka  # noqa: F401
@@ -0,0 +1,57 @@
+"""In-process stand-ins for Mofka consumers and events."""
+import json
+
+
+class FakeFuture:
+    def __init__(self, event):
+        self._event = event
+
+    def wait(self, timeout_ms):
+        return self._event
+
+
+class FakeEvent:
+    def __init__(self, event_id, metadata, payload: bytes):
+        self.event_id = event_id
+        self.metadata = metadata
+        self.data = payload
+        self.acknowledged = False
+
+    def acknowledge(self):
+        self.acknowledged = True
+
+
+class FakeConsumer:
+    def __init__(self, events):
+        self._events = list(events)
+
+    def pull(self):
+        return FakeFuture(self._events.pop(0) if self._events else None)
+
+
+def facts_event(event_id, fact_type="excessive_metadata_access", facts=None):
+    if facts is None:
+        facts = [
+            {
+                "fact_type": fact_type,
+                "scope": {"layer": "reader_posix", "entity": "1"},
+                "window": {"epoch": event_id},
+                "severity": {"score": 0.7, "label": "high"},
+                "opportunity_tags": ["metadata_reduction"],
+                "evidence": {"metrics": {"reader_posix_metadata_time_frac_parent": 0.6}},
+            }
+        ]
+    envelope = {"view_type": "epoch", "facts": facts}
+    return FakeEvent(
+        event_id,
+        {"artifact_type": "analysis_facts"},
+        json.dumps(envelope).encode("utf-8"),
+    )
+
+
+def flat_view_event(event_id, payload: bytes, view_type="time_range"):
+    return FakeEvent(event_id, {"artifact_type": "flat_view", "view_type": view_type}, payload)
+
+
+def stop_event(event_id):
+    return FakeEvent(event_id, {"name": "end"}, b"")
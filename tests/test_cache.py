@@ -0,0 +1,132 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from dfdiagnoser.cache import ResultCache
+from dfdiagnoser.diagnoser import Diagnoser
+
+
+pytestmark = [pytest.mark.smoke, pytest.mark.full]
+
+
+CHECKPOINT_DIR = os.path.join(
+    os.path.dirname(__file__), "data", "dfanalyzer_checkpoints", "unet3d_v100"
+)
+
+RULE_DEFS = {
+    "posix": {
+        "busy_layer": {
+            "name": "Busy layer",
+            "condition": "{posix_layer}_count_sum > 0",
+        }
+    }
+}
+
+
+@pytest.fixture
+def checkpoint_dir(tmp_path):
+    path = tmp_path / "checkpoint"
+    shutil.copytree(CHECKPOINT_DIR, path)
+    return str(path)
+
+
+def _frame(n_rows: int) -> pd.DataFrame:
+    return pd.DataFrame({"value": range(n_rows)}, index=pd.Index(range(n_rows), name="time_range"))
+
+
+def test_diagnose_checkpoint_reuses_cached_views(tmp_path, checkpoint_dir, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    first = Diagnoser(rule_defs=RULE_DEFS, cache_dir=cache_dir).diagnose_checkpoint(checkpoint_dir)
+
+    diagnoser = Diagnoser(rule_defs=RULE_DEFS, cache_dir=cache_dir)
+    monkeypatch.setattr(diagnoser, "_read_flat_view", lambda *args: pytest.fail("cache miss"))
+    second = diagnoser.diagnose_checkpoint(checkpoint_dir)
+
+    assert diagnoser.result_cache.hits == 2
+    for expected, cached in zip(first.scored_flat_views, second.scored_flat_views):
+        pd.testing.assert_frame_equal(cached, expected)
+    for expected, cached in zip(first.rule_matches, second.rule_matches):
+        pd.testing.assert_frame_equal(cached, expected)
+
+
+def test_changed_inputs_or_config_are_rescored(tmp_path, checkpoint_dir):
+    cache_dir = str(tmp_path / "cache")
+    Diagnoser(cache_dir=cache_dir).diagnose_checkpoint(checkpoint_dir)
+
+    diagnoser = Diagnoser(cache_dir=cache_dir)
+    diagnoser.diagnose_checkpoint(checkpoint_dir, metric_boundaries={"app_count_sum": 10})
+    assert (diagnoser.result_cache.hits, diagnoser.result_cache.misses) == (0, 2)
+
+    os.utime(os.path.join(checkpoint_dir, "_flat_view_proc_name_1.parquet"), ns=(0, 0))
+    diagnoser = Diagnoser(cache_dir=cache_dir)
+    diagnoser.diagnose_checkpoint(checkpoint_dir)
+    assert (diagnoser.result_cache.hits, diagnoser.result_cache.misses) == (1, 1)
+
+
+def test_categorical_dimensions_are_part_of_the_cache_key(tmp_path):
+    plain = Diagnoser(cache_dir=str(tmp_path))
+    categorical = Diagnoser(cache_dir=str(tmp_path), categorical_dimensions=True)
+    assert plain._checkpoint_fingerprint({}) != categorical._checkpoint_fingerprint({})
+
+
+def test_eviction_drops_least_recently_used_entries(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=10 ** 9)
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, _frame(100))
+        os.utime(cache._path(key, ".scored.parquet"), ns=(i, i))
+    assert cache.get("a") is not None  # refreshes "a"
+
+    entry_bytes = os.path.getsize(cache._path("a", ".scored.parquet"))
+    cache.max_bytes = 2 * entry_bytes
+    cache.evict()
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_eviction_tracks_size_without_rescanning(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path), max_bytes=10 ** 9)
+    cache.put("a", _frame(100))
+    entry_bytes = os.path.getsize(cache._path("a", ".scored.parquet"))
+    cache.max_bytes = 2 * entry_bytes
+
+    monkeypatch.setattr(os, "scandir", lambda *args: pytest.fail("cache directory rescanned"))
+    monkeypatch.setattr(os, "listdir", lambda *args: pytest.fail("cache directory rescanned"))
+    cache.put("b", _frame(100))
+    cache.put("c", _frame(100))
+
+    assert not os.path.exists(cache._path("a", ".scored.parquet"))
+    assert cache._total_bytes == 2 * entry_bytes
+
+
+def test_concurrent_gets_and_puts_count_every_lookup(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    cache = ResultCache(str(tmp_path), max_bytes=10 ** 9)
+    cache.put("warm", _frame(10))
+    cache.max_bytes = 3 * os.path.getsize(cache._path("warm", ".scored.parquet"))
+
+    def work(i):
+        key = f"k{i % 5}"
+        if cache.get(key) is None:
+            cache.put(key, _frame(10))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(work, range(200)))
+
+    assert cache.hits + cache.misses == 200
+    assert len(cache._entries) <= 3
+    on_disk = [name for name in os.listdir(tmp_path) if name.endswith(".scored.parquet")]
+    assert sorted(name.split(".")[0] for name in on_disk) == sorted(cache._entries)
+
+
+def test_vanished_entry_is_a_miss(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.put("a", _frame(3))
+    os.remove(cache._path("a", ".scored.parquet"))
+
+    assert cache.get("a") is None
+    assert (cache.hits, cache.misses) == (0, 1)
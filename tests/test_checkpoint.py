@@ -0,0 +1,227 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from dfdiagnoser.checkpoint import FlatViewReader, iter_flat_view_batches, merge_raw_stats
+from dfdiagnoser.diagnoser import Diagnoser
+
+
+pytestmark = [pytest.mark.smoke, pytest.mark.full]
+
+
+CHECKPOINT_DIR = os.path.join(
+    os.path.dirname(__file__), "data", "dfanalyzer_checkpoints", "unet3d_v100"
+)
+FLAT_VIEW = os.path.join(CHECKPOINT_DIR, "_flat_view_time_range_1.parquet")
+
+
+def test_mmap_reader_projects_columns_with_arrow_dtypes():
+    reader = FlatViewReader("mmap")
+    columns = reader.columns(FLAT_VIEW)[:3]
+
+    df = reader.read(FLAT_VIEW, columns=columns)
+
+    assert list(df.columns) == columns
+    assert df.index.name == "time_range"
+    assert all(isinstance(dtype, pd.ArrowDtype) for dtype in df.dtypes)
+    expected = pd.read_parquet(FLAT_VIEW, columns=columns)
+    assert df.astype("float64").equals(expected.astype("float64").set_axis(df.index))
+
+
+def test_mmap_reader_extends_cached_table_and_invalidates_on_change(tmp_path):
+    path = str(tmp_path / "view.parquet")
+    shutil.copy(FLAT_VIEW, path)
+    reader = FlatViewReader("mmap")
+    first, second = reader.columns(path)[:2]
+
+    reader.read(path, columns=[first])
+    assert reader.read(path, columns=[second]).columns.tolist() == [second]
+    (_, table, _), = reader._tables.values()
+    assert {first, second} <= set(table.column_names)
+
+    pd.DataFrame({first: [1.0]}, index=pd.Index([1], name="time_range")).to_parquet(path)
+    os.utime(path, ns=(0, 0))
+    assert len(reader.read(path, columns=[first])) == 1
+
+
+def test_mmap_reader_evicts_least_recently_used_tables(tmp_path):
+    paths = []
+    for name in ["a", "b", "c"]:
+        path = str(tmp_path / f"{name}.parquet")
+        shutil.copy(FLAT_VIEW, path)
+        paths.append(path)
+    reader = FlatViewReader("mmap")
+    column = reader.columns(FLAT_VIEW)[0]
+    reader.read(paths[0], columns=[column])
+    (_, _, nbytes), = reader._tables.values()
+    reader.max_cache_bytes = 2 * nbytes
+
+    reader.read(paths[1], columns=[column])
+    reader.read(paths[0], columns=[column])
+    reader.read(paths[2], columns=[column])
+
+    assert list(reader._tables) == [paths[0], paths[2]]
+    assert reader._cached_bytes == 2 * nbytes
+
+    reader.max_cache_bytes = 0
+    reader.read(paths[1], columns=[column])
+    assert list(reader._tables) == [paths[1]]
+    assert reader._cached_bytes == nbytes
+
+
+def test_unknown_read_mode_is_rejected():
+    with pytest.raises(ValueError):
+        FlatViewReader("bogus")
+
+
+def test_diagnose_checkpoint_mmap_scores_like_default():
+    default = Diagnoser().diagnose_checkpoint(CHECKPOINT_DIR)
+    mmap = Diagnoser(checkpoint_read_mode="mmap").diagnose_checkpoint(CHECKPOINT_DIR)
+
+    for expected, scored in zip(default.scored_flat_views, mmap.scored_flat_views):
+        score_cols = [c for c in expected.columns if c.endswith("_score")]
+        assert [c for c in scored.columns if c.endswith("_score")] == score_cols
+        assert len(scored.columns) < len(expected.columns)
+        assert scored[score_cols].astype("float64").fillna(-1).to_numpy().tolist() == (
+            expected[score_cols].astype("float64").fillna(-1).to_numpy().tolist()
+        )
+
+
+def test_dataset_scan_keeps_per_file_provenance_and_schema():
+    paths = sorted(
+        os.path.join(CHECKPOINT_DIR, name)
+        for name in os.listdir(CHECKPOINT_DIR)
+        if name.startswith("_flat_view_")
+    )
+    reader = FlatViewReader("dataset")
+
+    frames = list(reader.scan(paths, lambda available: available[:4]))
+
+    assert [path for path, _ in frames] == paths
+    for path, df in frames:
+        expected = pd.read_parquet(path)
+        assert df.index.name == expected.index.name
+        assert list(df.columns) == list(expected.columns[:4])
+        assert df.equals(expected[df.columns])
+
+
+def test_diagnose_checkpoint_dataset_scores_like_default():
+    default = Diagnoser().diagnose_checkpoint(CHECKPOINT_DIR)
+    dataset = Diagnoser(checkpoint_read_mode="dataset").diagnose_checkpoint(CHECKPOINT_DIR)
+
+    assert dataset.flat_view_paths == default.flat_view_paths
+    for expected, scored in zip(default.scored_flat_views, dataset.scored_flat_views):
+        score_cols = [c for c in expected.columns if c.endswith("_score")]
+        assert scored.index.equals(expected.index)
+        assert scored[score_cols].astype("float64").fillna(-1).to_numpy().tolist() == (
+            expected[score_cols].astype("float64").fillna(-1).to_numpy().tolist()
+        )
+
+
+def test_raw_stats_are_merged_across_files():
+    merged = merge_raw_stats(
+        [
+            {"job_time": 3.0, "total_event_count": 10, "unique_file_count": 4, "time_granularity": 1},
+            {"job_time": 5.0, "total_event_count": 7, "unique_file_count": 2, "time_granularity": 2},
+        ]
+    )
+
+    assert merged == {
+        "job_time": 5.0,
+        "total_event_count": 17,
+        "unique_file_count": 4,
+        "time_granularity": 1,
+    }
+    result = Diagnoser().diagnose_checkpoint(CHECKPOINT_DIR)
+    assert result.raw_stats["total_event_count"] > 0
+
+
+def test_flat_view_batches_keep_index_labels(tmp_path):
+    path = str(tmp_path / "view.parquet")
+    pd.DataFrame({"cpu_pct": range(10)}, index=pd.RangeIndex(5, 15, name="time_range")).to_parquet(
+        path, row_group_size=4
+    )
+
+    batches = list(iter_flat_view_batches(path, batch_size=3))
+
+    assert pd.concat(batches).index.tolist() == list(range(5, 15))
+    named = next(iter_flat_view_batches(FLAT_VIEW, columns=[], batch_size=8))
+    assert named.index.name == "time_range" and len(named) == 8
+
+
+def test_top_k_flat_view_streams_batches():
+    diagnoser = Diagnoser()
+
+    worst = diagnoser.top_k_flat_view(FLAT_VIEW, k=3, batch_size=10)
+
+    assert len(worst) == 3
+    assert worst["combined_score"].is_monotonic_decreasing
+
+
+def _dimension_view(path, n_rows=12):
+    pd.DataFrame(
+        {
+            "cpu_pct": [i / n_rows for i in range(n_rows)],
+            "d_file": [f"/data/file{i % 3}.h5" for i in range(n_rows)],
+            "d_rank": list(range(n_rows)),
+        },
+        index=pd.Index([f"t{i}" for i in range(n_rows)], name="time_range"),
+    ).to_parquet(path, row_group_size=4)
+
+
+@pytest.mark.parametrize("mode", ["default", "mmap", "dataset"])
+def test_categorical_dimensions_are_read_dictionary_encoded(tmp_path, mode):
+    path = str(tmp_path / "_flat_view_time_range_1.parquet")
+    _dimension_view(path)
+    reader = FlatViewReader(mode, categorical_dimensions=True)
+
+    df = reader.read(path)
+    partial = reader.read_row_groups(path, [1])
+
+    for frame in (df, partial):
+        dtype = frame["d_file"].dtype
+        assert isinstance(dtype, pd.CategoricalDtype) or (
+            isinstance(dtype, pd.ArrowDtype) and dtype.pyarrow_dtype.value_type == "string"
+        )
+        assert frame["d_rank"].dtype.kind == "i" or isinstance(frame["d_rank"].dtype, pd.ArrowDtype)
+    assert df["d_file"].astype(str).tolist() == pd.read_parquet(path)["d_file"].tolist()
+    assert partial.index.tolist() == ["t4", "t5", "t6", "t7"]
+
+
+@pytest.mark.parametrize("mode", ["default", "mmap", "dataset"])
+def test_rollups_of_categorical_dimensions_in_every_read_mode(tmp_path, mode):
+    _dimension_view(str(tmp_path / "_flat_view_time_range_1.parquet"))
+    (tmp_path / "_raw_stats_1.json").write_text("{}")
+    dimensions = [["d_file"], ["d_file", "d_rank"]]
+
+    (rollups,) = Diagnoser(
+        checkpoint_read_mode=mode,
+        categorical_dimensions=True,
+        rollup=True,
+        rollup_dimensions=dimensions,
+    ).diagnose_checkpoint(str(tmp_path)).rollups
+    (expected,) = Diagnoser(rollup=True, rollup_dimensions=dimensions).diagnose_checkpoint(
+        str(tmp_path)
+    ).rollups
+
+    assert list(rollups) == ["d_file", "d_file+d_rank"]
+    for key, rollup in rollups.items():
+        assert [tuple(map(str, k)) for k in rollup.index] == [
+            tuple(map(str, k)) for k in expected[key].index
+        ]
+        assert rollup["rows"].tolist() == expected[key]["rows"].tolist()
+        assert rollup["max_score"].tolist() == expected[key]["max_score"].tolist()
+
+
+def test_diagnose_checkpoint_keeps_categorical_dimensions(tmp_path):
+    _dimension_view(str(tmp_path / "_flat_view_time_range_1.parquet"))
+    (tmp_path / "_raw_stats_1.json").write_text("{}")
+
+    categorical = Diagnoser(categorical_dimensions=True).diagnose_checkpoint(str(tmp_path))
+    plain = Diagnoser().diagnose_checkpoint(str(tmp_path))
+
+    (scored,) = categorical.scored_flat_views
+    assert isinstance(scored["d_file"].dtype, pd.CategoricalDtype)
+    assert scored["cpu_pct_score"].tolist() == plain.scored_flat_views[0]["cpu_pct_score"].tolist()
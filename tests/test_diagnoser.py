@@ -1,9 +1,14 @@
+import io
 import json
 
+import numpy as np
+import pandas as pd
 import pytest
 
 from dfdiagnoser.diagnoser import Diagnoser
 
+from .fakes import flat_view_event, stop_event
+
 
 pytestmark = [pytest.mark.smoke, pytest.mark.full]
 
@@ -262,3 +267,76 @@ def test_build_control_findings_uses_current_window_and_fresh_scope():
         finding.finding_type != "excessive_metadata_access"
         for finding in second_control
     )
+
+
+def _row_group_frame():
+    # Four row groups of five rows; only the third has a high score
+    cpu_pct = np.full(20, 0.1)
+    cpu_pct[12] = 0.8
+    disk_util = np.full(20, 0.9)
+    return pd.DataFrame(
+        {"cpu_pct": cpu_pct, "disk_util": disk_util, "d_name": [f"p{i}" for i in range(20)]},
+        index=pd.Index(range(20), name="time_range"),
+    )
+
+
+def test_diagnose_checkpoint_min_severity_skips_row_groups(tmp_path):
+    _row_group_frame().to_parquet(tmp_path / "_flat_view_time_range_1.parquet", row_group_size=5)
+    (tmp_path / "_raw_stats_1.json").write_text(json.dumps({"total_event_count": 1}))
+    diagnoser = Diagnoser(min_severity="high")
+
+    result = diagnoser.diagnose_checkpoint(str(tmp_path))
+
+    (scored,) = result.scored_flat_views
+    assert scored.index.tolist() == [12]
+    assert scored["cpu_pct_score"].tolist() == [4]
+    assert diagnoser.metrics.counter("row_groups_skipped_total").value == 3
+    everything = diagnoser.diagnose_checkpoint(str(tmp_path), min_severity="")
+    assert len(everything.scored_flat_views[0]) == 20
+
+
+def test_diagnose_mofka_min_severity_keeps_qualifying_rows(fake_stream):
+    buffer = io.BytesIO()
+    _row_group_frame().to_parquet(buffer, row_group_size=5)
+    fake_stream([flat_view_event(1, buffer.getvalue()), stop_event(2)])
+    results = []
+
+    Diagnoser().diagnose_mofka(
+        "group.json", "topic", output_handler=results.append, min_severity="critical"
+    )
+
+    (result,) = results
+    assert result.scored_flat_views[0].empty
+
+
+def test_diagnose_mofka_skips_summaries_of_pruned_views(fake_stream):
+    pruned, full = io.BytesIO(), io.BytesIO()
+    _row_group_frame().to_parquet(pruned, row_group_size=5)
+    _row_group_frame().to_parquet(full)
+    fake_stream(
+        [flat_view_event(1, pruned.getvalue()), flat_view_event(2, full.getvalue()), stop_event(3)]
+    )
+    diagnoser = Diagnoser()
+
+    diagnoser.diagnose_mofka("group.json", "topic", min_severity="high")
+
+    # Only the view read in full describes its window's distribution
+    assert len(diagnoser.state.scored_summaries) == 1
+    assert diagnoser.state.scored_summaries.records()[0]["n_rows"] == 20
+    assert diagnoser.metrics.counter("summaries_skipped_total").value == 1
+
+
+def test_decode_flat_view_keeps_categorical_dimensions():
+    buffer = io.BytesIO()
+    _row_group_frame().to_parquet(buffer, row_group_size=5)
+
+    df, complete = Diagnoser(categorical_dimensions=True)._decode_flat_view(buffer.getvalue(), {})
+    pruned, pruned_complete = Diagnoser(categorical_dimensions=True)._decode_flat_view(
+        buffer.getvalue(), {}, min_severity="high"
+    )
+
+    assert complete and not pruned_complete
+
+    assert isinstance(df["d_name"].dtype, pd.CategoricalDtype)
+    assert df.index.tolist() == list(range(20))
+    assert pruned.index.tolist() == list(range(10, 15))
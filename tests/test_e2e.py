@@ -53,6 +53,8 @@ def _test_e2e(
         "output=file",
         f"output.output_dir={output_dir}",
         f"output.output_format={output_format}",
+        # Keep Hydra's run directory (and its log file) out of the working tree
+        f"hydra.run.dir={tmp_path}/hydra",
     ]
 
     # Initialize dfdiagnoser with hydra
@@ -86,6 +88,11 @@ def _test_e2e(
         score_columns = [col for col in df.columns if col.endswith('_score')]
         assert len(score_columns) > 0, f"No score columns found in scored flat view. Columns: {df.columns.tolist()}"
 
+    # Rule defs are expanded across every layer of each flat view
+    assert len(result.rule_matches) == len(result.scored_flat_views)
+    for matches in result.rule_matches:
+        assert "reader_posix_lustre" in matches.columns.get_level_values("layer")
+
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
 
@@ -0,0 +1,43 @@
+import re
+import subprocess
+import sys
+
+import pytest
+
+
+pytestmark = [pytest.mark.smoke, pytest.mark.full]
+
+
+HEAVY_MODULES = ("pandas", "pyarrow", "numpy", "IPython")
+
+# Cumulative `-X importtime` budget for `import dfdiagnoser`, in microseconds
+IMPORT_BUDGET_US = 100_000
+
+
+def _importtime(*args):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match:
+            cumulative[match.group(3)] = int(match.group(1))
+    return cumulative
+
+
+def test_package_import_stays_light():
+    cumulative = _importtime("-c", "import dfdiagnoser")
+
+    assert not [m for m in HEAVY_MODULES + ("hydra", "rich") if m in cumulative]
+    assert cumulative["dfdiagnoser"] < IMPORT_BUDGET_US
+
+
+def test_cli_help_skips_dataframe_stack():
+    # rich is still pulled in by structlog's dev renderer
+    cumulative = _importtime("-m", "dfdiagnoser", "--help")
+
+    assert not [m for m in HEAVY_MODULES if m in cumulative]
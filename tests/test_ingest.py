@@ -0,0 +1,183 @@
+import json
+
+import pytest
+
+from dfdiagnoser.diagnoser import Diagnoser
+from dfdiagnoser.ingest import (
+    FactIngestor,
+    decode_arrow_envelope,
+    encode_arrow_envelope,
+    json_loads,
+    summarize_facts,
+)
+from dfdiagnoser.state import DiagnosisStateStore
+
+from .fakes import FakeEvent
+
+
+pytestmark = [pytest.mark.smoke, pytest.mark.full]
+
+
+ENVELOPE = {
+    "view_type": "epoch",
+    "facts": [
+        {
+            "fact_type": "small_read_dominance",
+            "scope": {"layer": "reader_posix", "entity": "0"},
+            "window": {"epoch": 3},
+            "severity": {"score": 0.4, "label": "medium"},
+            "opportunity_tags": ["small_io_reduction"],
+        },
+        {
+            "fact_type": "small_read_dominance",
+            "scope": {"layer": "reader_posix", "entity": "1"},
+            "window": {"epoch": 3},
+            "severity": {"score": 0.9, "label": "critical"},
+        },
+        {
+            "fact_type": "fetch_pressure",
+            "scope": "global",
+            "severity": 0.5,
+        },
+    ],
+}
+
+
+def test_ingest_normalizes_and_interns_keys():
+    ingestor = FactIngestor()
+    envelope = json_loads(json.dumps(ENVELOPE).encode("utf-8"))
+
+    keys, observations = ingestor.ingest(envelope, window_index=2)
+
+    assert keys == [
+        ("small_read_dominance", "reader_posix:epoch"),
+        ("small_read_dominance", "reader_posix:epoch"),
+        ("fetch_pressure", "global"),
+    ]
+    # Per-row entities collapse onto one interned key object
+    assert keys[0] is keys[1]
+    assert [obs.severity_label for obs in observations] == ["medium", "critical", "unknown"]
+    assert observations[0].epoch == 3
+    assert observations[2].epoch is None
+    assert all(obs.window_index == 2 for obs in observations)
+
+    next_keys, _ = ingestor.ingest(envelope, window_index=3)
+    assert next_keys[0] is keys[0]
+
+
+def test_json_loads_accepts_nan_envelope():
+    envelope = dict(ENVELOPE, facts=[dict(ENVELOPE["facts"][2], evidence={"ratio": float("nan")})])
+    payload = json.dumps(envelope).encode("utf-8")
+    assert b"NaN" in payload
+
+    decoded = json_loads(payload)
+
+    assert decoded["view_type"] == "epoch"
+    assert decoded["facts"][0]["evidence"]["ratio"] != decoded["facts"][0]["evidence"]["ratio"]
+
+
+def test_interned_keys_are_bounded():
+    ingestor = FactIngestor(max_keys=4)
+    for entity in range(10):
+        scope = ingestor.scope_key({"layer": "reader_posix", "entity": f"rank{entity}"}, "epoch")
+        ingestor.key("fetch_pressure", scope)
+    assert len(ingestor._scope_keys) <= 4
+    assert len(ingestor._keys) <= 4
+    assert ingestor.key("fetch_pressure", "reader_posix:rank9") == (
+        "fetch_pressure",
+        "reader_posix:rank9",
+    )
+
+
+def test_record_facts_matches_record_fact():
+    keys, observations = FactIngestor().ingest(ENVELOPE, window_index=0)
+
+    batched = DiagnosisStateStore()
+    batched.record_facts(keys, observations)
+    single = DiagnosisStateStore()
+    for key, obs in zip(keys, observations):
+        single.record_fact(key, obs)
+
+    assert batched.fact_types() == single.fact_types() == {"small_read_dominance", "fetch_pressure"}
+    for key, tracker in single.all_trackers():
+        assert dict(batched.all_trackers())[key].observations == tracker.observations
+
+
+def test_summarize_facts():
+    keys, observations = FactIngestor().ingest(ENVELOPE, window_index=0)
+
+    summary = summarize_facts(keys, observations)
+
+    assert summary["fact_count"] == 3
+    assert summary["tracker_count"] == 2
+    assert summary["fact_types"] == {"small_read_dominance": 2, "fetch_pressure": 1}
+    assert summary["max_severity_fact"] == "small_read_dominance(reader_posix:epoch)"
+    assert summarize_facts([], []) == {"fact_count": 0}
+
+
+def test_arrow_envelope_matches_json_envelope():
+    json_ingestor = FactIngestor()
+    arrow_ingestor = FactIngestor()
+    facts = [
+        {
+            "fact_type": "small_read_dominance",
+            "scope": {"layer": "reader_posix", "entity": "0"},
+            "window": {"epoch": 3},
+            "severity": {"score": 0.4, "label": "medium"},
+            "opportunity_tags": ["small_io_reduction"],
+            "evidence": {"metrics": {"reader_posix_read_time_frac_parent": 0.7}},
+        },
+        {
+            "fact_type": "excessive_metadata_access",
+            "scope": {"layer": None, "entity": "train"},
+            "window": {"epoch": 3},
+            "severity": {"score": 0.9, "label": "critical"},
+            "opportunity_tags": [],
+            "evidence": {"metrics": {"reader_posix_read_time_frac_parent": 0.2}},
+        },
+    ]
+
+    json_keys, json_obs = json_ingestor.ingest({"view_type": "epoch", "facts": facts}, 1)
+    table = decode_arrow_envelope(encode_arrow_envelope(facts, view_type="epoch"))
+    arrow_keys, arrow_obs = arrow_ingestor.ingest_arrow(table, 1)
+
+    assert arrow_keys == json_keys == [
+        ("small_read_dominance", "reader_posix:epoch"),
+        ("excessive_metadata_access", "train"),
+    ]
+    assert arrow_obs == json_obs
+
+
+def test_arrow_envelope_tolerates_missing_columns():
+    table = decode_arrow_envelope(
+        encode_arrow_envelope([{"fact_type": "fetch_pressure", "scope": "global"}], "epoch")
+    )
+
+    (key,), (obs,) = FactIngestor().ingest_arrow(table, 4)
+
+    assert key == ("fetch_pressure", "global")
+    assert obs.severity_score == 0
+    assert obs.severity_label == "unknown"
+    assert obs.epoch is None
+    assert obs.evidence == {}
+
+
+def test_handle_analysis_facts_selects_arrow_encoding():
+    diagnoser = Diagnoser()
+    payload = encode_arrow_envelope(
+        [
+            {
+                "fact_type": "small_write_dominance",
+                "scope": {"layer": "checkpoint_posix", "entity": "2"},
+                "severity": {"score": 0.75, "label": "high"},
+            }
+        ],
+        view_type="epoch",
+    )
+
+    touched = diagnoser._handle_analysis_facts(
+        FakeEvent(1, {"artifact_type": "analysis_facts", "encoding": "arrow"}, payload),
+        metadata={"artifact_type": "analysis_facts", "encoding": "arrow"},
+    )
+
+    assert touched == {("small_write_dominance", "checkpoint_posix:epoch")}
@@ -0,0 +1,157 @@
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from dfdiagnoser.diagnoser import Diagnoser
+from dfdiagnoser.journal import FactJournal, compact, list_segments, recover_state
+from dfdiagnoser.state import SNAPSHOT_FILENAME, DiagnosisStateStore, FactObservation
+
+from .fakes import facts_event, flat_view_event, stop_event
+
+
+pytestmark = [pytest.mark.smoke, pytest.mark.full]
+
+
+KEY = ("small_write_dominance", "checkpoint_posix:epoch")
+
+
+def _journaled_store(state_dir, windows):
+    journal = FactJournal(str(state_dir), fsync_every_records=2)
+    store = DiagnosisStateStore()
+    store.attach_journal(journal)
+    for window in range(windows):
+        store.record_fact(
+            KEY,
+            FactObservation(
+                window_index=window,
+                epoch=window + 1,
+                severity_score=0.75,
+                severity_label="high",
+                evidence={"metrics": {"checkpoint_posix_write_size_mean": 1024.0}},
+            ),
+        )
+        store.advance_window()
+        journal.append_position({"event_id": window})
+    return store, journal
+
+
+def test_recover_state_replays_journal(tmp_path):
+    store, journal = _journaled_store(tmp_path, windows=3)
+    journal.close()
+
+    recovered, position = recover_state(str(tmp_path))
+
+    assert position == {"event_id": 2, "journal_seq": -1}
+    assert recovered.current_window == 3
+    assert dict(recovered.all_trackers())[KEY].observations == store._trackers[KEY].observations
+
+
+def test_recover_state_ignores_torn_tail(tmp_path):
+    _, journal = _journaled_store(tmp_path, windows=2)
+    journal.close()
+    (_, path), = list_segments(str(tmp_path))
+    with open(path, "ab") as f:
+        f.write(b"\x01\xff\x00\x00\x00garbage")
+
+    recovered, position = recover_state(str(tmp_path))
+
+    assert position["event_id"] == 1
+    assert recovered.current_window == 2
+
+
+def test_recover_state_drops_uncommitted_tail(tmp_path):
+    store, journal = _journaled_store(tmp_path, windows=2)
+    # Facts of an event whose position was never journaled
+    journal.append_fact(
+        KEY,
+        FactObservation(window_index=2, epoch=3, severity_score=0.75, severity_label="high"),
+    )
+    journal.append_window(3)
+    journal.close()
+
+    recovered, position = recover_state(str(tmp_path))
+
+    assert position["event_id"] == 1
+    assert recovered.current_window == 2
+    assert dict(recovered.all_trackers())[KEY].observations == store._trackers[KEY].observations
+
+    compact(str(tmp_path), journal.seq)
+    compacted, _ = DiagnosisStateStore.load_snapshot(str(tmp_path / SNAPSHOT_FILENAME))
+    assert compacted.current_window == 2
+    assert len(dict(compacted.all_trackers())[KEY].observations) == 2
+
+
+def test_diagnose_mofka_journal_requires_state_dir(fake_stream):
+    fake_stream([stop_event(1)])
+    with pytest.raises(ValueError, match="state directory"):
+        Diagnoser().diagnose_mofka("group.json", "topic", journal=True)
+
+
+def test_compact_folds_sealed_segments_into_snapshot(tmp_path):
+    _, journal = _journaled_store(tmp_path, windows=2)
+    sealed = journal.rotate()
+    journal.append_window(3)
+    journal.append_position({"event_id": 2})
+    journal.close()
+
+    compact(str(tmp_path), sealed)
+
+    assert os.path.exists(tmp_path / SNAPSHOT_FILENAME)
+    assert [seq for seq, _ in list_segments(str(tmp_path))] == [sealed + 1]
+    _, position = DiagnosisStateStore.load_snapshot(str(tmp_path / SNAPSHOT_FILENAME))
+    assert position["journal_seq"] == sealed
+    recovered, _ = recover_state(str(tmp_path))
+    assert recovered.current_window == 3
+
+
+def test_diagnose_mofka_journal_survives_restart(tmp_path, fake_stream):
+    state_dir = str(tmp_path / "state")
+
+    fake_stream([facts_event(1), facts_event(2), stop_event(3)])
+    Diagnoser().diagnose_mofka(
+        "group.json",
+        "topic",
+        state_dir=state_dir,
+        snapshot_interval_events=1,
+        journal=True,
+    )
+
+    fake_stream([facts_event(2), facts_event(4), stop_event(5)])
+    diagnoser = Diagnoser()
+    diagnoser.diagnose_mofka("group.json", "topic", state_dir=state_dir, journal=True)
+
+    (_, tracker), = diagnoser.state.all_trackers()
+    assert [obs.epoch for obs in tracker.observations] == [1, 2, 4]
+    assert diagnoser.state.current_window == 3
+    # Shutdown compacts everything into the snapshot
+    assert list_segments(state_dir) == []
+
+    fake_stream([facts_event(6), stop_event(7)])
+    diagnoser = Diagnoser()
+    diagnoser.diagnose_mofka("group.json", "topic", state_dir=state_dir, journal=True)
+    recovered, position = recover_state(state_dir)
+    assert position["event_id"] == 7
+    assert recovered.current_window == 4
+
+
+def test_diagnose_mofka_journal_keeps_scored_summaries(tmp_path, fake_stream):
+    state_dir = str(tmp_path / "state")
+    buffer = io.BytesIO()
+    pd.DataFrame(
+        {"cpu_pct": [0.1, 0.95]}, index=pd.Index([0, 1], name="time_range")
+    ).to_parquet(buffer)
+
+    fake_stream([flat_view_event(1, buffer.getvalue()), facts_event(2), stop_event(3)])
+    Diagnoser().diagnose_mofka("group.json", "topic", state_dir=state_dir, journal=True)
+
+    recovered, _ = recover_state(state_dir)
+    assert len(recovered.scored_summaries) == 1
+    assert recovered.scored_summaries.records()[0]["n_rows"] == 2
+
+    # Summaries recorded before a restart survive the next shutdown's compaction
+    fake_stream([facts_event(4), stop_event(5)])
+    Diagnoser().diagnose_mofka("group.json", "topic", state_dir=state_dir, journal=True)
+    recovered, _ = recover_state(state_dir)
+    assert len(recovered.scored_summaries) == 1
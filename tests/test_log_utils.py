@@ -0,0 +1,65 @@
+import json
+import logging
+
+import pytest
+import structlog
+
+from dfdiagnoser.utils.log_utils import SampledLogger, configure_logging, stop_logging
+
+
+pytestmark = [pytest.mark.smoke, pytest.mark.full]
+
+
+class _RecordingLogger:
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, level):
+        return lambda event, **kwargs: self.calls.append((level, event, kwargs))
+
+
+@pytest.fixture
+def root_level():
+    root = logging.getLogger()
+    previous = root.level
+    root.setLevel(logging.INFO)
+    yield
+    root.setLevel(previous)
+
+
+def test_sampled_logger_emits_every_nth_event_with_skip_count(root_level):
+    recorder = _RecordingLogger()
+    hot_log = SampledLogger(recorder, level="info", sample_every=3)
+
+    for i in range(7):
+        hot_log.maybe_log("diagnoser.event.received", event_index=i)
+    hot_log.maybe_log("diagnoser.flat_view.scored")
+
+    assert [(e, kw.get("event_index"), kw["skipped"]) for _, e, kw in recorder.calls] == [
+        ("diagnoser.event.received", 0, 0),
+        ("diagnoser.event.received", 3, 2),
+        ("diagnoser.event.received", 6, 2),
+        ("diagnoser.flat_view.scored", None, 0),
+    ]
+
+
+def test_sampled_logger_respects_off_and_logger_level(root_level):
+    recorder = _RecordingLogger()
+    assert not SampledLogger(recorder, level="off").should_log("event")
+    assert not SampledLogger(recorder, level="debug").should_log("event")
+    assert SampledLogger(recorder, level="warning").should_log("event")
+
+
+def test_async_logging_writes_json_from_listener(tmp_path):
+    log_file = tmp_path / "dfdiagnoser.log"
+    configure_logging(str(log_file), async_logging=True)
+    try:
+        structlog.get_logger().info("diagnoser.test.event", value=1)
+    finally:
+        stop_logging()
+        logging.getLogger().handlers.clear()
+
+    (line,) = log_file.read_text().splitlines()
+    record = json.loads(line)
+    assert record["event"] == "diagnoser.test.event"
+    assert record["value"] == 1
@@ -0,0 +1,102 @@
+import os
+import shutil
+
+import pytest
+
+from dfdiagnoser import manifest as manifest_module
+from dfdiagnoser.diagnoser import Diagnoser
+from dfdiagnoser.manifest import MANIFEST_FILENAME, ManifestIndex, load_manifest
+
+
+pytestmark = [pytest.mark.smoke, pytest.mark.full]
+
+
+CHECKPOINT_DIR = os.path.join(
+    os.path.dirname(__file__), "data", "dfanalyzer_checkpoints", "unet3d_v100"
+)
+
+
+@pytest.fixture
+def checkpoint_dir(tmp_path):
+    path = tmp_path / "checkpoint"
+    shutil.copytree(CHECKPOINT_DIR, path)
+    return str(path)
+
+
+def test_manifest_records_footers_and_is_written(checkpoint_dir):
+    manifest = ManifestIndex().plan(checkpoint_dir)
+
+    assert [os.path.basename(p) for p in manifest.flat_view_paths] == sorted(
+        name for name in os.listdir(CHECKPOINT_DIR) if name.startswith("_flat_view_")
+    )
+    entry = manifest.flat_views[0]
+    assert entry.num_rows == 56
+    assert entry.index_columns == ["proc_name"]
+    assert len(entry.columns) == 1695
+    assert sum(rg["num_rows"] for rg in entry.row_groups) == entry.num_rows
+    low, high = entry.row_groups[0]["stats"]["app_time_sum"]
+    assert low <= high
+
+    on_disk = load_manifest(checkpoint_dir)
+    assert on_disk.is_valid()
+    assert on_disk.flat_views == manifest.flat_views
+
+
+def test_plan_reuses_valid_manifest_without_footer_reads(checkpoint_dir, monkeypatch):
+    ManifestIndex().plan(checkpoint_dir)
+    reads = []
+    original = manifest_module._flat_view_entry
+    monkeypatch.setattr(
+        manifest_module,
+        "_flat_view_entry",
+        lambda *args: reads.append(args[1]) or original(*args),
+    )
+
+    index = ManifestIndex()
+    index.plan(checkpoint_dir)
+    assert reads == [] and index.rebuilds == 0
+
+    flat_view = os.path.join(checkpoint_dir, "_flat_view_time_range_1.parquet")
+    os.utime(flat_view, ns=(0, 0))
+    index.plan(checkpoint_dir)
+    assert index.rebuilds == 1 and len(reads) == 2
+
+    shutil.copy(flat_view, os.path.join(checkpoint_dir, "_flat_view_copy_1.parquet"))
+    assert len(index.plan(checkpoint_dir).flat_views) == 3
+
+
+def test_diagnose_checkpoint_with_manifest_matches_directory_scan(checkpoint_dir):
+    expected = Diagnoser().diagnose_checkpoint(checkpoint_dir)
+    diagnoser = Diagnoser(checkpoint_manifest=True, checkpoint_read_mode="mmap")
+
+    for _ in range(2):
+        result = diagnoser.diagnose_checkpoint(checkpoint_dir)
+        assert sorted(result.flat_view_paths) == sorted(expected.flat_view_paths)
+        assert result.raw_stats == expected.raw_stats
+        for path, scored in zip(result.flat_view_paths, result.scored_flat_views):
+            reference = expected.scored_flat_views[expected.flat_view_paths.index(path)]
+            assert list(scored.index) == list(reference.index)
+    assert os.path.exists(os.path.join(checkpoint_dir, MANIFEST_FILENAME))
+    assert diagnoser.checkpoint_manifests.rebuilds == 1
+
+    with pytest.raises(FileNotFoundError):
+        diagnoser.diagnose_checkpoint(os.path.join(checkpoint_dir, "missing"))
+
+
+def test_failed_manifest_rewrite_leaves_no_partial_file(checkpoint_dir, monkeypatch):
+    dumps = []
+    original = manifest_module.json.dump
+
+    def dump(obj, f):
+        dumps.append(obj)
+        if len(dumps) == 2:
+            f.write("{")
+            raise OSError("No space left on device")
+        original(obj, f)
+
+    monkeypatch.setattr(manifest_module.json, "dump", dump)
+    manifest = ManifestIndex().plan(checkpoint_dir)
+
+    assert len(dumps) == 2
+    assert len(manifest.flat_views) == 2
+    assert not [name for name in os.listdir(checkpoint_dir) if name.startswith(MANIFEST_FILENAME)]
@@ -0,0 +1,101 @@
+import io
+import json
+import math
+import socket
+import threading
+import urllib.request
+
+import pandas as pd
+import pytest
+
+from dfdiagnoser.diagnoser import Diagnoser
+from dfdiagnoser.metrics import Histogram, MetricsRegistry, MetricsServer
+
+from .fakes import facts_event, flat_view_event, stop_event
+
+
+pytestmark = [pytest.mark.smoke, pytest.mark.full]
+
+
+def test_histogram_quantiles_are_within_bucket_resolution():
+    histogram = Histogram()
+    for i in range(1, 1001):
+        histogram.record(i / 1000)
+
+    assert histogram.count == 1000
+    assert histogram.min == 0.001 and histogram.max == 1.0
+    for q in (0.5, 0.9, 0.99):
+        assert histogram.quantile(q) == pytest.approx(q, rel=0.2)
+    cumulative = list(histogram.cumulative())
+    assert [count for _, count in cumulative] == sorted(count for _, count in cumulative)
+    assert cumulative[-1][1] == 1000
+
+
+def test_prometheus_and_json_export():
+    registry = MetricsRegistry()
+    registry.counter("events_total", "Events consumed").inc(3)
+    registry.gauge("queue_depth", fn=lambda: 2)
+    with registry.time("stage_seconds", "Stage latency", {"stage": "score"}):
+        pass
+
+    text = registry.to_prometheus()
+    assert "# TYPE dfdiagnoser_events_total counter" in text
+    assert "dfdiagnoser_events_total 3" in text
+    assert "dfdiagnoser_queue_depth 2" in text
+    assert 'dfdiagnoser_stage_seconds_bucket{stage="score",le="+Inf"} 1' in text
+    assert 'dfdiagnoser_stage_seconds_count{stage="score"} 1' in text
+
+    snapshot = json.loads(registry.to_json())["metrics"]
+    assert snapshot["events_total"] == 3
+    assert snapshot['stage_seconds{stage="score"}']["count"] == 1
+
+
+def test_metrics_server_serves_prometheus_text():
+    registry = MetricsRegistry()
+    registry.counter("events_total").inc()
+    server = MetricsServer(registry, port=0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics") as response:
+            body = response.read().decode("utf-8")
+    finally:
+        server.close()
+    assert "dfdiagnoser_events_total 1" in body
+
+
+def test_diagnose_mofka_records_stage_latencies(tmp_path, fake_stream):
+    metrics_path = tmp_path / "metrics.json"
+    buffer = io.BytesIO()
+    pd.DataFrame({"cpu_pct": [0.1, 0.9]}).to_parquet(buffer)
+    fake_stream([flat_view_event(1, buffer.getvalue()), facts_event(2), stop_event(3)])
+    diagnoser = Diagnoser(metrics_json_path=str(metrics_path))
+    diagnoser.diagnose_mofka("group.json", "topic")
+
+    metrics = json.loads(metrics_path.read_text())["metrics"]
+    assert metrics["events_total"] == 3
+    assert metrics['artifact_events_total{artifact_type="analysis_facts"}'] == 1
+    for stage in (
+        "pull_wait", "decode", "score", "fact_ingest", "fact_record", "output_write", "findings_build"
+    ):
+        summary = metrics[f'stage_seconds{{stage="{stage}"}}']
+        assert summary["count"] >= 1
+        assert not math.isnan(summary["p99"])
+
+
+def test_diagnose_mofka_stops_exporters_when_the_stream_fails_to_open(tmp_path, monkeypatch):
+    from dfdiagnoser.streaming import mofka_io
+
+    def open_consumer(*args, **kwargs):
+        raise ConnectionError("no such group")
+
+    monkeypatch.setattr(mofka_io, "open_consumer", open_consumer)
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    diagnoser = Diagnoser(metrics_port=port, metrics_json_path=str(tmp_path / "metrics.json"))
+    with pytest.raises(ConnectionError):
+        diagnoser.diagnose_mofka("group.json", "topic")
+
+    assert not any(t.name.startswith("dfdiagnoser-metrics") for t in threading.enumerate())
+    assert (tmp_path / "metrics.json").exists()
+    # The port was released
+    MetricsServer(MetricsRegistry(), port=port).close()
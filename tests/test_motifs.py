@@ -0,0 +1,106 @@
+import pytest
+
+from dfdiagnoser.diagnoser import Diagnoser
+from dfdiagnoser.motifs import MotifClassifier, load_default_motif_defs
+from dfdiagnoser.state import FactObservation
+
+
+pytestmark = [pytest.mark.smoke, pytest.mark.full]
+
+
+def _record(diagnoser: Diagnoser, fact_type: str, scope: str, windows, metrics=None):
+    for window in windows:
+        diagnoser.state.record_fact(
+            (fact_type, scope),
+            FactObservation(
+                window_index=window,
+                epoch=window + 1,
+                severity_score=0.7,
+                severity_label="high",
+                evidence={"metrics": metrics or {}},
+            ),
+        )
+
+
+def _motif(diagnoser: Diagnoser, fact_type: str, scope: str) -> str:
+    for finding in diagnoser._build_longitudinal_summary():
+        if finding.finding_type == fact_type and finding.scope == scope:
+            return finding.motif
+    raise AssertionError(f"Missing finding for {fact_type}@{scope}")
+
+
+def test_candidates_merge_wildcards_in_table_order():
+    classifier = MotifClassifier()
+    motifs = [rule.motif for rule in classifier.candidates("excessive_metadata_access", "reader_posix")]
+    assert motifs == ["warmup_transient", "metadata_bound"]
+    assert classifier.candidates("unknown_fact", None)[0].motif == "warmup_transient"
+
+
+def test_rank_skew_requires_both_fact_types():
+    diagnoser = Diagnoser()
+    _record(diagnoser, "fetch_rank_imbalance", "epoch", range(3, 6))
+    assert _motif(diagnoser, "fetch_rank_imbalance", "epoch") == "unclassified"
+
+    _record(diagnoser, "epoch_straggler", "epoch", range(3, 6))
+    assert _motif(diagnoser, "fetch_rank_imbalance", "epoch") == "rank_skew_induced"
+    assert _motif(diagnoser, "epoch_straggler", "epoch") == "rank_skew_induced"
+
+
+def test_rank_skew_requires_same_window_co_occurrence():
+    diagnoser = Diagnoser()
+    _record(diagnoser, "fetch_rank_imbalance", "epoch", range(0, 3))
+    _record(diagnoser, "epoch_straggler", "step", range(5, 8))
+    assert _motif(diagnoser, "fetch_rank_imbalance", "epoch") == "unclassified"
+
+    _record(diagnoser, "epoch_straggler", "step", [2])
+    assert _motif(diagnoser, "fetch_rank_imbalance", "epoch") == "rank_skew_induced"
+
+    defs = load_default_motif_defs()
+    for rule in defs["rules"]:
+        if rule["motif"] == "rank_skew_induced":
+            rule["co_occurrence_gt"] = 0.5
+    diagnoser.motif_classifier = MotifClassifier(defs)
+    assert _motif(diagnoser, "fetch_rank_imbalance", "epoch") == "unclassified"
+
+
+def test_checkpoint_write_pair_recommends_batching():
+    diagnoser = Diagnoser()
+    scope = "checkpoint_posix:epoch"
+    _record(
+        diagnoser,
+        "operation_imbalance",
+        scope,
+        range(2, 6),
+        {"checkpoint_posix_read_count_sum": 1.0, "checkpoint_posix_write_count_sum": 50.0},
+    )
+    _record(
+        diagnoser,
+        "size_imbalance",
+        scope,
+        range(2, 6),
+        {"checkpoint_posix_read_size_sum": 1.0, "checkpoint_posix_write_size_sum": 50.0},
+    )
+
+    finding = next(
+        f for f in diagnoser._build_longitudinal_summary()
+        if f.finding_type == "operation_imbalance"
+    )
+    assert finding.motif == "write_dominant_steady_state"
+    assert finding.recommendation_bundle == "checkpoint_io_batching"
+    assert finding.confidence == pytest.approx(0.85)
+
+
+def test_thresholds_are_tunable_from_table():
+    defs = load_default_motif_defs()
+    for rule in defs["rules"]:
+        if rule["motif"] == "checkpoint_tail_risk":
+            rule["prevalence_gt"] = 0.9
+
+    default_diagnoser = Diagnoser()
+    tuned_diagnoser = Diagnoser(motif_defs=defs)
+    for diagnoser in (default_diagnoser, tuned_diagnoser):
+        _record(diagnoser, "checkpoint_tail_skew", "epoch", range(2, 4))
+        diagnoser.state.current_window = 5
+
+    assert _motif(default_diagnoser, "checkpoint_tail_skew", "epoch") == "checkpoint_tail_risk"
+    assert _motif(tuned_diagnoser, "checkpoint_tail_skew", "epoch") == "unclassified"
@@ -0,0 +1,254 @@
+import glob
+import json
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from dfdiagnoser.output import FileOutput
+from dfdiagnoser.scoring import score_metrics
+from dfdiagnoser.types import DiagnosisResult
+
+
+pytestmark = [pytest.mark.smoke, pytest.mark.full]
+
+
+def _scored_view(n_rows: int, offset: int = 0, index_name: str = "time_range"):
+    df = pd.DataFrame(
+        {"cpu_pct": [(offset + i) % 10 / 10 for i in range(n_rows)]},
+        index=pd.Index(range(offset, offset + n_rows), name=index_name),
+    )
+    return score_metrics(df, {})
+
+
+def _streaming_result(df: pd.DataFrame, window_index: int) -> DiagnosisResult:
+    return DiagnosisResult(flat_view_paths=[], scored_flat_views=[df], window_index=window_index)
+
+
+def test_dataset_mode_appends_row_groups_to_one_file(tmp_path):
+    output = FileOutput(output_dir=str(tmp_path), output_mode="dataset", dataset_buffer_rows=10)
+    for window in range(5):
+        output.handle_result(_streaming_result(_scored_view(4, offset=window * 4), window))
+    output.close()
+
+    (path,) = glob.glob(f"{tmp_path}/*.parquet")
+    parquet_file = pq.ParquetFile(path)
+    # 20 rows buffered into row groups of >= 10 rows, rest flushed on close
+    assert parquet_file.metadata.num_rows == 20
+    assert parquet_file.metadata.num_row_groups == 2
+    table = pd.read_parquet(path)
+    assert table.index.name == "time_range"
+    assert sorted(table["window_index"].unique()) == [0, 1, 2, 3, 4]
+    assert table["cpu_pct_score"].notna().all()
+
+
+def test_dataset_mode_rotates_and_separates_schemas(tmp_path):
+    output = FileOutput(
+        output_dir=str(tmp_path),
+        output_mode="dataset",
+        dataset_buffer_rows=1,
+        dataset_max_file_bytes=1,
+    )
+    output.handle_result(_streaming_result(_scored_view(3), 0))
+    output.handle_result(_streaming_result(_scored_view(3), 1))
+    output.handle_result(_streaming_result(_scored_view(3, index_name="proc_name"), 1))
+    output.close()
+
+    paths = sorted(glob.glob(f"{tmp_path}/*.parquet"))
+    assert len(paths) == 3
+    assert sum(pq.ParquetFile(p).metadata.num_rows for p in paths) == 9
+
+
+def test_dataset_mode_flushes_and_rotates_by_age(tmp_path, monkeypatch):
+    import dfdiagnoser.output as output_module
+
+    now = [1000.0]
+    monkeypatch.setattr(output_module.time, "monotonic", lambda: now[0])
+    output = FileOutput(
+        output_dir=str(tmp_path),
+        output_mode="dataset",
+        dataset_max_buffer_sec=5,
+        dataset_max_file_sec=60,
+    )
+    output.handle_result(_streaming_result(_scored_view(2), 0))
+    assert glob.glob(f"{tmp_path}/*.parquet") == []
+
+    # A slow stream: the next view arrives after the buffer age limit
+    now[0] += 10
+    output.handle_result(_streaming_result(_scored_view(2, offset=2), 1))
+    (path,) = glob.glob(f"{tmp_path}/*.parquet")
+    now[0] += 60
+    output.handle_result(_streaming_result(_scored_view(2, offset=4), 2))
+    # The file open past max_file_sec was closed and is readable mid-stream
+    assert pq.ParquetFile(path).metadata.num_rows == 4
+
+    output.close()
+    paths = glob.glob(f"{tmp_path}/*.parquet")
+    assert sum(pq.ParquetFile(p).metadata.num_rows for p in paths) == 6
+
+
+def test_files_mode_rejects_unknown_mode(tmp_path):
+    output = FileOutput(output_dir=str(tmp_path), output_mode="bogus")
+    with pytest.raises(ValueError):
+        output.handle_result(_streaming_result(_scored_view(1), 0))
+
+
+@pytest.mark.parametrize("output_mode", ["files", "dataset"])
+def test_writer_threads_flush_on_close(tmp_path, output_mode):
+    output = FileOutput(
+        output_dir=str(tmp_path),
+        output_format="parquet",
+        output_mode=output_mode,
+        writer_threads=2,
+        queue_size=2,
+    )
+    for window in range(6):
+        output.handle_result(_streaming_result(_scored_view(5, offset=window * 5), window))
+    output.close()
+
+    assert output.queue_depth == 0
+    stats = output.stats()
+    assert stats["written"] == 6
+    assert stats["errors"] == 0
+    paths = sorted(glob.glob(f"{tmp_path}/*.parquet"))
+    assert sum(pq.ParquetFile(p).metadata.num_rows for p in paths) == 30
+    if output_mode == "files":
+        # Sequence numbers follow event order regardless of writer scheduling
+        assert [p.split("/")[-1] for p in paths] == [f"scored_{i:06d}.parquet" for i in range(1, 7)]
+        assert pd.read_parquet(paths[0]).index[0] == 0
+
+
+@pytest.mark.parametrize("json_backend", ["orjson", "json"])
+def test_json_layouts_roundtrip_scored_view(tmp_path, json_backend):
+    if json_backend == "orjson":
+        pytest.importorskip("orjson")
+    view = _scored_view(5)
+    view.loc[2, "cpu_pct"] = float("nan")
+    for json_layout, orient in [("split", "split"), ("index", "index")]:
+        output = FileOutput(
+            output_dir=str(tmp_path / json_layout),
+            output_format="json",
+            json_layout=json_layout,
+            json_backend=json_backend,
+        )
+        output.handle_result(
+            DiagnosisResult(flat_view_paths=["/data/_flat_view_time_range_1.parquet"], scored_flat_views=[view])
+        )
+        restored = pd.read_json(
+            tmp_path / json_layout / "_flat_view_time_range_1_scored.json", orient=orient
+        )
+        assert restored.index.tolist() == view.index.tolist()
+        pd.testing.assert_frame_equal(
+            restored.astype("float64"),
+            view.astype("float64").rename_axis(None),
+            check_names=False,
+        )
+
+
+@pytest.mark.parametrize("json_backend", ["orjson", "json"])
+def test_json_output_defaults_to_index_layout_and_keeps_int_scores(tmp_path, json_backend):
+    if json_backend == "orjson":
+        pytest.importorskip("orjson")
+    view = _scored_view(5)
+    view["score"] = range(5)
+    for json_layout in [None, "split"]:
+        kwargs = {} if json_layout is None else {"json_layout": json_layout}
+        output_dir = tmp_path / str(json_layout)
+        output = FileOutput(output_dir=str(output_dir), output_format="json", json_backend=json_backend, **kwargs)
+        output.handle_result(
+            DiagnosisResult(flat_view_paths=["/data/_flat_view_time_range_1.parquet"], scored_flat_views=[view])
+        )
+        with open(output_dir / "_flat_view_time_range_1_scored.json") as f:
+            payload = json.load(f)
+        if json_layout is None:
+            assert payload["0"]["score"] == 0
+            assert isinstance(payload["4"]["score"], int)
+        else:
+            column = payload["columns"].index("score")
+            assert [row[column] for row in payload["data"]] == [0, 1, 2, 3, 4]
+            assert all(isinstance(row[column], int) for row in payload["data"])
+
+
+def test_json_output_rejects_unknown_layout_and_backend(tmp_path):
+    with pytest.raises(ValueError, match="layout"):
+        FileOutput(output_dir=str(tmp_path), json_layout="records")
+    with pytest.raises(ValueError, match="backend"):
+        FileOutput(output_dir=str(tmp_path), json_backend="bogus")
+
+
+def test_registered_json_backend_is_selectable(monkeypatch):
+    from dfdiagnoser import serialization
+    from dfdiagnoser.serialization import get_backend, register_backend
+
+    monkeypatch.setattr(serialization, "_BACKENDS", dict(serialization._BACKENDS))
+    register_backend("upper", lambda: lambda obj: str(obj).upper().encode("utf-8"))
+    name, dumps = get_backend("upper")
+    assert name == "upper"
+    assert dumps({"a": 1}) == b"{'A': 1}"
+
+
+def test_ndjson_streaming_appends_windows_to_one_file(tmp_path):
+    output = FileOutput(output_dir=str(tmp_path), output_format="ndjson")
+    for window in range(3):
+        output.handle_result(_streaming_result(_scored_view(2, offset=window * 2), window))
+    output.close()
+
+    (path,) = glob.glob(f"{tmp_path}/*.ndjson")
+    records = pd.read_json(path, lines=True)
+    assert len(records) == 6
+    assert records["time_range"].tolist() == list(range(6))
+    assert records["window_index"].tolist() == [0, 0, 1, 1, 2, 2]
+    assert "cpu_pct_score" in records.columns
+
+
+def test_ndjson_checkpoint_view_writes_one_file_per_view(tmp_path):
+    view = _scored_view(3)
+    output = FileOutput(output_dir=str(tmp_path), output_format="ndjson")
+    output.handle_result(
+        DiagnosisResult(flat_view_paths=["/data/_flat_view_time_range_1.parquet"], scored_flat_views=[view])
+    )
+
+    records = pd.read_json(tmp_path / "_flat_view_time_range_1_scored.ndjson", lines=True)
+    assert records.set_index("time_range")["cpu_pct"].tolist() == view["cpu_pct"].tolist()
+
+
+def test_rollups_are_written_next_to_scored_views(tmp_path):
+    from dfdiagnoser.rollup import build_rollups
+
+    view = _scored_view(6).assign(d_rank=[0, 1, 0, 1, 0, 1])
+    result = DiagnosisResult(
+        flat_view_paths=[f"{tmp_path}/_flat_view_time_range_1.parquet"],
+        scored_flat_views=[view],
+        rollups=[build_rollups(view)],
+    )
+    output = FileOutput(output_dir=str(tmp_path / "out"), output_format="parquet")
+    output.handle_result(result)
+    output.close()
+
+    rollup = pd.read_parquet(tmp_path / "out" / "_flat_view_time_range_1_scored_rollup_d_rank.parquet")
+    assert rollup.index.names == ["d_rank", "metric"]
+    assert rollup["rows"].tolist() == [3, 3]
+
+    streaming = FileOutput(output_dir=str(tmp_path / "stream"), output_mode="dataset")
+    streaming.handle_result(
+        DiagnosisResult(
+            flat_view_paths=[], scored_flat_views=[view], window_index=2, rollups=[build_rollups(view)]
+        )
+    )
+    streaming.close()
+    assert glob.glob(f"{tmp_path}/stream/rollups/window_000002_000001_rollup_d_rank.parquet")
+
+
+def test_dataset_mode_keeps_one_schema_for_categorical_dimensions(tmp_path):
+    output = FileOutput(output_dir=str(tmp_path), output_mode="dataset", dataset_buffer_rows=1)
+    for window, n_files in enumerate([2, 300]):
+        view = _scored_view(300, offset=window * 300).assign(
+            d_file=pd.Categorical([f"file{i % n_files}" for i in range(300)])
+        )
+        output.handle_result(_streaming_result(view, window))
+    output.close()
+
+    (path,) = glob.glob(f"{tmp_path}/*.parquet")
+    table = pd.read_parquet(path)
+    assert isinstance(table["d_file"].dtype, pd.CategoricalDtype)
+    assert table["d_file"].nunique() == 300
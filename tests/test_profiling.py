@@ -0,0 +1,101 @@
+import json
+import os
+import pstats
+import signal
+import time
+import tracemalloc
+
+import pytest
+
+from dfdiagnoser.diagnoser import Diagnoser
+from dfdiagnoser.profiling import RuntimeProfiler
+
+from .fakes import FakeConsumer, facts_event, stop_event
+
+
+pytestmark = [pytest.mark.smoke, pytest.mark.full]
+
+
+def test_sigusr1_profiles_next_events(tmp_path):
+    profiler = RuntimeProfiler(output_dir=str(tmp_path), events=2)
+    profiler.install()
+    try:
+        os.kill(os.getpid(), signal.SIGUSR1)
+        profiler.on_event()  # starts the session at an event boundary
+        assert profiler.active
+        sum(range(1000))
+        profiler.on_event()
+        profiler.on_event()
+        assert not profiler.active
+    finally:
+        profiler.close()
+
+    (path,) = profiler.paths
+    assert path.endswith(".pstats")
+    assert pstats.Stats(path).total_calls > 0
+    assert signal.getsignal(signal.SIGUSR1) is not profiler.request_profile
+
+
+def test_sampling_profiler_writes_speedscope(tmp_path):
+    profiler = RuntimeProfiler(output_dir=str(tmp_path), mode="sample", sample_interval_ms=1)
+    profiler.request_profile()
+    profiler.on_event()
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+    profiler.close()
+
+    (path,) = profiler.paths
+    profile = json.load(open(path))
+    assert profile["profiles"][0]["type"] == "sampled"
+    assert profile["profiles"][0]["samples"]
+    assert profile["shared"]["frames"]
+
+
+def test_duration_ends_session_on_pull_timeouts(tmp_path, monkeypatch):
+    from dfdiagnoser.streaming import mofka_io
+
+    diagnoser = Diagnoser(profile_dir=str(tmp_path), profile_events=0, profile_duration_sec=0.01)
+    active_at_stop = []
+
+    class StalledFuture:
+        """Times out twice before the stop event arrives."""
+
+        timeouts = 2
+
+        def wait(self, timeout_ms):
+            if self.timeouts:
+                self.timeouts -= 1
+                time.sleep(0.02)
+                return None
+            active_at_stop.append(diagnoser.profiler.active)
+            return stop_event(2)
+
+    class StallingConsumer(FakeConsumer):
+        def pull(self):
+            return super().pull() if self._events else StalledFuture()
+
+    consumer = StallingConsumer([facts_event(1)])
+    monkeypatch.setattr(mofka_io, "open_consumer", lambda *args, **kwargs: (object(), consumer))
+    diagnoser.profiler.request_profile()
+    diagnoser.diagnose_mofka("group.json", "topic")
+
+    assert active_at_stop == [False]
+    (path,) = diagnoser.profiler.paths
+    assert path.endswith(".pstats")
+
+
+def test_tracemalloc_diffs_windows_during_stream(tmp_path, fake_stream):
+    fake_stream([facts_event(i) for i in range(1, 4)] + [stop_event(4)])
+    diagnoser = Diagnoser(profile_dir=str(tmp_path))
+    diagnoser.profiler.request_tracemalloc()
+    diagnoser.diagnose_mofka("group.json", "topic")
+
+    diffs = sorted(p for p in os.listdir(tmp_path) if p.startswith("tracemalloc-window-"))
+    assert diffs == ["tracemalloc-window-000002.txt", "tracemalloc-window-000003.txt"]
+    assert not tracemalloc.is_tracing()
+
+
+def test_unknown_profile_mode_is_rejected():
+    with pytest.raises(ValueError):
+        RuntimeProfiler(mode="bogus")
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dfdiagnoser import rollup as rollup_module
+from dfdiagnoser.diagnoser import Diagnoser
+from dfdiagnoser.rollup import build_rollup, build_rollups, dimension_sets
+from dfdiagnoser.scoring import score_metrics
+
+
+pytestmark = [pytest.mark.smoke, pytest.mark.full]
+
+
+@pytest.fixture
+def scored_view():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "cpu_pct": rng.random(200),
+            "disk_util": rng.random(200),
+            "d_file": rng.choice(["a.h5", "b.h5", None], 200),
+            "d_rank": rng.integers(0, 4, 200),
+        },
+        index=pd.Index(rng.choice(["host1", "host2"], 200), name="host"),
+    )
+    df.iloc[:10, 0] = np.nan
+    return score_metrics(df, {})
+
+
+def test_rollup_matches_groupby(scored_view):
+    rollup = build_rollup(scored_view, ["d_file", "d_rank"])
+
+    expected = scored_view.groupby(["d_file", "d_rank"], dropna=False)["cpu_pct_score"].agg(
+        ["count", "max", "size"]
+    )
+    cpu = rollup.xs("cpu_pct", level="metric").sort_index()
+    expected = expected.sort_index()
+    assert [tuple(map(str, key)) for key in cpu.index] == [
+        tuple(map(str, key)) for key in expected.index
+    ]
+    assert cpu["count"].tolist() == expected["count"].tolist()
+    assert cpu["max_score"].tolist() == expected["max"].tolist()
+    assert cpu["rows"].tolist() == expected["size"].tolist()
+    levels = ["trivial", "low", "medium", "high", "critical"]
+    assert (cpu[levels].sum(axis=1) == cpu["count"]).all()
+    assert (cpu["count"] + cpu["null"] == cpu["rows"]).all()
+
+
+def test_dimension_sets_default_and_index_levels(scored_view):
+    assert dimension_sets(scored_view) == [["d_file"], ["d_rank"]]
+    assert dimension_sets(scored_view, [["host", "d_rank"], ["d_missing"]]) == [["host", "d_rank"]]
+
+    rollups = build_rollups(scored_view, [["host"]])
+    assert list(rollups) == ["host"]
+    assert rollups["host"].loc["host1"]["rows"].iloc[0] == (scored_view.index == "host1").sum()
+
+
+def test_diagnoser_rolls_up_streamed_views(scored_view):
+    diagnoser = Diagnoser(rollup=True, rollup_dimensions=[["d_file"]])
+
+    (rollups,) = diagnoser._rollups([scored_view])
+
+    assert list(rollups) == ["d_file"]
+    assert Diagnoser()._rollups([scored_view]) == []
+
+
+def test_rollup_keys_do_not_overflow_with_many_wide_dimensions():
+    # With 2**16 values in each of five dimensions, a combined code of
+    # 2**80 would wrap around and drop the first dimension
+    values = np.arange(1 << 16)
+    df = pd.DataFrame({f"d_{i}": np.append(values, 0 if i == 0 else 1) for i in range(5)})
+    df["cpu_pct"] = 0.5
+    scored = score_metrics(df, {})
+
+    rollup = build_rollup(scored, list(df.columns[:5]))
+
+    assert len(rollup) == len(df)
+    assert (rollup["rows"] == 1).all()
+
+
+def test_rollup_counts_groups_in_bounded_passes(scored_view, monkeypatch):
+    expected = build_rollup(scored_view, ["d_file", "d_rank"])
+
+    monkeypatch.setattr(rollup_module, "DENSE_CELLS", 20)
+    monkeypatch.setattr(rollup_module, "CHUNK_CELLS", 16)
+
+    pd.testing.assert_frame_equal(build_rollup(scored_view, ["d_file", "d_rank"]), expected)
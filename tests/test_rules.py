@@ -0,0 +1,84 @@
+import pandas as pd
+import pytest
+
+from dfdiagnoser.rules import RuleEngine, discover_layers, load_rule_definitions
+
+
+pytestmark = [pytest.mark.smoke, pytest.mark.full]
+
+
+RULE_DEFS = {
+    "posix": {
+        "excessive_metadata_access": {
+            "name": "Excessive metadata access",
+            "condition": "({posix_layer}_metadata_{time_metric} / {posix_layer}_{time_metric}) >= 0.5",
+            "reasons": [
+                {
+                    "condition": "{posix_layer}_open_{time_metric} > {posix_layer}_close_{time_metric}",
+                    "message": "open",
+                },
+            ],
+        },
+    },
+    "dlio": {
+        "low_compute_util": {
+            "name": "Low Compute Utilization",
+            "condition": "compute_util < 0.7",
+        },
+    },
+}
+
+
+@pytest.fixture
+def layered_df():
+    return pd.DataFrame({
+        "reader_posix_lustre_count_sum": [10, 10, 10],
+        "reader_posix_lustre_time_sum": [1.0, 1.0, 1.0],
+        "reader_posix_lustre_metadata_time_sum": [0.6, 0.2, None],
+        "reader_posix_lustre_open_time_sum": [0.5, 0.1, 0.1],
+        "reader_posix_lustre_close_time_sum": [0.1, 0.1, 0.0],
+        "reader_posix_lustre_read_count_sum": [5, 5, 5],
+        "reader_posix_lustre_read_time_sum": [0.3, 0.3, 0.3],
+        "checkpoint_posix_ssd_count_sum": [4, 4, 4],
+        "checkpoint_posix_ssd_time_sum": [2.0, 2.0, 2.0],
+        "checkpoint_posix_ssd_metadata_time_sum": [0.1, 1.5, 1.0],
+        "compute_util": [0.9, 0.5, 0.6],
+    })
+
+
+def test_load_rule_definitions_flattens_groups():
+    rules = load_rule_definitions(RULE_DEFS)
+    assert [rule.key for rule in rules] == ["excessive_metadata_access", "low_compute_util"]
+    assert rules[0].is_layered
+    assert not rules[1].is_layered
+    assert len(rules[0].reasons) == 1
+
+
+def test_discover_layers_drops_operation_breakdowns(layered_df):
+    assert discover_layers(layered_df.columns) == ["checkpoint_posix_ssd", "reader_posix_lustre"]
+
+
+def test_rule_engine_expands_rules_across_layers(layered_df):
+    matches = RuleEngine(RULE_DEFS).evaluate(layered_df)
+
+    reader = matches[("excessive_metadata_access", "reader_posix_lustre", "condition")]
+    checkpoint = matches[("excessive_metadata_access", "checkpoint_posix_ssd", "condition")]
+    assert reader.tolist() == [True, False, False]
+    assert checkpoint.tolist() == [False, True, True]
+    # Missing layer columns evaluate to no match rather than raising
+    assert not matches[("excessive_metadata_access", "checkpoint_posix_ssd", "reason_0")].any()
+    assert matches[("low_compute_util", "", "condition")].tolist() == [False, True, True]
+
+
+def test_rule_engine_parallel_matches_serial(layered_df):
+    serial = RuleEngine(RULE_DEFS).evaluate(layered_df)
+    parallel = RuleEngine(RULE_DEFS, n_jobs=2, min_layers_per_job=1).evaluate(layered_df)
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_rule_engine_required_columns(layered_df):
+    required = RuleEngine(RULE_DEFS).required_columns(layered_df.columns)
+    assert "reader_posix_lustre_metadata_time_sum" in required
+    assert "checkpoint_posix_ssd_time_sum" in required
+    assert "compute_util" in required
+    assert "reader_posix_lustre_read_time_sum" not in required
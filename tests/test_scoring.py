@@ -1,7 +1,16 @@
 import pytest
 import pandas as pd
 import numpy as np
-from dfdiagnoser.scoring import score_metrics
+from dfdiagnoser.scoring import (
+    SCORE_NAMES,
+    TopK,
+    may_reach_severity,
+    rows_at_least,
+    score_metrics,
+    severity_thresholds,
+    top_indices,
+    top_k,
+)
 
 
 pytestmark = [pytest.mark.smoke, pytest.mark.full]
@@ -147,4 +156,88 @@ def test_score_metrics_large_df():
     df = pd.DataFrame({'cpu_pct': list(range(100))})
     result = score_metrics(df, {})
     assert len(result) == 100
-    assert 'cpu_pct_score' in result.columns
\ No newline at end of file
+    assert 'cpu_pct_score' in result.columns
+
+@pytest.mark.parametrize("level", SCORE_NAMES)
+def test_severity_thresholds_never_skip_a_qualifying_row(
+    sample_df, metric_boundaries_sample, level
+):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'cpu_pct': np.r_[[0, 0.25, 0.5, 0.75, 0.9], rng.random(95) * 1.1],
+        'disk_util': rng.random(100),
+        'bw_slope': rng.random(100) * 5,
+        'io_intensity_mean': 10 ** rng.uniform(-10, -2, 100),
+        'bw_mean': rng.random(100) * 200,
+        'cpu_mean': rng.random(100) * 100,
+    })
+    thresholds = severity_thresholds(df.columns, metric_boundaries_sample, level)
+    qualifying = rows_at_least(score_metrics(df, metric_boundaries_sample), level)
+
+    for i, row in df.iterrows():
+        stats = {col: [value, value] for col, value in row.items()}
+        if qualifying[i]:
+            assert may_reach_severity(stats, thresholds)
+    assert not may_reach_severity(
+        {col: [None, None] for col in df.columns}, thresholds
+    )
+
+
+def test_severity_thresholds_reject_unknown_level():
+    with pytest.raises(ValueError):
+        severity_thresholds(['cpu_pct'], {}, 'severe')
+
+
+def test_top_indices_matches_full_sort_with_ties():
+    rng = np.random.default_rng(1)
+    primary = rng.integers(0, 5, 1000).astype(float)
+    primary[:10] = np.nan
+    secondary = rng.random(1000)
+
+    selected = top_indices(primary, secondary, 25)
+
+    order = np.lexsort((secondary, np.nan_to_num(primary, nan=-np.inf)))[::-1]
+    assert sorted(selected) == sorted(order[:25])
+    assert len(top_indices(primary[:3], secondary[:3], 25)) == 3
+
+
+def test_top_k_over_batches_matches_whole_view():
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({
+        'cpu_pct': rng.random(200),
+        'disk_util': rng.random(200),
+        'bw_mean': rng.random(200) * 100,
+        'd_rank': np.arange(200),
+    })
+    boundaries = {'bw_mean': 100}
+    batches = [df.iloc[i:i + 30] for i in range(0, len(df), 30)]
+
+    combined = top_k(batches, 5, boundaries)
+    expected = top_k(df, 5, boundaries)
+    assert combined.index.tolist() == expected.index.tolist()
+    assert combined['d_rank'].tolist() == expected['d_rank'].tolist()
+    scored = score_metrics(df, boundaries)
+    totals = scored[[c for c in scored.columns if c.endswith('_score')]].astype(float).sum(axis=1)
+    assert combined['combined_score'].tolist() == sorted(totals, reverse=True)[:5]
+
+    worst_bw = top_k(batches, 3, boundaries, metric='bw_mean')
+    assert worst_bw['bw_mean'].tolist() == sorted(df['bw_mean'])[:3]
+
+
+def test_top_k_for_one_metric_ranks_only_that_metric():
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({
+        'cpu_pct': rng.random(100),
+        'disk_util': rng.random(100),
+        'bw_mean': rng.random(100) * 100,
+        'd_rank': np.arange(100),
+    })
+    topk = TopK(4, {'bw_mean': 100}, per_metric=False, metric='cpu_pct')
+    for i in range(0, len(df), 25):
+        topk.update(df.iloc[i:i + 25])
+
+    assert topk.metrics == ['cpu_pct']
+    assert topk.combined().empty
+    worst = topk.metric('cpu_pct')
+    assert list(worst.columns) == ['d_rank', 'cpu_pct', 'cpu_pct_score']
+    assert worst['cpu_pct'].tolist() == sorted(df['cpu_pct'], reverse=True)[:4]
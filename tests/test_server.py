@@ -0,0 +1,116 @@
+import os
+import socket
+import stat
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from dfdiagnoser.client import DiagnoserClient, default_socket_path
+from dfdiagnoser.diagnoser import Diagnoser
+from dfdiagnoser.output import FileOutput
+from dfdiagnoser.server import DiagnoserServer
+
+
+pytestmark = [pytest.mark.smoke, pytest.mark.full]
+
+
+CHECKPOINT_DIR = os.path.join(
+    os.path.dirname(__file__), "data", "dfanalyzer_checkpoints", "unet3d_v100"
+)
+
+
+@pytest.fixture
+def server(tmp_path):
+    socket_path = str(tmp_path / "dfdiagnoser.sock")
+    server = DiagnoserServer(
+        socket_path,
+        Diagnoser(checkpoint_read_mode="mmap"),
+        output=FileOutput(output_dir=str(tmp_path / "out"), output_format="parquet"),
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_concurrent_checkpoint_requests(server, tmp_path):
+    def diagnose(_):
+        with DiagnoserClient(server.socket_path, timeout=60) as client:
+            return client.diagnose_checkpoint(CHECKPOINT_DIR)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        responses = list(pool.map(diagnose, range(3)))
+
+    for response in responses:
+        assert response["ok"], response
+        assert sorted(os.path.basename(v["path"]) for v in response["views"]) == [
+            "_flat_view_proc_name_1.parquet",
+            "_flat_view_time_range_1.parquet",
+        ]
+        assert all(v["rows"] == 56 for v in response["views"])
+    assert server.requests == 3
+    outputs = sorted(os.listdir(tmp_path / "out"))
+    assert outputs == ["_flat_view_proc_name_1_scored.parquet", "_flat_view_time_range_1_scored.parquet"]
+    expected = Diagnoser(checkpoint_read_mode="mmap").diagnose_checkpoint(CHECKPOINT_DIR)
+    for path, scored in zip(expected.flat_view_paths, expected.scored_flat_views):
+        name = os.path.basename(path).replace(".parquet", "_scored.parquet")
+        written = pd.read_parquet(tmp_path / "out" / name)
+        pd.testing.assert_frame_equal(written, scored, check_dtype=False, check_index_type=False)
+
+
+def test_errors_are_returned_and_connection_stays_usable(server, tmp_path):
+    with DiagnoserClient(server.socket_path, timeout=60) as client:
+        response = client.diagnose_checkpoint(str(tmp_path / "missing"))
+        assert not response["ok"]
+        assert response["error_type"] == "FileNotFoundError"
+        assert client.request({"op": "bogus"})["error_type"] == "ValueError"
+        assert client.ping()["ok"]
+
+
+def test_client_cli_avoids_dataframe_imports(server):
+    code = (
+        "import sys; from dfdiagnoser.client import main; rc = main(['--socket', sys.argv[1], 'ping']);"
+        "assert 'pandas' not in sys.modules; sys.exit(rc)"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code, server.socket_path], capture_output=True, text=True
+    )
+    assert proc.returncode == 0, proc.stderr
+    assert '"ok": true' in proc.stdout
+
+
+def test_socket_is_private_and_live_server_is_not_replaced(server):
+    assert stat.S_IMODE(os.stat(server.socket_path).st_mode) == 0o600
+    with pytest.raises(OSError, match="already listening"):
+        DiagnoserServer(server.socket_path, server.diagnoser)
+    with DiagnoserClient(server.socket_path, timeout=60) as client:
+        assert client.ping()["ok"]
+
+
+def test_stale_socket_is_replaced_but_other_files_are_not(tmp_path):
+    socket_path = str(tmp_path / "stale.sock")
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()
+    server = DiagnoserServer(socket_path, Diagnoser())
+    server.server_close()
+    assert not os.path.exists(socket_path)
+
+    other_path = tmp_path / "not_a_socket"
+    other_path.write_text("keep me")
+    with pytest.raises(FileExistsError):
+        DiagnoserServer(str(other_path), Diagnoser())
+    assert other_path.read_text() == "keep me"
+
+
+def test_default_socket_path_is_per_user(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    assert default_socket_path() == str(tmp_path / "dfdiagnoser.sock")
+    monkeypatch.delenv("XDG_RUNTIME_DIR")
+    assert default_socket_path().endswith(f"dfdiagnoser-{os.getuid()}.sock")
@@ -0,0 +1,128 @@
+import pandas as pd
+import pytest
+
+from dfdiagnoser.diagnoser import Diagnoser
+from dfdiagnoser.state import (
+    SNAPSHOT_FILENAME,
+    DiagnosisStateStore,
+    FactObservation,
+    FactTracker,
+    WindowBitset,
+)
+
+from .fakes import facts_event, stop_event
+
+
+pytestmark = [pytest.mark.smoke, pytest.mark.full]
+
+
+def test_snapshot_roundtrip(tmp_path):
+    store = DiagnosisStateStore()
+    for window in range(3):
+        store.record_fact(
+            ("small_read_dominance", "reader_posix:epoch"),
+            FactObservation(
+                window_index=window,
+                epoch=None if window == 0 else window,
+                severity_score=0.5 + window / 10,
+                severity_label="high",
+                evidence={"metrics": {"reader_posix_read_time_frac_parent": 0.7}},
+                opportunity_tags=["small_io_reduction"],
+            ),
+        )
+        store.advance_window()
+    store.scored_summaries.append(
+        1, pd.DataFrame({"cpu_pct_score": pd.array([1, 3, None, 4], dtype="Int64")})
+    )
+
+    path = store.save_snapshot(str(tmp_path / SNAPSHOT_FILENAME), position={"event_id": 7})
+    restored, position = DiagnosisStateStore.load_snapshot(path)
+
+    assert position == {"event_id": 7}
+    assert restored.current_window == 3
+    assert restored.fact_types() == {"small_read_dominance"}
+    (key, tracker), = restored.all_trackers()
+    assert key == ("small_read_dominance", "reader_posix:epoch")
+    assert tracker.observations == store._trackers[key].observations
+    assert tracker.prevalence() == pytest.approx(1.0)
+    assert tracker.persistence() == 3
+    assert restored.scored_summaries.records() == [
+        {"window_index": 1, "n_rows": 4, "cpu_pct_score_mean": 8 / 3, "cpu_pct_score_max": 4.0}
+    ]
+    assert restored.scored_summaries.count.tolist()[:1] == [[3]]
+
+
+def test_window_bitset_matches_set_semantics():
+    windows = [0, 1, 2, 63, 64, 65, 66, 200, 5, 5]
+    bitset = WindowBitset(windows)
+
+    assert list(bitset) == sorted(set(windows))
+    assert len(bitset) == len(set(windows))
+    assert bitset.max() == 200
+    assert 64 in bitset and 3 not in bitset and 10_000 not in bitset
+    assert bitset.longest_run() == 4
+    assert bitset.count(2, 65) == 4
+    assert bitset.count(64, 64) == 0
+    assert bitset.count(60, 1000) == 5
+    assert list(bitset & WindowBitset([1, 64, 199, 200, 300])) == [1, 64, 200]
+    assert WindowBitset().max() is None
+    assert WindowBitset().longest_run() == 0
+    with pytest.raises(ValueError):
+        bitset.add(-1)
+    with pytest.raises(ValueError):
+        WindowBitset().add(-1)
+
+
+def _observation(window: int) -> FactObservation:
+    return FactObservation(
+        window_index=window, epoch=None, severity_score=0.5, severity_label="medium"
+    )
+
+
+def test_fact_tracker_sliding_prevalence_and_co_occurrence():
+    tracker, other = FactTracker(), FactTracker()
+    for window in [0, 1, 2, 7, 8, 9]:
+        tracker.record(_observation(window))
+    for window in [2, 3, 8]:
+        other.record(_observation(window))
+    tracker.update_total_windows(10)
+
+    assert tracker.prevalence() == pytest.approx(0.6)
+    assert tracker.persistence() == 3
+    assert tracker.sliding_prevalence(4) == pytest.approx(0.75)
+    assert tracker.sliding_prevalence(4, end=4) == pytest.approx(0.75)
+    assert tracker.sliding_prevalence(20) == pytest.approx(0.6)
+    assert tracker.co_occurrence(other) == 2
+
+    store = DiagnosisStateStore()
+    store.record_facts(
+        [("a", "epoch"), ("a", "epoch"), ("b", "epoch"), ("b", "step")],
+        [_observation(1), _observation(2), _observation(2), _observation(4)],
+    )
+    assert store.co_occurrence(("a", "epoch"), ("b", "epoch")) == 1
+    assert store.co_occurrence(("a", "epoch"), ("missing", "epoch")) == 0
+    assert list(store.fact_type_windows()["b"]) == [2, 4]
+    store.record_fact(("b", "epoch"), _observation(7))
+    assert list(store.fact_type_windows()["b"]) == [2, 4, 7]
+    assert WindowBitset.from_mask(store.fact_type_windows()["b"].mask).max() == 7
+
+
+def test_diagnose_mofka_restores_snapshot_and_skips_replayed_events(tmp_path, fake_stream):
+    state_dir = str(tmp_path / "state")
+
+    first_events = [facts_event(1), facts_event(2), stop_event(3)]
+    fake_stream(first_events)
+    Diagnoser().diagnose_mofka("group.json", "topic", state_dir=state_dir)
+    # Acknowledgement is deferred to snapshot time
+    assert not first_events[0].acknowledged
+    assert first_events[2].acknowledged
+
+    # A restarted consumer that replays already-snapshotted events skips them
+    second_events = [facts_event(2), facts_event(4), stop_event(5)]
+    fake_stream(second_events)
+    diagnoser = Diagnoser()
+    diagnoser.diagnose_mofka("group.json", "topic", state_dir=state_dir)
+
+    (key, tracker), = diagnoser.state.all_trackers()
+    assert [obs.epoch for obs in tracker.observations] == [1, 2, 4]
+    assert diagnoser.state.current_window == 3
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dfdiagnoser.summaries import ScoredSummaryTable
+
+
+pytestmark = [pytest.mark.smoke, pytest.mark.full]
+
+
+def _scores(**columns):
+    return pd.DataFrame({f"{k}_score": pd.array(v, dtype="Int64") for k, v in columns.items()})
+
+
+def test_append_reduces_score_block_per_window():
+    table = ScoredSummaryTable(capacity=1)
+    table.append(0, _scores(cpu_pct=[1, 2, None], io_util=[None, None, None]))
+    table.append(1, _scores(cpu_pct=[4, 4], read_slope=[0, 5]))
+    table.append(2, pd.DataFrame({"cpu_pct": [0.5]}))  # no score columns
+
+    assert len(table) == 2
+    assert table.metrics == ["cpu_pct_score", "io_util_score", "read_slope_score"]
+    assert table.count.tolist()[:2] == [[2, 0, 0], [2, 0, 2]]
+    np.testing.assert_allclose(table.mean[:2], [[1.5, np.nan, np.nan], [4, np.nan, 2.5]])
+    np.testing.assert_allclose(table.max[:2], [[2, np.nan, np.nan], [4, np.nan, 5]])
+    assert table.window(1) == {
+        "window_index": 1,
+        "n_rows": 2,
+        "cpu_pct_score_mean": 4.0,
+        "cpu_pct_score_max": 4.0,
+        "read_slope_score_mean": 2.5,
+        "read_slope_score_max": 5.0,
+    }
+    assert table.window(7) == {}
+
+
+def test_frame_and_dict_roundtrip():
+    table = ScoredSummaryTable()
+    for window in range(3):
+        table.append(window, _scores(cpu_pct=[window, window + 1]))
+
+    means = table.to_frame("mean")
+    assert means["cpu_pct_score"].tolist() == [0.5, 1.5, 2.5]
+    assert means.index.get_level_values("window_index").tolist() == [0, 1, 2]
+    assert set(table.to_frame().columns.get_level_values(0)) == {"mean", "max", "count"}
+
+    restored = ScoredSummaryTable.from_dict(table.to_dict())
+    assert restored.records() == table.records()
+    restored.append(3, _scores(cpu_pct=[3]))
+    assert len(restored) == 4
+
+
+def test_from_legacy_records():
+    table = ScoredSummaryTable.from_records(
+        [{"window_index": 2, "n_rows": 4, "cpu_pct_score_mean": 1.5, "cpu_pct_score_max": 3.0}]
+    )
+    assert table.window(2)["cpu_pct_score_max"] == 3.0
+
+
+def test_score_histograms_and_fraction_at_least():
+    table = ScoredSummaryTable()
+    table.append(0, _scores(cpu_pct=[0, 1, 4, 5, None], io_util=[None, None, None, None, None]))
+    table.append(1, _scores(cpu_pct=[2, 3]))
+
+    assert table.hist[0].tolist() == [[2, 0, 0, 1, 1, 1], [0, 0, 0, 0, 0, 5]]
+    assert table.hist[1, 0].tolist() == [0, 1, 1, 0, 0, 0]
+    fractions = table.fraction_at_least("high")
+    assert fractions["cpu_pct_score"].tolist() == [0.5, 0.0]
+    assert np.isnan(fractions["io_util_score"]).all()
+
+    restored = ScoredSummaryTable.from_dict(table.to_dict())
+    assert restored.hist[: len(restored)].tolist() == table.hist[: len(table)].tolist()
+    with pytest.raises(ValueError):
+        table.fraction_at_least("null")